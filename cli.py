@@ -1,3 +1,255 @@
-from rave.app import App
+import argparse
+import json
+import sys
 
-App.run()
+
+def render_command(args: argparse.Namespace) -> int:
+    from rave.offline_renderer import (
+        RAW_OUTPUT_STDOUT,
+        OfflineRenderer,
+        create_image_writer,
+        create_raw_writer,
+    )
+    from rave.project import load_project
+
+    project = load_project(args.project)
+    if project is None:
+        print(f"Failed to load project: {args.project}", file=sys.stderr)
+        return 1
+
+    renderer = OfflineRenderer(
+        project,
+        args.audio,
+        size=(args.width, args.height),
+        fps=args.fps,
+        readback_depth=args.readback_depth,
+        fft_size=args.fft_size,
+        hop_size=args.hop_size,
+        window=args.window,
+        num_bands=args.bands,
+        band_scale=args.band_scale,
+        backend=args.backend,
+    )
+
+    output = None
+    try:
+        if args.raw:
+            if args.output == RAW_OUTPUT_STDOUT:
+                output = sys.stdout.buffer
+            else:
+                output = open(args.output, "wb")
+            write_frame = create_raw_writer(output)
+        else:
+            write_frame = create_image_writer(args.output)
+
+        num_frames = renderer.render(
+            write_frame, renderer.get_num_frames(args.duration), progress=True
+        )
+    finally:
+        if output is not None and output is not sys.stdout.buffer:
+            output.close()
+        renderer.close()
+
+    if num_frames is None:
+        print(
+            f"Shader compilation failed: {renderer.shader_viewer.error}",
+            file=sys.stderr,
+        )
+        return 1
+
+    return 0
+
+
+def bench_command(args: argparse.Namespace) -> int:
+    from rave.benchmark import (
+        compare_results,
+        format_results,
+        load_report,
+        run_benchmarks,
+        save_report,
+    )
+
+    report = run_benchmarks(
+        iterations=args.iterations, gl=not args.no_gl, backend=args.backend
+    )
+    if args.output is not None:
+        save_report(args.output, report)
+
+    baseline = None
+    if args.baseline is not None:
+        baseline = load_report(args.baseline)["results"]
+
+    print(format_results(report["results"], baseline), file=sys.stderr)
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+
+    if baseline is not None:
+        regressions = compare_results(report["results"], baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(
+                f"regression: {name} {before:.4f} ms -> {after:.4f} ms ({change:+.1%})",
+                file=sys.stderr,
+            )
+        if regressions:
+            return 1
+
+    return 0
+
+
+def gpu_compare_command(args: argparse.Namespace) -> int:
+    from rave.benchmark import format_gpu_comparison, run_gpu_comparison, save_report
+
+    try:
+        report = run_gpu_comparison(
+            args.projects,
+            size=(args.width, args.height),
+            frames=args.frames,
+            warmup=args.warmup,
+            backend=args.backend,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(f"GPU time per frame (ms), {report['metadata']['renderer']}")
+    print(format_gpu_comparison(report["results"]))
+
+    if args.output is not None:
+        save_report(args.output, report)
+
+    return 0
+
+
+def main() -> int:
+    from rave.benchmark import DEFAULT_ITERATIONS, DEFAULT_THRESHOLD, DEFAULT_WARMUP
+    from rave.filterbank import BAND_SCALES, DEFAULT_BAND_SCALE, DEFAULT_NUM_BANDS
+    from rave.offline_renderer import (
+        DEFAULT_FPS,
+        DEFAULT_READBACK_DEPTH,
+        DEFAULT_RESOLUTION,
+    )
+    from rave.stft import (
+        DEFAULT_FFT_SIZE,
+        DEFAULT_HOP_SIZE,
+        DEFAULT_WINDOW,
+        FFT_SIZES,
+        WINDOW_FUNCTIONS,
+    )
+    from rave.tracing import DEFAULT_TRACE_PATH
+
+    parser = argparse.ArgumentParser(
+        prog="rave", description="Real-time Audio Visualization Editor"
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const=DEFAULT_TRACE_PATH,
+        metavar="PATH",
+        help="record frame pipeline spans, written as a Chrome trace on exit",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    render = subparsers.add_parser(
+        "render", help="render a project against a WAV file, without a window"
+    )
+    render.add_argument("project", help="path of the .raveproj file")
+    render.add_argument("audio", help="path of a 16-bit PCM WAV file")
+    render.add_argument(
+        "-o",
+        "--output",
+        default="frames/frame_%05d.png",
+        help="image path pattern, or with --raw a file, pipe or - for stdout",
+    )
+    render.add_argument(
+        "--raw", action="store_true", help="write raw rgb24 frames instead of images"
+    )
+    render.add_argument("--width", type=int, default=DEFAULT_RESOLUTION[0])
+    render.add_argument("--height", type=int, default=DEFAULT_RESOLUTION[1])
+    render.add_argument("--fps", type=float, default=DEFAULT_FPS)
+    render.add_argument(
+        "--duration", type=float, help="seconds to render, defaults to the audio length"
+    )
+    render.add_argument(
+        "--readback-depth",
+        type=int,
+        default=DEFAULT_READBACK_DEPTH,
+        help="number of frames in flight between rendering and readback",
+    )
+    render.add_argument(
+        "--fft-size", type=int, choices=FFT_SIZES, default=DEFAULT_FFT_SIZE
+    )
+    render.add_argument("--hop-size", type=int, default=DEFAULT_HOP_SIZE)
+    render.add_argument(
+        "--window", choices=sorted(WINDOW_FUNCTIONS), default=DEFAULT_WINDOW
+    )
+    render.add_argument("--bands", type=int, default=DEFAULT_NUM_BANDS)
+    render.add_argument("--band-scale", choices=BAND_SCALES, default=DEFAULT_BAND_SCALE)
+    render.add_argument(
+        "--backend", help="context backend, e.g. egl on a machine without a display"
+    )
+
+    bench = subparsers.add_parser(
+        "bench", help="benchmark the audio analysis, uniform, compile and frame paths"
+    )
+    bench.add_argument(
+        "-o", "--output", help="write the JSON report to a file instead of stdout"
+    )
+    bench.add_argument("--baseline", help="JSON report to compare the results to")
+    bench.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown of the median reported as a regression",
+    )
+    bench.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    bench.add_argument(
+        "--no-gl", action="store_true", help="only run the audio benchmarks"
+    )
+    bench.add_argument(
+        "--backend", help="context backend, e.g. egl on a machine without a display"
+    )
+
+    gpu_compare = subparsers.add_parser(
+        "gpu-compare", help="compare the GPU time per frame of projects' shaders"
+    )
+    gpu_compare.add_argument("projects", nargs="+", help="paths of .raveproj files")
+    gpu_compare.add_argument("--width", type=int, default=DEFAULT_RESOLUTION[0])
+    gpu_compare.add_argument("--height", type=int, default=DEFAULT_RESOLUTION[1])
+    gpu_compare.add_argument("--frames", type=int, default=DEFAULT_ITERATIONS)
+    gpu_compare.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    gpu_compare.add_argument("-o", "--output", help="also write a JSON report")
+    gpu_compare.add_argument(
+        "--backend", help="context backend, e.g. egl on a machine without a display"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "render":
+        return render_command(args)
+
+    if args.command == "bench":
+        return bench_command(args)
+
+    if args.command == "gpu-compare":
+        return gpu_compare_command(args)
+
+    from rave.app import App
+    from rave.tracing import tracer
+
+    if args.trace is not None:
+        tracer.output_path = args.trace
+        tracer.enable()
+
+    # the window parses the command line itself
+    sys.argv = sys.argv[:1]
+    App.run()
+
+    if args.trace is not None:
+        print(f"Trace written to {tracer.dump()}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,10 @@
 import audioop
+import dataclasses
 import enum
 import imgui
-import json
 import moderngl
 import moderngl_window
-import numpy as np
-import os
+import time
 import tkinter as tk
 import webbrowser
 
@@ -13,17 +12,43 @@ from moderngl_window import WindowConfig
 from moderngl_window.context.base.keys import KeyModifiers
 from moderngl_window.integrations.imgui import ModernglWindowRenderer
 from tkinter.filedialog import askopenfilename, asksaveasfilename
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from rave import __version__
+from rave.app_config import AppConfig
+from rave.audio_analyzer import (
+    get_analysis_stages,
+    get_audio_array_scales,
+    get_audio_uniform_sources,
+)
 from rave.audio_device import AudioDevice
+from rave.audio_source import PortAudioSource, create_audio_source
+from rave.audio_textures import AudioTextures
 from rave.audio_config_window import AudioConfigWindow
+from rave.frame_output import FrameOutput
 from rave.live_control_window import LiveControlWindow
-from rave.project import Project, UniformField, new_project, load_project, save_project
+from rave.modulation import ModulationEngine
+from rave.project import (
+    Project,
+    new_project,
+    load_project,
+    save_project_async,
+)
+from rave.performance_window import PerformanceWindow
 from rave.project_overview_window import ProjectOverviewWindow
 from rave.scripting_window import ScriptingWindow
+from rave.set_list import PreparedProject, SetList
+from rave.set_list_window import SetListWindow
+from rave.shader_compiler import ShaderCompiler
 from rave.shader_viewer import ShaderViewer
 from rave.tool_window import ToolWindow
+from rave.tracing import tracer
+from rave.ui_layer import DEFAULT_UI_RATE, UILayer
+from rave.uniform_bindings import (
+    UniformBindingTable,
+    UniformSource,
+    match_uniform_fields,
+)
 
 
 # type aliases
@@ -38,7 +63,20 @@ EXPOSED_UNIFORMS: List[str] = [
     "rTime",
     "rFrameTime",
     "rAudioRMS",
+    "rAudioRMSLeft",
+    "rAudioRMSRight",
     "rAudioFFT",
+    "rAudioFFTLeft",
+    "rAudioFFTRight",
+    "rAudioFFTMid",
+    "rAudioFFTSide",
+    "rAudioBands",
+    "rAudioFFTTex",
+    "rAudioSpectrogram",
+    "rAudioSpectrogramRow",
+    "rBeat",
+    "rBPM",
+    "rBeatPhase",
 ]
 CONFIRM_POPUP_ID: str = "confirm-popup"
 NUM_OF_RECENT_PROJECTS: int = 5
@@ -50,6 +88,8 @@ class WindowType(enum.IntEnum):
     SCRIPTING = 1
     LIVE_CONTROL = 2
     AUDIO_CONFIG = 3
+    SET_LIST = 4
+    PERFORMANCE = 5
 
 
 # classes
@@ -58,10 +98,18 @@ class App(WindowConfig):
     window_size: Tuple[int, int] = (1280, 720)
 
     _imgui_renderer: ModernglWindowRenderer
+    ui_layer: UILayer
 
+    config: AppConfig
     project: Project
+    set_list: SetList
     windows: List[ToolWindow]
     shader_viewer: ShaderViewer
+    shader_compiler: ShaderCompiler
+    modulation_engine: ModulationEngine
+    frame_output: FrameOutput
+    audio_textures: AudioTextures
+    rave_uniform_sources: Dict[str, UniformSource]
 
     popup_message: Optional[str]
     popup_cancel_callback: PopupCallback
@@ -69,6 +117,7 @@ class App(WindowConfig):
     popup_active: bool
 
     is_ui_visible: bool
+    is_frame_output_enabled: bool
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -80,26 +129,64 @@ class App(WindowConfig):
         self.popup_confirm_callback = None
         self.popup_active = False
 
+        self.config = AppConfig(APP_CONFIG_PATH)
+        self.config.start()
+
         self.project = Project()
         self.audio_device = AudioDevice()
+        self.set_list = SetList(release_callback=self.release_prepared_project)
 
         self.windows = [
-            ProjectOverviewWindow(),
-            ScriptingWindow(script_changed_callback=self.script_changed_callback),
-            LiveControlWindow(),
+            ProjectOverviewWindow(
+                fft_scale_changed_callback=self.fft_scale_changed_callback
+            ),
+            ScriptingWindow(script_changed_callback=self.script_edited_callback),
+            LiveControlWindow(
+                modulations_changed_callback=self.modulations_changed_callback
+            ),
             AudioConfigWindow(
                 default_device_index=self.audio_device.get_default_loopback_device_index(),
                 apply_audio_config_callback=self.apply_audio_config_callback,
             ),
+            SetListWindow(
+                self.set_list,
+                add_to_set_list_callback=self.add_to_set_list_callback,
+                switch_set_list_callback=self.switch_set_list_callback,
+            ),
+            PerformanceWindow(tracer, dump_trace_callback=self.dump_trace_callback),
         ]
         self.shader_viewer = ShaderViewer(
             update_uniforms_callback=self.update_uniforms_callback
         )
+        self.shader_compiler = ShaderCompiler()
+        self.modulation_engine = ModulationEngine()
+        self.performance_window.set_gpu_timer(self.shader_viewer.gpu_timer)
+        self.performance_window.set_render_scaler(self.shader_viewer.scaler)
+
+        self.audio_textures = AudioTextures(self.ctx)
+
+        # rendered frames for other processes, without the ui
+        self.frame_output = FrameOutput(self.ctx)
+        self.is_frame_output_enabled = bool(self.config.get("frame_output", False))
+
+        # rave exposed uniforms, bound to the uniforms of each compiled program
+        self.rave_uniform_sources = {
+            "rResolution": lambda time, frametime: self.shader_viewer.render_size,
+            "rTime": lambda time, frametime: time,
+            "rFrameTime": lambda time, frametime: frametime,
+            **get_audio_uniform_sources(self.audio_device, self.audio_textures),
+        }
 
         self.audio_config_window.set_all_devices(self.audio_device.get_all_devices())
 
         imgui.create_context()
         self._imgui_renderer = ModernglWindowRenderer(self.wnd)
+        self.ui_layer = UILayer(
+            self.ctx,
+            self.shader_viewer.compositor,
+            float(self.config.get("ui_rate", DEFAULT_UI_RATE)),
+        )
+        self.performance_window.set_ui_layer(self.ui_layer)
 
         self.script_changed_callback()
 
@@ -120,44 +207,49 @@ class App(WindowConfig):
     def audio_config_window(self) -> AudioConfigWindow:
         return self.windows[WindowType.AUDIO_CONFIG]
 
+    @property
+    def set_list_window(self) -> SetListWindow:
+        return self.windows[WindowType.SET_LIST]
+
+    @property
+    def performance_window(self) -> PerformanceWindow:
+        return self.windows[WindowType.PERFORMANCE]
+
     # methods
     def get_recent_projects(self) -> List[str]:
-        if not os.path.exists(APP_CONFIG_PATH):
-            with open(APP_CONFIG_PATH, "w") as fp:
-                json.dump({}, fp)
-
-        with open(APP_CONFIG_PATH, "r") as fp:
-            config: dict = json.load(fp)
-            return (
-                config["recent_projects"] if "recent_projects" in config.keys() else []
-            )
+        return self.config.get_recent_projects()
 
     def add_recent_project(self, path) -> None:
-        # load config
-        if not os.path.exists(APP_CONFIG_PATH):
-            with open(APP_CONFIG_PATH, "w") as fp:
-                json.dump({}, fp)
+        self.config.add_recent_project(path, NUM_OF_RECENT_PROJECTS)
 
-        with open(APP_CONFIG_PATH) as fp:
-            config: dict = json.load(fp)
+    def update_uniform_fields(self, bindings: UniformBindingTable) -> None:
+        # update uniform values within project, keeping the values and ranges
+        #   of the uniforms that existed before
+        fields = match_uniform_fields(
+            bindings, self.project.uniform_fields, EXPOSED_UNIFORMS
+        )
 
-        # update config
-        if "recent_projects" not in config.keys():
-            config["recent_projects"] = []
+        self.project.uniform_fields = fields
+        bindings.bind_fields(fields)
+        self.modulation_engine.invalidate()
 
-        if path not in config["recent_projects"]:
-            config["recent_projects"].append(path)
+    def modulations_changed_callback(self) -> None:
+        self.modulation_engine.invalidate()
 
-        config["recent_projects"] = config["recent_projects"][:NUM_OF_RECENT_PROJECTS]
+    def bind_uniform_sources(self, bindings: UniformBindingTable) -> None:
+        # audio arrays are resampled to the length the script declares
+        bindings.bind_sources(
+            self.rave_uniform_sources, get_audio_array_scales(self.project.fft_scale)
+        )
 
-        # save updated config
-        with open(APP_CONFIG_PATH, "w") as fp:
-            json.dump(config, fp)
+    def fft_scale_changed_callback(self) -> None:
+        self.bind_uniform_sources(self.shader_viewer.bindings)
 
     def create_new_project(self) -> None:
+        self.set_list.clear_current()
         self.project = new_project()
         self.script_changed_callback()
-        self.update_uniforms_callback(self.shader_viewer.program, 0.0, 0.0)
+        self.update_uniforms_callback(self.shader_viewer.bindings, 0.0, 0.0)
 
     def open_filedialog(
         self, filetypes: FileTypeSpecifier = [("All Files", "*")]
@@ -193,9 +285,10 @@ class App(WindowConfig):
     def load_project_callback(self) -> None:
         path = self.open_filedialog([("RAVE Project", "*.raveproj")])
         if path is not None:
+            self.set_list.clear_current()
             self.project = load_project(path)
             self.script_changed_callback()
-            self.update_uniforms_callback(self.shader_viewer.program, 0.0, 0.0)
+            self.update_uniforms_callback(self.shader_viewer.bindings, 0.0, 0.0)
 
             if self.project is None:
                 print("Failed to load project, using default")
@@ -204,6 +297,7 @@ class App(WindowConfig):
                 self.add_recent_project(path)
 
     def load_recent_project_callback(self, path: str) -> None:
+        self.set_list.clear_current()
         self.project = load_project(path)
 
         if self.project is None:
@@ -213,7 +307,7 @@ class App(WindowConfig):
             self.add_recent_project(path)
 
         self.script_changed_callback()
-        self.update_uniforms_callback(self.shader_viewer.program, 0.0, 0.0)
+        self.update_uniforms_callback(self.shader_viewer.bindings, 0.0, 0.0)
 
     def save_project_callback(self) -> None:
         default_file_name = f"{self.project.name} by {self.project.author}"
@@ -221,9 +315,22 @@ class App(WindowConfig):
             default_file_name, ".raveproj", [("RAVE Project", "*.raveproj")]
         )
         if path is not None:
-            result = save_project(path, self.project)
-            if not result:
-                print("Failed to save project")
+            save_project_async(path, self.project, self.project_saved_callback)
+
+    def dump_trace_callback(self) -> None:
+        try:
+            path = tracer.dump()
+            self.popup_message = f"Trace written to {path}"
+        except OSError as e:
+            self.popup_message = f"Failed to write trace: {e}"
+
+        self.popup_confirm_callback = None
+        self.popup_cancel_callback = None
+        self.popup_active = True
+
+    def project_saved_callback(self, result: bool) -> None:
+        if not result:
+            print("Failed to save project")
 
     def open_window_callback(self, window_type: WindowType) -> None:
         windows = {
@@ -231,6 +338,8 @@ class App(WindowConfig):
             WindowType.SCRIPTING: self.scripting_window,
             WindowType.LIVE_CONTROL: self.live_control_window,
             WindowType.AUDIO_CONFIG: self.audio_config_window,
+            WindowType.SET_LIST: self.set_list_window,
+            WindowType.PERFORMANCE: self.performance_window,
         }
 
         window = windows[window_type]
@@ -241,80 +350,137 @@ class App(WindowConfig):
 
     def toggle_ui_callback(self) -> None:
         self.is_ui_visible = not self.is_ui_visible
+        self.ui_layer.invalidate()
+
+    def toggle_frame_output_callback(self) -> None:
+        self.is_frame_output_enabled = not self.is_frame_output_enabled
+        if not self.is_frame_output_enabled:
+            self.frame_output.close()
 
     def exit_callback(self) -> None:
         self.wnd.close()
 
+    def script_edited_callback(self) -> None:
+        # compiled from render() once the edits settle and pass validation
+        self.shader_compiler.request(
+            self.project.fragment_shader_source_code, time.perf_counter()
+        )
+
     def script_changed_callback(self) -> None:
-        uniforms = self.shader_viewer.compile(self.ctx, self.project)
+        uniforms = self.shader_viewer.compile(
+            self.ctx,
+            self.project,
+            release_previous=not self.is_program_cached(self.shader_viewer.program),
+        )
+
+        self.scripting_window.set_compile_status(
+            self.shader_viewer.error, self.shader_viewer.compile_time
+        )
 
         if uniforms is None:
             return
 
-        # update uniform values within project
-        # this is my attempt at maintaining history of uniforms,
-        #   whether it works without bugs? im not yet convinced.
-        fields = []
-        for u in uniforms:
-            if u.name in EXPOSED_UNIFORMS:
-                continue
-
-            match = next(
-                (item for item in self.project.uniform_fields if item.name == u.name),
-                None,
-            )
+        self.bind_uniform_sources(self.shader_viewer.bindings)
 
-            if match is not None:
-                fields.append(
-                    UniformField(
-                        u.name, u.fmt, match.value, match.min_value, match.max_value
-                    )
+        self.update_uniform_fields(self.shader_viewer.bindings)
+
+        # keep the set list's copy of the current project in sync with edits
+        prepared = self.set_list.cache.entries.get(self.set_list.current_path)
+        if prepared is not None and prepared.project is self.project:
+            self.set_list.cache.put(
+                dataclasses.replace(
+                    prepared,
+                    program=self.shader_viewer.program,
+                    bindings=self.shader_viewer.bindings,
+                    uniforms=uniforms,
                 )
-            else:
-                fields.append(UniformField(u.name, u.fmt, u.value, 0.0, 1.0))
+            )
 
-        self.project.uniform_fields = fields
+    def add_to_set_list_callback(self) -> None:
+        path = self.open_filedialog([("RAVE Project", "*.raveproj")])
+        if path is not None:
+            self.set_list.add(path)
 
-    def update_uniforms_callback(
-        self, program: moderngl.Program, time: float, frametime: float
-    ) -> None:
-        # rave exposed uniforms
-        rave_uniforms = {
-            "rResolution": self.window_size,
-            "rTime": time,
-            "rFrameTime": frametime,
-            "rAudioRMS": self.audio_device.get_rms(),
-            "rAudioFFT": self.audio_device.get_fft(),
-        }
+    def switch_set_list_callback(self, index: int) -> None:
+        prepared = self.set_list.switch(self.ctx, index)
+        if prepared is None:
+            print("Failed to load set list project")
+            return
 
-        for key, value in rave_uniforms.items():
-            if key in program:
-                if isinstance(value, np.ndarray):
-                    program[key].write(value.tobytes())
-                else:
-                    program[key] = value
+        # the program is compiled already, switching is a swap
+        self.project = prepared.project
+        self.shader_viewer.swap_program(
+            prepared.program,
+            prepared.bindings,
+            crossfade=self.set_list_window.crossfade,
+            release_previous=not self.is_program_cached(self.shader_viewer.program),
+        )
+        self.bind_uniform_sources(prepared.bindings)
+        self.update_uniform_fields(prepared.bindings)
+        self.scripting_window.set_compile_status(None, 0.0)
 
-        # ui exposed uniforms
-        for u in self.project.uniform_fields:
-            if u.name in program:
-                if isinstance(u.value, bytes):
-                    program[u.name].write(u.value)
-                else:
-                    program[u.name] = u.value
+    def is_program_cached(self, program: Optional[moderngl.Program]) -> bool:
+        # programs held by the set list are released by its cache
+        return any(x.program is program for x in self.set_list.cache.entries.values())
+
+    def release_prepared_project(self, prepared: PreparedProject) -> None:
+        self.shader_viewer.release_program(prepared.program, prepared.bindings)
+
+    def update_uniforms_callback(
+        self, bindings: UniformBindingTable, time: float, frametime: float
+    ) -> None:
+        with tracer.span("update_uniforms"):
+            bindings.update(time, frametime)
 
     def apply_audio_config_callback(
         self,
+        source_type: str,
+        source_path: str,
+        signal: str,
+        use_process: bool,
         input_device_index: int,
         sample_rate: int,
         channels: int,
         frames_per_buffer: int,
+        fft_size: int,
+        hop_size: int,
+        window: str,
+        num_bands: int,
+        band_scale: str,
     ) -> None:
-        self.audio_device.start(
-            input_device_index=input_device_index,
-            sample_rate=sample_rate,
-            channels=channels,
-            frames_per_buffer=frames_per_buffer,
-        )
+        settings = {
+            "input_device_index": input_device_index,
+            "sample_rate": sample_rate,
+            "channels": channels,
+            "frames_per_buffer": frames_per_buffer,
+            "fft_size": fft_size,
+            "hop_size": hop_size,
+            "window": window,
+            "num_bands": num_bands,
+            "band_scale": band_scale,
+        }
+
+        try:
+            # the child process opens its own source
+            if use_process:
+                self.audio_device.start_process(
+                    source_type, source_path, signal, **settings
+                )
+            else:
+                if source_type == "device" and isinstance(
+                    self.audio_device.source, PortAudioSource
+                ):
+                    source = self.audio_device.source
+                else:
+                    source = create_audio_source(source_type, source_path, signal)
+
+                self.audio_device.start(source=source, **settings)
+        except Exception as e:
+            # the previous source keeps playing
+            self.audio_config_window.set_error(f"Failed to apply audio config: {e}")
+            return
+
+        self.audio_config_window.set_error(None)
 
     def about_menu_callback(self) -> None:
         self.popup_message = f"Version: {__version__}"
@@ -371,6 +537,12 @@ class App(WindowConfig):
                     if clicked:
                         self.toggle_ui_callback()
 
+                    clicked, _ = imgui.menu_item(
+                        "Frame Output", None, self.is_frame_output_enabled
+                    )
+                    if clicked:
+                        self.toggle_frame_output_callback()
+
                     imgui.separator()
 
                     clicked, _ = imgui.menu_item("Project Overview", "F1")
@@ -389,6 +561,14 @@ class App(WindowConfig):
                     if clicked:
                         self.open_window_callback(WindowType.AUDIO_CONFIG)
 
+                    clicked, _ = imgui.menu_item("Set List", "F5")
+                    if clicked:
+                        self.open_window_callback(WindowType.SET_LIST)
+
+                    clicked, _ = imgui.menu_item("Performance", "F6")
+                    if clicked:
+                        self.open_window_callback(WindowType.PERFORMANCE)
+
             with imgui.begin_menu("Help") as help_menu:
                 if help_menu.opened:
                     clicked, _ = imgui.menu_item("About")
@@ -429,32 +609,89 @@ class App(WindowConfig):
                     imgui.close_current_popup()
 
     def render(self, time: float, frametime: float) -> None:
-        self.shader_viewer.render(time, frametime)
+        with tracer.span("frame"):
+            with tracer.span("update_shader_compiler"):
+                self.update_shader_compiler()
+
+            with tracer.span("set_list.update"):
+                self.set_list.update(self.ctx)
+
+            # one consistent set of audio features for the whole frame
+            self.audio_device.acquire()
+
+            with tracer.span("modulation_engine.update"):
+                self.modulation_engine.update(
+                    self.project,
+                    self.shader_viewer.bindings.block,
+                    self.audio_device.features,
+                    frametime,
+                )
+
+            # only the analysis consumed by the shader and the modulations runs
+            self.audio_device.set_stages(
+                get_analysis_stages(
+                    self.shader_viewer.active_uniforms | self.modulation_engine.uniforms
+                )
+            )
 
-        if self.is_ui_visible:
-            self.render_ui(time, frametime)
+            with tracer.span("shader_viewer.render"):
+                self.shader_viewer.render(time, frametime)
 
-    def render_ui(self, time: float, frametime: float) -> None:
-        imgui.new_frame()
+            if self.is_frame_output_enabled:
+                with tracer.span("frame_output.capture"):
+                    try:
+                        self.frame_output.capture(self.ctx.fbo, time)
+                    except FileExistsError as e:
+                        # another instance of RAVE publishes under the name
+                        print(f"Failed to start frame output: {e}")
+                        self.is_frame_output_enabled = False
 
-        self.draw_windows(time, frametime)
-        self.draw_main_menu_bar()
-        self.draw_popups()
+            if self.is_ui_visible:
+                with tracer.span("render_ui"):
+                    self.render_ui(time, frametime)
+
+    def update_shader_compiler(self) -> None:
+        if self.shader_compiler.poll(time.perf_counter()):
+            self.script_changed_callback()
+            self.ui_layer.invalidate()
+        elif self.shader_compiler.error is not None:
+            self.scripting_window.set_compile_status(
+                self.shader_compiler.error, self.shader_viewer.compile_time
+            )
+            self.shader_compiler.error = None
+            self.ui_layer.invalidate()
+
+    def render_ui(self, time: float, frametime: float) -> None:
+        # the ui is rebuilt at its own rate, the cached image is drawn every frame
+        screen = self.ctx.fbo
+        if self.ui_layer.needs_render(time, screen.size):
+            imgui.get_io().delta_time = self.ui_layer.get_delta_time(time)
+            imgui.new_frame()
+
+            self.draw_windows(time, frametime)
+            self.draw_main_menu_bar()
+            self.draw_popups()
+
+            imgui.render()
+            self.ui_layer.render(
+                self._imgui_renderer, imgui.get_draw_data(), screen, time
+            )
+            imgui.end_frame()
 
-        imgui.render()
-        self._imgui_renderer.render(imgui.get_draw_data())
-        imgui.end_frame()
+        self.ui_layer.composite()
 
     # window event methods
     def resize(self, width: int, height: int):
         self.aspect_ratio = width / height
         imgui.get_io().display_size = width, height
-        self.update_uniforms_callback(self.shader_viewer.program, 0.0, 0.0)
+        self.update_uniforms_callback(self.shader_viewer.bindings, 0.0, 0.0)
         self._imgui_renderer.resize(width, height)
+        self.ui_layer.invalidate()
         super().resize(width, height)
 
     def key_event(self, key, action, modifiers) -> None:
         self._imgui_renderer.key_event(key, action, modifiers)
+        self.ui_layer.invalidate()
 
         if action == "ACTION_PRESS":
             if not modifiers.shift and not modifiers.ctrl and not modifiers.alt:
@@ -467,6 +704,17 @@ class App(WindowConfig):
                     self.open_window_callback(WindowType.LIVE_CONTROL)
                 elif key == self.wnd.keys.F4:
                     self.open_window_callback(WindowType.AUDIO_CONFIG)
+                elif key == self.wnd.keys.F5:
+                    self.open_window_callback(WindowType.SET_LIST)
+                elif key == self.wnd.keys.F6:
+                    self.open_window_callback(WindowType.PERFORMANCE)
+                elif key == self.wnd.keys.F9:
+                    self.dump_trace_callback()
+                elif key == self.wnd.keys.PAGE_UP:
+                    self.set_list_window.switch((self.set_list.current_index or 0) - 1)
+                elif key == self.wnd.keys.PAGE_DOWN:
+                    current = self.set_list.current_index
+                    self.set_list_window.switch(0 if current is None else current + 1)
                 elif key == self.wnd.keys.F12:
                     self.toggle_ui_callback()
 
@@ -483,28 +731,43 @@ class App(WindowConfig):
 
     def mouse_position_event(self, x: int, y: int, dx: int, dy: int) -> None:
         self._imgui_renderer.mouse_position_event(x, y, dx, dy)
+        self.ui_layer.invalidate_motion()
         super().mouse_position_event(x, y, dx, dy)
 
     def mouse_drag_event(self, x: int, y: int, dx: int, dy: int) -> None:
         self._imgui_renderer.mouse_drag_event(x, y, dx, dy)
+        self.ui_layer.invalidate_motion()
         super().mouse_drag_event(x, y, dx, dy)
 
     def mouse_scroll_event(self, x_offset: float, y_offset: float) -> None:
         self._imgui_renderer.mouse_scroll_event(x_offset, y_offset)
+        self.ui_layer.invalidate_motion()
         super().mouse_scroll_event(x_offset, y_offset)
 
     def mouse_press_event(self, x: int, y: int, button: int) -> None:
         self._imgui_renderer.mouse_press_event(x, y, button)
+        self.ui_layer.invalidate()
         super().mouse_press_event(x, y, button)
 
     def mouse_release_event(self, x: int, y: int, button: int) -> None:
         self._imgui_renderer.mouse_release_event(x, y, button)
+        self.ui_layer.invalidate()
         super().mouse_release_event(x, y, button)
 
     def unicode_char_entered(self, char: str) -> None:
         self._imgui_renderer.unicode_char_entered(char)
+        self.ui_layer.invalidate()
         super().unicode_char_entered(char)
 
     def close(self) -> None:
+        self.shader_compiler.close()
+        self.set_list.close()
         self.audio_device.close()
+        self.audio_textures.release()
+        self.ui_layer.release()
+        self.shader_viewer.release()
+        self.frame_output.close()
+        self.config.set("ui_rate", self.ui_layer.rate)
+        self.config.set("frame_output", self.is_frame_output_enabled)
+        self.config.close()
         super().close()
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+
+from typing import Any, Dict, List, Optional
+
+from rave.project import write_file_atomic
+
+
+# constants
+FLUSH_DELAY_SECONDS: float = 0.5
+WATCH_INTERVAL_SECONDS: float = 1.0
+
+
+class AppConfig:
+    """Application config, loaded once and served from memory.
+
+    Changes are written behind: they mark the config dirty, and a background
+    thread coalesces them into a single atomic write shortly after. The same
+    thread watches the file and reloads it when it is changed by something
+    else, unless there are unsaved changes of our own.
+    """
+
+    path: str
+    data: Dict[str, Any]
+    dirty: bool
+    mtime: Optional[float]
+
+    lock: threading.Lock
+    wake: threading.Event
+    running: bool
+    thread: Optional[threading.Thread]
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.data = {}
+        self.dirty = False
+        self.mtime = None
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+        self.load()
+
+    # methods
+    def start(self) -> None:
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.running = False
+            self.wake.set()
+            self.thread.join()
+            self.thread = None
+
+        self.flush()
+
+    def get_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def load(self) -> None:
+        mtime = self.get_mtime()
+
+        try:
+            with open(self.path, "r") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            data = {}
+
+        with self.lock:
+            self.data = data if isinstance(data, dict) else {}
+            self.mtime = mtime
+
+    def flush(self) -> bool:
+        """Write pending changes to disk, if any.
+
+        Returns:
+            bool: Whether the config on disk is up to date.
+        """
+        with self.lock:
+            if not self.dirty:
+                return True
+            data = json.dumps(self.data).encode("utf-8")
+            self.dirty = False
+
+        if not write_file_atomic(self.path, data):
+            with self.lock:
+                self.dirty = True
+            return False
+
+        self.mtime = self.get_mtime()
+        return True
+
+    def run(self) -> None:
+        while self.running:
+            woken = self.wake.wait(WATCH_INTERVAL_SECONDS)
+
+            if woken:
+                self.wake.clear()
+
+                # coalesce changes made in quick succession
+                self.wake.wait(FLUSH_DELAY_SECONDS)
+                self.wake.clear()
+                self.flush()
+            elif not self.dirty and self.get_mtime() != self.mtime:
+                self.load()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            self.data[key] = value
+            self.dirty = True
+
+        self.wake.set()
+
+    def get_recent_projects(self) -> List[str]:
+        return self.get("recent_projects", [])
+
+    def add_recent_project(self, path: str, limit: int) -> None:
+        # most recent first, without duplicates
+        recent_projects = [x for x in self.get_recent_projects() if x != path]
+        self.set("recent_projects", [path] + recent_projects[: limit - 1])
@@ -0,0 +1,443 @@
+import numpy as np
+import threading
+import time
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from rave.beat_tracker import BeatTracker
+from rave.filterbank import DEFAULT_BAND_SCALE, DEFAULT_NUM_BANDS, Filterbank
+from rave.resampler import DEFAULT_RESAMPLE_SCALE
+from rave.ring_buffer import OverflowPolicy, RingBuffer
+from rave.stft import (
+    DEFAULT_FFT_SIZE,
+    DEFAULT_HOP_SIZE,
+    DEFAULT_WINDOW,
+    NUM_SPECTRA,
+    SPECTRUM_LEFT,
+    SPECTRUM_MID,
+    SPECTRUM_RIGHT,
+    SPECTRUM_SIDE,
+    STFT,
+)
+from rave.tracing import tracer
+from rave.uniform_bindings import UniformSource
+
+
+# type aliases
+PublishCallback = Optional[Callable[["AudioFeatures"], None]]
+
+
+# constants
+RING_BUFFER_MIN_CAPACITY: int = 8192
+RING_BUFFER_CAPACITY_IN_BUFFERS: int = 8
+RING_BUFFER_CAPACITY_IN_FFTS: int = 4
+INT16_MAX: float = 32767.0
+NUM_SNAPSHOTS: int = 3
+WORKER_WAIT_SECONDS: float = 0.1
+
+# analysis stages, each only run while a consumer of its output is active,
+#   the rms is always computed
+STAGE_FFT: int = 1 << 0
+STAGE_STEREO: int = 1 << 1
+STAGE_BANDS: int = 1 << 2
+STAGE_BEAT: int = 1 << 3
+STAGE_HISTORY: int = 1 << 4
+ALL_STAGES: int = STAGE_FFT | STAGE_STEREO | STAGE_BANDS | STAGE_BEAT | STAGE_HISTORY
+
+# stages producing the value of each audio uniform
+UNIFORM_STAGES: Dict[str, int] = {
+    "rAudioFFT": STAGE_FFT,
+    "rAudioFFTMid": STAGE_FFT,
+    "rAudioFFTTex": STAGE_FFT,
+    "rAudioFFTLeft": STAGE_FFT | STAGE_STEREO,
+    "rAudioFFTRight": STAGE_FFT | STAGE_STEREO,
+    "rAudioFFTSide": STAGE_FFT | STAGE_STEREO,
+    "rAudioBands": STAGE_FFT | STAGE_BANDS,
+    "rBeat": STAGE_FFT | STAGE_BEAT,
+    "rBPM": STAGE_FFT | STAGE_BEAT,
+    "rBeatPhase": STAGE_FFT | STAGE_BEAT,
+    "rAudioSpectrogram": STAGE_FFT | STAGE_HISTORY,
+    "rAudioSpectrogramRow": STAGE_FFT | STAGE_HISTORY,
+}
+
+# audio uniforms holding arrays, resampled to the length they are declared with
+FFT_ARRAY_UNIFORMS: List[str] = [
+    "rAudioFFT",
+    "rAudioFFTLeft",
+    "rAudioFFTRight",
+    "rAudioFFTMid",
+    "rAudioFFTSide",
+]
+BAND_ARRAY_UNIFORMS: List[str] = ["rAudioBands"]
+
+
+def get_analysis_stages(uniforms: Iterable[str]) -> int:
+    """Analysis stages needed to produce the given uniforms."""
+    stages = 0
+    for name in uniforms:
+        stages |= UNIFORM_STAGES.get(name, 0)
+    return stages
+
+
+class AudioFeatures:
+    """Snapshot of the audio features at one point in time.
+
+    Published snapshots are read-only: their arrays are only writable while
+    the analyzer fills them, before they are published. Also provides the
+    attributes of an STFT read by AudioTextures.
+    """
+
+    sequence: int
+    timestamp: float
+    rms: float
+    channel_rms: np.ndarray
+    spectra: np.ndarray
+    magnitude: np.ndarray
+    bands: np.ndarray
+    beat: float
+    bpm: float
+    beat_phase: float
+    frame_count: int
+    history: np.ndarray
+    history_size: int
+    num_bins: int
+
+    def __init__(self, history: np.ndarray, num_bands: int) -> None:
+        self.sequence = 0
+        self.timestamp = 0.0
+        self.rms = 0.0
+        self.channel_rms = np.zeros(2, dtype="f4")
+        self.spectra = np.zeros((NUM_SPECTRA, history.shape[1]), dtype="f4")
+        self.magnitude = self.spectra[SPECTRUM_MID]
+        self.bands = np.zeros(num_bands, dtype="f4")
+        self.beat = 0.0
+        self.bpm = 0.0
+        self.beat_phase = 0.0
+        self.frame_count = 0
+
+        # rows up to frame_count are complete, the ring itself is shared
+        self.history = history
+        self.history_size = history.shape[0]
+        self.num_bins = history.shape[1]
+
+        self.set_writeable(False)
+
+    def set_writeable(self, writeable: bool) -> None:
+        for array in (self.channel_rms, self.spectra, self.bands):
+            array.flags.writeable = writeable
+
+
+class AudioFeatureReader:
+    """Getters of the audio uniforms, reading the snapshot pinned in `features`."""
+
+    features: AudioFeatures
+
+    def get_rms(self) -> float:
+        return self.features.rms
+
+    def get_rms_left(self) -> float:
+        return float(self.features.channel_rms[0])
+
+    def get_rms_right(self) -> float:
+        return float(self.features.channel_rms[1])
+
+    def get_fft(self) -> np.ndarray:
+        return self.features.magnitude
+
+    def get_bands(self) -> np.ndarray:
+        return self.features.bands
+
+    def get_beat(self) -> float:
+        return self.features.beat
+
+    def get_bpm(self) -> float:
+        return self.features.bpm
+
+    def get_beat_phase(self) -> float:
+        return self.features.beat_phase
+
+    def get_fft_left(self) -> np.ndarray:
+        return self.features.spectra[SPECTRUM_LEFT]
+
+    def get_fft_right(self) -> np.ndarray:
+        return self.features.spectra[SPECTRUM_RIGHT]
+
+    def get_fft_mid(self) -> np.ndarray:
+        return self.features.spectra[SPECTRUM_MID]
+
+    def get_fft_side(self) -> np.ndarray:
+        return self.features.spectra[SPECTRUM_SIDE]
+
+
+class AudioAnalyzer(AudioFeatureReader):
+    """Computes the audio features exposed to shaders from blocks of int16 frames.
+
+    Independent of where the audio comes from, so that live capture and
+    offline rendering share the same analysis.
+
+    For live capture, `write` only copies the samples into the ring buffer
+    and wakes a worker thread, which runs the analysis and publishes the
+    results as AudioFeatures snapshots through a triple buffer. The render
+    thread pins the latest snapshot with `acquire` once per frame, without
+    locking, so all features of a frame come from the same analysis.
+    `process` runs the analysis synchronously instead.
+
+    Only the stages in `stages` run. The outputs of the others keep their
+    last values, and their state resumes from there once enabled again.
+    """
+
+    sample_rate: int
+    audio_buffer: RingBuffer
+    stft: STFT
+    filterbank: Filterbank
+    beat_tracker: BeatTracker
+    stages: int
+
+    snapshots: List[AudioFeatures]
+    publish_callback: PublishCallback
+    published: int
+    reading: int
+    sequence: int
+    analyzed_count: int
+    features: AudioFeatures
+
+    wake: threading.Event
+    running: bool
+    thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        sample_rate: int = 44100,
+        channels: int = 1,
+        frames_per_buffer: int = 1024,
+        fft_size: int = DEFAULT_FFT_SIZE,
+        hop_size: int = DEFAULT_HOP_SIZE,
+        window: str = DEFAULT_WINDOW,
+        num_bands: int = DEFAULT_NUM_BANDS,
+        band_scale: str = DEFAULT_BAND_SCALE,
+        publish_callback: PublishCallback = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.audio_buffer = RingBuffer(
+            max(
+                frames_per_buffer * RING_BUFFER_CAPACITY_IN_BUFFERS,
+                fft_size * RING_BUFFER_CAPACITY_IN_FFTS,
+                RING_BUFFER_MIN_CAPACITY,
+            ),
+            channels=channels,
+            overflow_policy=OverflowPolicy.OVERWRITE,
+        )
+        self.stft = STFT(
+            fft_size=fft_size, hop_size=hop_size, window=window, channels=channels
+        )
+
+        # the filterbank only depends on the fft size and sample rate
+        self.filterbank = Filterbank(
+            fft_size, sample_rate, num_bands=num_bands, scale=band_scale
+        )
+        self.beat_tracker = BeatTracker(self.stft.num_bins, sample_rate, hop_size)
+        self.stages = ALL_STAGES
+
+        self.snapshots = [
+            AudioFeatures(self.stft.history, num_bands) for _ in range(NUM_SNAPSHOTS)
+        ]
+        self.publish_callback = publish_callback
+        self.published = 0
+        self.reading = 0
+        self.sequence = 0
+        self.analyzed_count = 0
+        self.features = self.snapshots[0]
+
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+    @property
+    def channels(self) -> int:
+        return self.audio_buffer.channels
+
+    def set_stages(self, stages: int) -> None:
+        self.stages = stages
+
+    def start(self) -> None:
+        """Start the worker thread analysing the frames passed to `write`."""
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(
+                target=self.run, name="audio analysis", daemon=True
+            )
+            self.thread.start()
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.running = False
+            self.wake.set()
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+        while self.running:
+            if self.wake.wait(WORKER_WAIT_SECONDS):
+                self.wake.clear()
+                with tracer.span("analysis"):
+                    self.analyze()
+
+    def write(self, frames: np.ndarray) -> None:
+        """Queue a block of frames for the worker thread, the only work done on the audio thread.
+
+        Args:
+            frames (np.ndarray): int16 frames of shape (n, channels).
+        """
+        # copy into the preallocated ring, no allocation of the backlog
+        self.audio_buffer.write(frames)
+        self.wake.set()
+
+    def write_bytes(self, in_data: bytes) -> None:
+        """Queue a block of interleaved int16 samples for the worker thread."""
+        # (frames, channels) view of the interleaved samples, columns are the
+        #   de-interleaved channels as strided views
+        self.write(np.frombuffer(in_data, dtype=np.int16).reshape(-1, self.channels))
+
+    def process(self, frames: np.ndarray) -> None:
+        """Analyse a block of frames right away, on the calling thread.
+
+        Args:
+            frames (np.ndarray): int16 frames of shape (n, channels). Columns
+                may be strided views of interleaved samples.
+        """
+        if len(frames) > 0:
+            self.audio_buffer.write(frames)
+            self.analyze()
+
+    def process_bytes(self, in_data: bytes) -> None:
+        """Analyse a block of interleaved int16 samples right away."""
+        self.process(np.frombuffer(in_data, dtype=np.int16).reshape(-1, self.channels))
+
+    def analyze(self) -> None:
+        """Analyse the frames written since the last analysis and publish a snapshot."""
+        write_count = self.audio_buffer.write_count
+        count = min(write_count - self.analyzed_count, self.audio_buffer.capacity)
+        self.analyzed_count = write_count
+
+        if count <= 0:
+            return
+
+        # rms of the new frames, per channel in one pass
+        frames = self.audio_buffer.latest(count)
+        mean_square = np.square(frames, dtype="f4").mean(axis=0)
+
+        # read once, the stages may be changed by the render thread meanwhile
+        stages = self.stages
+        if not stages & STAGE_FFT:
+            self.stft.skip(self.audio_buffer)
+            self.publish(mean_square)
+            return
+
+        # fft, every pending hop in one batched call
+        spectra = self.stft.process(
+            self.audio_buffer,
+            stereo=bool(stages & STAGE_STEREO),
+            history=bool(stages & STAGE_HISTORY),
+        )
+
+        # bands, one matrix product per new spectrum
+        if len(spectra) > 0 and stages & STAGE_BANDS:
+            self.filterbank.update(self.stft.magnitude)
+
+        # onsets, beats and tempo, advanced by every new hop
+        if stages & STAGE_BEAT:
+            self.beat_tracker.update(spectra[:, SPECTRUM_MID])
+
+        self.publish(mean_square)
+
+    def publish(self, mean_square: np.ndarray) -> None:
+        # a slot neither published nor pinned by the reader
+        slot = next(
+            i for i in range(NUM_SNAPSHOTS) if i != self.published and i != self.reading
+        )
+        features = self.snapshots[slot]
+
+        features.set_writeable(True)
+        features.rms = float(np.sqrt(mean_square.mean())) / INT16_MAX
+        features.channel_rms[:] = np.sqrt(mean_square[[0, -1]]) / INT16_MAX
+        features.spectra[:] = self.stft.spectra
+        features.bands[:] = self.filterbank.bands
+        features.beat = self.beat_tracker.beat
+        features.bpm = self.beat_tracker.bpm
+        features.beat_phase = self.beat_tracker.beat_phase
+        features.frame_count = self.stft.frame_count
+        features.set_writeable(False)
+
+        self.sequence += 1
+        features.sequence = self.sequence
+        features.timestamp = time.perf_counter()
+
+        self.published = slot
+
+        if self.publish_callback is not None:
+            self.publish_callback(features)
+
+    def acquire(self) -> AudioFeatures:
+        """Pin the latest published snapshot as `features`, read by the getters.
+
+        Returns:
+            AudioFeatures: The pinned snapshot, unchanged until the next `acquire`.
+        """
+        while True:
+            slot = self.published
+            self.reading = slot
+
+            # the writer may have reused the slot before it saw it pinned
+            if self.published == slot:
+                break
+
+        self.features = self.snapshots[slot]
+        return self.features
+
+
+def get_audio_array_scales(fft_scale: str = DEFAULT_RESAMPLE_SCALE) -> Dict[str, str]:
+    """Resample scale of each audio array uniform, see `UniformBindingTable.bind_sources`.
+
+    The bands are spaced on their own frequency scale already, so they are
+    always resampled linearly.
+    """
+    scales = {name: fft_scale for name in FFT_ARRAY_UNIFORMS}
+    scales.update((name, DEFAULT_RESAMPLE_SCALE) for name in BAND_ARRAY_UNIFORMS)
+    return scales
+
+
+def get_audio_uniform_sources(
+    analyzer: Any, audio_textures: Any
+) -> Dict[str, UniformSource]:
+    """Value sources of the audio uniforms exposed by RAVE.
+
+    Args:
+        analyzer (Any): Object providing the AudioAnalyzer getters and
+            `features`, looked up on every call so it may be replaced.
+        audio_textures (AudioTextures): Textures backing the audio samplers.
+
+    Returns:
+        Dict[str, UniformSource]: Uniform name to value source.
+    """
+    return {
+        "rAudioRMS": lambda *_: analyzer.get_rms(),
+        "rAudioRMSLeft": lambda *_: analyzer.get_rms_left(),
+        "rAudioRMSRight": lambda *_: analyzer.get_rms_right(),
+        "rAudioFFT": lambda *_: analyzer.get_fft(),
+        "rAudioFFTLeft": lambda *_: analyzer.get_fft_left(),
+        "rAudioFFTRight": lambda *_: analyzer.get_fft_right(),
+        "rAudioFFTMid": lambda *_: analyzer.get_fft_mid(),
+        "rAudioFFTSide": lambda *_: analyzer.get_fft_side(),
+        "rAudioBands": lambda *_: analyzer.get_bands(),
+        "rBeat": lambda *_: analyzer.get_beat(),
+        "rBPM": lambda *_: analyzer.get_bpm(),
+        "rBeatPhase": lambda *_: analyzer.get_beat_phase(),
+        # audio textures, only uploaded when the shader samples them
+        "rAudioFFTTex": lambda *_: audio_textures.update_fft(analyzer.features),
+        "rAudioSpectrogram": lambda *_: audio_textures.update_spectrogram(
+            analyzer.features
+        ),
+        "rAudioSpectrogramRow": lambda *_: audio_textures.get_spectrogram_row(
+            analyzer.features
+        ),
+    }
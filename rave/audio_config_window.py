@@ -2,23 +2,47 @@ import imgui
 
 from typing import Callable, List, Optional
 
+from rave.audio_source import DEFAULT_SIGNAL, SIGNALS, SOURCE_TYPES
+from rave.filterbank import BAND_SCALES, DEFAULT_BAND_SCALE, DEFAULT_NUM_BANDS
 from rave.project import Project
+from rave.scripting_window import ERROR_TEXT_COLOR
+from rave.stft import (
+    DEFAULT_FFT_SIZE,
+    DEFAULT_HOP_SIZE,
+    DEFAULT_WINDOW,
+    FFT_SIZES,
+    WINDOW_FUNCTIONS,
+)
 from rave.tool_window import ToolWindow
 
 
-ApplyAudioConfigCallback = Optional[Callable[[int, int, int, int], None]]
+ApplyAudioConfigCallback = Optional[
+    Callable[[str, str, str, bool, int, int, int, int, int, int, str, int, str], None]
+]
 
 
 SAMPLE_RATES: List[str] = ["44100", "48000"]
 CHANNELS: List[str] = ["mono", "stereo"]
+FFT_SIZE_NAMES: List[str] = [str(x) for x in FFT_SIZES]
+WINDOWS: List[str] = list(WINDOW_FUNCTIONS.keys())
 
 
 class AudioConfigWindow(ToolWindow):
+    source_type_index: int
+    source_path: str
+    signal_index: int
+    use_process: bool
     all_devices: List[str]
     current_device_index: int
     sample_rate_index: int
     num_channels_index: int
     frames_per_buffer: int
+    fft_size_index: int
+    hop_size: int
+    window_index: int
+    num_bands: int
+    band_scale_index: int
+    error: Optional[str]
 
     apply_audio_config_callback: ApplyAudioConfigCallback
 
@@ -29,20 +53,47 @@ class AudioConfigWindow(ToolWindow):
         opened: bool = False,
     ) -> None:
         super().__init__("Audio Config", opened)
+        self.source_type_index = 0
+        self.source_path = ""
+        self.signal_index = SIGNALS.index(DEFAULT_SIGNAL)
+        self.use_process = False
         self.all_devices = []
         self.current_device_index = default_device_index
         self.sample_rate_index = 0
         self.num_channels_index = 0
         self.frames_per_buffer = 1024
+        self.fft_size_index = FFT_SIZES.index(DEFAULT_FFT_SIZE)
+        self.hop_size = DEFAULT_HOP_SIZE
+        self.window_index = WINDOWS.index(DEFAULT_WINDOW)
+        self.num_bands = DEFAULT_NUM_BANDS
+        self.band_scale_index = BAND_SCALES.index(DEFAULT_BAND_SCALE)
+        self.error = None
         self.apply_audio_config_callback = apply_audio_config_callback
 
     def set_all_devices(self, all_devices: List[str]) -> None:
         self.all_devices = all_devices
 
+    def set_error(self, error: Optional[str]) -> None:
+        """Show why the last config could not be applied, None once one was."""
+        self.error = error
+
     def draw(self, project: Project, **kwargs) -> None:
-        _, self.current_device_index = imgui.combo(
-            "Device", self.current_device_index, self.all_devices
+        _, self.source_type_index = imgui.combo(
+            "Source", self.source_type_index, SOURCE_TYPES
         )
+
+        source_type = SOURCE_TYPES[self.source_type_index]
+        if source_type == "device":
+            _, self.current_device_index = imgui.combo(
+                "Device", self.current_device_index, self.all_devices
+            )
+        elif source_type == "file":
+            _, self.source_path = imgui.input_text("File", self.source_path, 1024)
+        else:
+            _, self.signal_index = imgui.combo("Signal", self.signal_index, SIGNALS)
+
+        _, self.use_process = imgui.checkbox("Separate Process", self.use_process)
+
         _, self.sample_rate_index = imgui.combo(
             "Sample Rate (Hz)", self.sample_rate_index, SAMPLE_RATES
         )
@@ -53,12 +104,45 @@ class AudioConfigWindow(ToolWindow):
             "Frames Per Buffer", self.frames_per_buffer
         )
 
+        imgui.separator()
+
+        _, self.fft_size_index = imgui.combo(
+            "FFT Size", self.fft_size_index, FFT_SIZE_NAMES
+        )
+        _, self.hop_size = imgui.input_int("Hop Size", self.hop_size)
+        _, self.window_index = imgui.combo("Window", self.window_index, WINDOWS)
+
+        fft_size = FFT_SIZES[self.fft_size_index]
+        self.hop_size = min(max(self.hop_size, 1), fft_size)
+
+        imgui.separator()
+
+        _, self.num_bands = imgui.input_int("Bands", self.num_bands)
+        _, self.band_scale_index = imgui.combo(
+            "Band Scale", self.band_scale_index, BAND_SCALES
+        )
+
+        self.num_bands = max(self.num_bands, 1)
+
         if imgui.button("Apply") and self.apply_audio_config_callback is not None:
             self.apply_audio_config_callback(
+                source_type=source_type,
+                source_path=self.source_path,
+                signal=SIGNALS[self.signal_index],
+                use_process=self.use_process,
                 input_device_index=self.current_device_index,
                 sample_rate=int(SAMPLE_RATES[self.sample_rate_index]),
                 channels=(
                     2 if CHANNELS[self.num_channels_index].lower() == "stereo" else 1
                 ),
                 frames_per_buffer=self.frames_per_buffer,
+                fft_size=fft_size,
+                hop_size=self.hop_size,
+                window=WINDOWS[self.window_index],
+                num_bands=self.num_bands,
+                band_scale=BAND_SCALES[self.band_scale_index],
             )
+
+        if self.error is not None:
+            imgui.text_colored("Error", *ERROR_TEXT_COLOR)
+            imgui.text_wrapped(self.error)
@@ -1,25 +1,51 @@
-import audioop
 import numpy as np
-import pyaudiowpatch as pyaudio
 
-from typing import List
+from typing import List, Optional, Union
 
+from rave.audio_analyzer import ALL_STAGES, AudioAnalyzer, AudioFeatures
+from rave.audio_process import AudioProcess
+from rave.audio_source import (
+    PA_CONTINUE,
+    AudioSource,
+    FileAudioSource,
+    create_audio_source,
+)
+from rave.filterbank import DEFAULT_BAND_SCALE, DEFAULT_NUM_BANDS
+from rave.stft import DEFAULT_FFT_SIZE, DEFAULT_HOP_SIZE, DEFAULT_WINDOW
+from rave.tracing import tracer
 
-class AudioDevice:
-    source: pyaudio.PyAudio
-    stream: pyaudio.Stream
-    audio_buffer: np.ndarray
-
-    rms: float
-    fft: np.ndarray
 
-    def __init__(self, default_frames_pef_buffer: int = 1024) -> None:
-        self.source = pyaudio.PyAudio()
-        self.stream = None
-        self.audio_buffer = np.asanyarray([], dtype="f4")
+class AudioDevice:
+    source: AudioSource
+    analyzer: Union[AudioAnalyzer, AudioProcess]
+    stages: int
+
+    def __init__(self, source: Optional[AudioSource] = None) -> None:
+        self.source = source if source is not None else create_audio_source()
+        self.analyzer = AudioAnalyzer()
+        self.stages = ALL_STAGES
+
+    @property
+    def features(self) -> AudioFeatures:
+        return self.analyzer.features
+
+    def acquire(self) -> AudioFeatures:
+        """Pin the latest audio features for the frame about to be rendered."""
+        return self.analyzer.acquire()
+
+    def set_stages(self, stages: int) -> None:
+        """Run only the analysis stages whose features are consumed."""
+        if stages != self.stages:
+            self.stages = stages
+            self.analyzer.set_stages(stages)
+
+    def set_source(self, source: AudioSource) -> None:
+        """Replace the audio source, it is started by the next `start`."""
+        if source is self.source:
+            return
 
-        self.rms = 0.0
-        self.fft = np.asanyarray([0] * int(default_frames_pef_buffer / 2), dtype="f4")
+        self.source.terminate()
+        self.source = source
 
     def start(
         self,
@@ -27,57 +53,146 @@ class AudioDevice:
         sample_rate: int = 44100,
         channels: int = 2,
         frames_per_buffer: int = 1024,
+        fft_size: int = DEFAULT_FFT_SIZE,
+        hop_size: int = DEFAULT_HOP_SIZE,
+        window: str = DEFAULT_WINDOW,
+        num_bands: int = DEFAULT_NUM_BANDS,
+        band_scale: str = DEFAULT_BAND_SCALE,
+        source: Optional[AudioSource] = None,
     ) -> None:
-        if self.stream is not None:
-            self.stream.close()
+        """Start capturing and analysing, from a new source if one is given.
+
+        Raises:
+            Exception: If the new source cannot deliver audio, such as a missing
+                or invalid file. The previous source and analyzer keep running.
+        """
+        if source is None:
+            source = self.source
+
+        # analyse the format the source actually delivers, found before anything stops
+        try:
+            sample_rate, channels = source.get_format(sample_rate, channels)
+        except Exception:
+            if source is not self.source:
+                source.terminate()
+            raise
+
+        self.source.close()
+        self.analyzer.close()
+        self.set_source(source)
+
+        self.analyzer = AudioAnalyzer(
+            sample_rate=sample_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+            fft_size=fft_size,
+            hop_size=hop_size,
+            window=window,
+            num_bands=num_bands,
+            band_scale=band_scale,
+        )
+        self.analyzer.set_stages(self.stages)
+        self.analyzer.start()
 
-        self.audio_buffer = np.asanyarray([])
-        self.fft = np.asanyarray([0.0] * int(frames_per_buffer / 2), dtype="f4")
+        self.source.open(
+            self.stream_callback,
+            input_device_index=input_device_index,
+            sample_rate=sample_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+        )
 
-        self.stream = self.source.open(
+    def start_process(
+        self,
+        source_type: str,
+        source_path: str,
+        signal: str,
+        input_device_index: int,
+        sample_rate: int = 44100,
+        channels: int = 2,
+        frames_per_buffer: int = 1024,
+        fft_size: int = DEFAULT_FFT_SIZE,
+        hop_size: int = DEFAULT_HOP_SIZE,
+        window: str = DEFAULT_WINDOW,
+        num_bands: int = DEFAULT_NUM_BANDS,
+        band_scale: str = DEFAULT_BAND_SCALE,
+    ) -> None:
+        """Capture and analyse in a child process, which opens its own source.
+
+        Raises:
+            Exception: If the file source cannot be played. The previous source
+                and analyzer keep running.
+        """
+        if source_type == "file":
+            FileAudioSource(source_path).get_format(sample_rate, channels)
+
+        self.source.close()
+        self.analyzer.close()
+
+        self.analyzer = AudioProcess(
+            source_type=source_type,
+            source_path=source_path,
+            signal=signal,
             input_device_index=input_device_index,
-            rate=sample_rate,
+            sample_rate=sample_rate,
             channels=channels,
             frames_per_buffer=frames_per_buffer,
-            format=pyaudio.paInt16,
-            input=True,
-            stream_callback=self.stream_callback,
+            fft_size=fft_size,
+            hop_size=hop_size,
+            window=window,
+            num_bands=num_bands,
+            band_scale=band_scale,
         )
+        self.analyzer.set_stages(self.stages)
+        self.analyzer.start()
 
     def close(self) -> None:
-        if self.stream is not None:
-            self.stream.close()
-
         self.source.terminate()
+        self.analyzer.close()
 
     def get_default_loopback_device_index(self) -> int:
-        return self.source.get_default_wasapi_loopback()["index"]
+        return self.source.get_default_device_index()
 
     def get_all_devices(self) -> List[str]:
-        return [x["name"] for x in self.source.get_device_info_generator()]
+        return self.source.get_all_devices()
 
     def stream_callback(self, in_data, frame_count, time_info, status) -> None:
-        # rms
-        self.rms = audioop.rms(in_data, 2) / 32767.0
+        with tracer.span("stream_callback"):
+            self.analyzer.write_bytes(in_data)
+        return (in_data, PA_CONTINUE)
 
-        chunk_size = int(self.stream._frames_per_buffer / 2)
+    def get_rms(self) -> float:
+        return self.analyzer.get_rms()
 
-        # fft
-        self.audio_buffer = np.append(
-            self.audio_buffer, np.frombuffer(in_data, dtype=np.int16)
-        )
-        if len(self.audio_buffer) >= chunk_size:
-            chunk = self.audio_buffer[:chunk_size]
+    def get_rms_left(self) -> float:
+        return self.analyzer.get_rms_left()
 
-            res = np.abs(np.fft.fft(chunk) / chunk_size)
-            self.fft = res[: len(res) // 2]
+    def get_rms_right(self) -> float:
+        return self.analyzer.get_rms_right()
 
-            self.audio_buffer = self.audio_buffer[chunk_size:]
+    def get_fft(self) -> np.ndarray:
+        return self.analyzer.get_fft()
 
-        return (in_data, pyaudio.paContinue)
+    def get_bands(self) -> np.ndarray:
+        return self.analyzer.get_bands()
 
-    def get_rms(self) -> float:
-        return self.rms
+    def get_fft_left(self) -> np.ndarray:
+        return self.analyzer.get_fft_left()
+
+    def get_fft_right(self) -> np.ndarray:
+        return self.analyzer.get_fft_right()
+
+    def get_fft_mid(self) -> np.ndarray:
+        return self.analyzer.get_fft_mid()
+
+    def get_fft_side(self) -> np.ndarray:
+        return self.analyzer.get_fft_side()
+
+    def get_beat(self) -> float:
+        return self.analyzer.get_beat()
+
+    def get_bpm(self) -> float:
+        return self.analyzer.get_bpm()
 
-    def get_fft(self) -> List[float]:
-        return self.fft
+    def get_beat_phase(self) -> float:
+        return self.analyzer.get_beat_phase()
@@ -0,0 +1,426 @@
+import multiprocessing
+import numpy as np
+import os
+import time
+
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional
+
+from rave.audio_analyzer import (
+    ALL_STAGES,
+    AudioAnalyzer,
+    AudioFeatureReader,
+    AudioFeatures,
+)
+from rave.audio_source import DEFAULT_SIGNAL, create_audio_source
+from rave.stft import NUM_SPECTRA
+
+
+# constants
+SHARED_HEADER_DTYPE: np.dtype = np.dtype(
+    [
+        ("sequence", "<u8"),
+        ("frame_count", "<i8"),
+        ("timestamp", "<f8"),
+        ("rms", "<f4"),
+        ("beat", "<f4"),
+        ("bpm", "<f4"),
+        ("beat_phase", "<f4"),
+        ("stages", "<u4"),
+        ("padding", "<u4"),
+    ]
+)
+MAX_READ_ATTEMPTS: int = 64
+LIVENESS_CHECK_SECONDS: float = 0.5
+RESTART_DELAY_SECONDS: float = 1.0
+MIN_UPTIME_SECONDS: float = 5.0
+MAX_FAILED_STARTS: int = 3
+SHUTDOWN_TIMEOUT_SECONDS: float = 2.0
+PARENT_CHECK_SECONDS: float = 0.5
+
+
+class SharedFeatures:
+    """AudioFeatures laid out as fixed-size arrays in a shared memory block.
+
+    Guarded by a sequence counter used as a seqlock: the writer makes it odd
+    before changing the arrays and even again afterwards. A reader copies the
+    arrays and retries when the counter was odd or changed meanwhile, so it
+    never pairs values of two different updates. The spectrogram history is
+    read in place: rows up to `frame_count` are complete.
+    """
+
+    header: np.ndarray
+    channel_rms: np.ndarray
+    spectra: np.ndarray
+    bands: np.ndarray
+    history: np.ndarray
+
+    def __init__(
+        self, buffer: Any, num_bins: int, num_bands: int, history_size: int
+    ) -> None:
+        offset = 0
+
+        def view(dtype: Any, shape: tuple) -> np.ndarray:
+            nonlocal offset
+            array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.header = view(SHARED_HEADER_DTYPE, (1,))
+        self.channel_rms = view("<f4", (2,))
+        self.spectra = view("<f4", (NUM_SPECTRA, num_bins))
+        self.bands = view("<f4", (num_bands,))
+        self.history = view("<f4", (history_size, num_bins))
+
+    @staticmethod
+    def get_size(num_bins: int, num_bands: int, history_size: int) -> int:
+        return SHARED_HEADER_DTYPE.itemsize + 4 * (
+            2 + NUM_SPECTRA * num_bins + num_bands + history_size * num_bins
+        )
+
+    def release(self) -> None:
+        # views must be gone before the shared memory can be closed
+        self.header = self.channel_rms = self.spectra = None
+        self.bands = self.history = None
+
+    def get_stages(self) -> int:
+        return int(self.header[0]["stages"])
+
+    def set_stages(self, stages: int) -> None:
+        """Request analysis stages from the child, a single word outside the seqlock."""
+        self.header[0]["stages"] = stages
+
+    def reset(self) -> None:
+        """Start a new history, for a new analyzer."""
+        header = self.header[0]
+        # odd while written, even if a child died halfway through a write
+        header["sequence"] = int(header["sequence"]) | 1
+        header["frame_count"] = 0
+        header["sequence"] += 1
+
+    def write(self, features: AudioFeatures) -> None:
+        header = self.header[0]
+        previous_frame_count = int(header["frame_count"])
+
+        header["sequence"] += 1
+        header["rms"] = features.rms
+        header["beat"] = features.beat
+        header["bpm"] = features.bpm
+        header["beat_phase"] = features.beat_phase
+        header["timestamp"] = features.timestamp
+        self.channel_rms[:] = features.channel_rms
+        self.spectra[:] = features.spectra
+        self.bands[:] = features.bands
+
+        # only the rows added since the last write, at most one full ring
+        history_size = len(self.history)
+        first = max(previous_frame_count, features.frame_count - history_size)
+        for row in range(first, features.frame_count):
+            y = row % history_size
+            self.history[y] = features.history[y]
+
+        header["frame_count"] = features.frame_count
+        header["sequence"] += 1
+
+    def read(self, features: AudioFeatures) -> bool:
+        """Copy the latest consistent update into `features`.
+
+        Returns:
+            bool: Whether a consistent update was read.
+        """
+        header = self.header[0]
+
+        for _ in range(MAX_READ_ATTEMPTS):
+            sequence = int(header["sequence"])
+            if sequence % 2 == 1:
+                continue
+
+            if sequence == features.sequence:
+                return True
+
+            features.set_writeable(True)
+            features.channel_rms[:] = self.channel_rms
+            features.spectra[:] = self.spectra
+            features.bands[:] = self.bands
+            features.set_writeable(False)
+            rms = float(header["rms"])
+            beat = float(header["beat"])
+            bpm = float(header["bpm"])
+            beat_phase = float(header["beat_phase"])
+            timestamp = float(header["timestamp"])
+            frame_count = int(header["frame_count"])
+
+            if int(header["sequence"]) == sequence:
+                features.rms = rms
+                features.beat = beat
+                features.bpm = bpm
+                features.beat_phase = beat_phase
+                features.timestamp = timestamp
+                features.frame_count = frame_count
+                features.sequence = sequence
+                return True
+
+        return False
+
+
+def run_audio_process(
+    shared_memory_name: str,
+    parent_pid: int,
+    stop_event: Any,
+    errors: Any,
+    source_settings: Dict[str, Any],
+    analysis_settings: Dict[str, Any],
+) -> None:
+    """Entry point of the audio process: capture and analyse until told to stop.
+
+    An error is sent through `errors` to the parent, which reports it, and
+    the process exits with code 1.
+    """
+    # spawned children share the parent's resource tracker, which unlinks the
+    #   block only if the parent never does
+    block = shared_memory.SharedMemory(name=shared_memory_name)
+    source = analyzer = shared = None
+
+    try:
+        source = create_audio_source(
+            source_settings["source_type"],
+            source_settings["source_path"],
+            source_settings["signal"],
+        )
+        sample_rate, channels = source.get_format(
+            analysis_settings["sample_rate"], analysis_settings["channels"]
+        )
+        analysis_settings.update(sample_rate=sample_rate, channels=channels)
+
+        analyzer = AudioAnalyzer(**analysis_settings)
+        shared = SharedFeatures(
+            block.buf,
+            analyzer.stft.num_bins,
+            len(analyzer.filterbank.bands),
+            analyzer.stft.history_size,
+        )
+        shared.reset()
+
+        def publish(features: AudioFeatures) -> None:
+            shared.write(features)
+            # stages requested by the render process, from the next analysis on
+            analyzer.set_stages(shared.get_stages())
+
+        analyzer.set_stages(shared.get_stages())
+        analyzer.publish_callback = publish
+        analyzer.start()
+
+        source.open(
+            lambda in_data, *_: analyzer.write_bytes(in_data),
+            input_device_index=source_settings["input_device_index"],
+            sample_rate=sample_rate,
+            channels=channels,
+            frames_per_buffer=analysis_settings["frames_per_buffer"],
+        )
+
+        while not stop_event.wait(PARENT_CHECK_SECONDS):
+            # never outlive the app
+            if os.getppid() != parent_pid:
+                break
+    except Exception as e:
+        errors.send(f"{type(e).__name__}: {e}")
+        raise SystemExit(1)
+    finally:
+        if source is not None:
+            source.terminate()
+        if analyzer is not None:
+            analyzer.close()
+        if shared is not None:
+            shared.release()
+        block.close()
+        errors.close()
+
+
+class AudioProcess(AudioFeatureReader):
+    """Runs an audio source and its analysis in a child process.
+
+    The child publishes features into shared memory, which the render
+    process maps and reads with `acquire`, so neither process can starve the
+    other of the GIL. A child that dies is started again, unless it keeps
+    dying right after starting, like on a missing file or device: the last
+    error it sent is then kept in `error` and it is left stopped.
+    """
+
+    source_settings: Dict[str, Any]
+    analysis_settings: Dict[str, Any]
+
+    context: Any
+    block: Optional[shared_memory.SharedMemory]
+    shared: Optional[SharedFeatures]
+    process: Optional[multiprocessing.Process]
+    stop_event: Any
+    errors: Any
+
+    restarts: int
+    failed_starts: int
+    error: Optional[str]
+    last_check: float
+    started_at: float
+    died_at: Optional[float]
+
+    def __init__(
+        self,
+        source_type: str = "device",
+        source_path: str = "",
+        signal: str = DEFAULT_SIGNAL,
+        input_device_index: int = 0,
+        **analysis_settings,
+    ) -> None:
+        self.source_settings = {
+            "source_type": source_type,
+            "source_path": source_path,
+            "signal": signal,
+            "input_device_index": input_device_index,
+        }
+        self.analysis_settings = analysis_settings
+
+        # the layout only depends on the analysis settings
+        analyzer = AudioAnalyzer(**analysis_settings)
+        num_bins = analyzer.stft.num_bins
+        num_bands = len(analyzer.filterbank.bands)
+        history_size = analyzer.stft.history_size
+
+        self.context = multiprocessing.get_context("spawn")
+        self.block = shared_memory.SharedMemory(
+            create=True, size=SharedFeatures.get_size(num_bins, num_bands, history_size)
+        )
+        self.shared = SharedFeatures(self.block.buf, num_bins, num_bands, history_size)
+        self.shared.set_stages(ALL_STAGES)
+        self.features = AudioFeatures(self.shared.history, num_bands)
+
+        self.process = None
+        self.stop_event = None
+        self.errors = None
+        self.restarts = 0
+        self.failed_starts = 0
+        self.error = None
+        self.last_check = 0.0
+        self.started_at = 0.0
+        self.died_at = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        self.close_errors()
+        self.stop_event = self.context.Event()
+        self.errors, child_errors = self.context.Pipe(duplex=False)
+        self.process = self.context.Process(
+            target=run_audio_process,
+            args=(
+                self.block.name,
+                os.getpid(),
+                self.stop_event,
+                child_errors,
+                self.source_settings,
+                self.analysis_settings,
+            ),
+            name="rave audio",
+            daemon=True,
+        )
+        self.process.start()
+        self.started_at = time.perf_counter()
+
+        # only the child writes to the pipe
+        child_errors.close()
+
+    def receive_error(self) -> Optional[str]:
+        """The error sent by a dead child, None if it died without sending one."""
+        try:
+            return self.errors.recv() if self.errors.poll() else None
+        except EOFError:
+            return None
+
+    def close_errors(self) -> None:
+        if self.errors is not None:
+            self.errors.close()
+            self.errors = None
+
+    def stop(self) -> None:
+        self.close_errors()
+        if self.process is None:
+            return
+
+        self.stop_event.set()
+        self.process.join(SHUTDOWN_TIMEOUT_SECONDS)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.process = None
+
+    def close(self) -> None:
+        self.stop()
+
+        if self.block is not None:
+            self.shared.release()
+            self.shared = None
+            self.features.history = None
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def check(self, now: float) -> None:
+        """Start the child again if it died, after a short delay.
+
+        Args:
+            now (float): Current `time.perf_counter()` value.
+        """
+        if self.process is None or self.process.is_alive():
+            self.died_at = None
+            return
+
+        if self.died_at is None:
+            self.died_at = now
+            self.error = self.receive_error()
+
+            # a child that cannot open its source dies while starting up
+            if now - self.started_at < MIN_UPTIME_SECONDS:
+                self.failed_starts += 1
+            else:
+                self.failed_starts = 0
+
+            reason = f": {self.error}" if self.error is not None else ""
+            if self.failed_starts >= MAX_FAILED_STARTS:
+                print(
+                    f"Audio process failed to start {self.failed_starts} times"
+                    f", not restarting{reason}"
+                )
+                self.close_errors()
+                self.process = None
+                return
+
+            print(
+                f"Audio process exited with code {self.process.exitcode}"
+                f"{reason}, restarting"
+            )
+        elif now - self.died_at >= RESTART_DELAY_SECONDS:
+            self.died_at = None
+            self.restarts += 1
+            self.start()
+
+    def set_stages(self, stages: int) -> None:
+        if self.shared is not None:
+            self.shared.set_stages(stages)
+
+    def acquire(self) -> AudioFeatures:
+        """Read the latest features published by the child.
+
+        Returns:
+            AudioFeatures: The features, unchanged until the next `acquire`.
+        """
+        now = time.perf_counter()
+        if now - self.last_check >= LIVENESS_CHECK_SECONDS:
+            self.last_check = now
+            self.check(now)
+
+        if self.shared is not None:
+            self.shared.read(self.features)
+
+        return self.features
@@ -0,0 +1,411 @@
+import numpy as np
+import os
+import threading
+import time
+import wave
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+# type aliases
+StreamCallback = Callable[[bytes, int, Any, int], Any]
+
+
+# constants
+SAMPLE_WIDTH_INT16: int = 2
+INT16_MAX: float = 32767.0
+PA_CONTINUE: int = 0
+SOURCE_TYPES: List[str] = ["device", "file", "synthetic"]
+SIGNALS: List[str] = ["sine", "noise", "click"]
+DEFAULT_SIGNAL: str = "sine"
+DEFAULT_FREQUENCIES: Tuple[float, ...] = (110.0, 440.0, 1760.0)
+DEFAULT_AMPLITUDE: float = 0.5
+DEFAULT_BPM: float = 120.0
+CLICK_DURATION_SECONDS: float = 0.01
+CLICK_FREQUENCY: float = 1000.0
+
+
+class WavReader:
+    """Reads consecutive blocks of int16 frames from a WAV file."""
+
+    file: wave.Wave_read
+    sample_rate: int
+    channels: int
+    num_frames: int
+    position: int
+
+    def __init__(self, path: str) -> None:
+        self.file = wave.open(path, "rb")
+
+        if self.file.getsampwidth() != SAMPLE_WIDTH_INT16:
+            self.file.close()
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+
+        self.sample_rate = self.file.getframerate()
+        self.channels = self.file.getnchannels()
+        self.num_frames = self.file.getnframes()
+        self.position = 0
+
+    @property
+    def duration(self) -> float:
+        return self.num_frames / self.sample_rate
+
+    def close(self) -> None:
+        self.file.close()
+
+    def rewind(self) -> None:
+        self.file.rewind()
+        self.position = 0
+
+    def read_until(self, end: int) -> np.ndarray:
+        """Read the frames from the current position up to frame `end`.
+
+        Returns:
+            np.ndarray: int16 frames of shape (n, channels), empty past the end.
+        """
+        count = max(0, min(end, self.num_frames) - self.position)
+        data = self.file.readframes(count)
+        self.position += count
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+
+
+class RawReader(WavReader):
+    """Reads consecutive blocks of frames from headerless interleaved int16 samples."""
+
+    def __init__(self, path: str, sample_rate: int, channels: int) -> None:
+        self.file = open(path, "rb")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.num_frames = os.path.getsize(path) // (SAMPLE_WIDTH_INT16 * channels)
+        self.position = 0
+
+    def rewind(self) -> None:
+        self.file.seek(0)
+        self.position = 0
+
+    def read_until(self, end: int) -> np.ndarray:
+        count = max(0, min(end, self.num_frames) - self.position)
+        data = self.file.read(count * SAMPLE_WIDTH_INT16 * self.channels)
+        self.position += count
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+
+
+def convert_channels(frames: np.ndarray, channels: int) -> np.ndarray:
+    """Up- or downmix int16 frames of shape (n, c) to `channels` columns."""
+    if frames.shape[1] == channels:
+        return frames
+    if channels == 1:
+        return frames.mean(axis=1, keepdims=True, dtype="f4").astype(np.int16)
+    return np.repeat(frames[:, :1], channels, axis=1)
+
+
+class AudioSource(ABC):
+    """Producer of interleaved int16 audio, delivered in blocks to a stream callback.
+
+    The callback has the signature of a PortAudio stream callback,
+    `(in_data, frame_count, time_info, status)`, so every source feeds the
+    same analysis path.
+    """
+
+    def get_all_devices(self) -> List[str]:
+        return []
+
+    def get_default_device_index(self) -> int:
+        return 0
+
+    def get_format(self, sample_rate: int, channels: int) -> Tuple[int, int]:
+        """Sample rate and channel count actually delivered for a requested format."""
+        return sample_rate, channels
+
+    @abstractmethod
+    def open(
+        self,
+        stream_callback: StreamCallback,
+        input_device_index: int = 0,
+        sample_rate: int = 44100,
+        channels: int = 2,
+        frames_per_buffer: int = 1024,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop delivering audio, the source may be opened again."""
+        pass
+
+    def terminate(self) -> None:
+        """Release the source for good."""
+        self.close()
+
+
+class PortAudioSource(AudioSource):
+    """Captures an input or WASAPI loopback device through PortAudio."""
+
+    def __init__(self) -> None:
+        # only available where PortAudio is, imported on use
+        import pyaudiowpatch as pyaudio
+
+        self.pyaudio = pyaudio
+        self.source = pyaudio.PyAudio()
+        self.stream = None
+
+    def get_all_devices(self) -> List[str]:
+        return [x["name"] for x in self.source.get_device_info_generator()]
+
+    def get_default_device_index(self) -> int:
+        try:
+            return self.source.get_default_wasapi_loopback()["index"]
+        except (OSError, LookupError, AttributeError):
+            pass
+
+        try:
+            return self.source.get_default_input_device_info()["index"]
+        except OSError:
+            return 0
+
+    def open(
+        self,
+        stream_callback: StreamCallback,
+        input_device_index: int = 0,
+        sample_rate: int = 44100,
+        channels: int = 2,
+        frames_per_buffer: int = 1024,
+    ) -> None:
+        self.close()
+        self.stream = self.source.open(
+            input_device_index=input_device_index,
+            rate=sample_rate,
+            channels=channels,
+            frames_per_buffer=frames_per_buffer,
+            format=self.pyaudio.paInt16,
+            input=True,
+            stream_callback=stream_callback,
+        )
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def terminate(self) -> None:
+        self.close()
+        self.source.terminate()
+
+
+class ThreadedAudioSource(AudioSource):
+    """Source producing its blocks in a worker thread.
+
+    When `realtime` is set, blocks are delivered at the pace they would arrive
+    from a sound card, otherwise as fast as the callback consumes them.
+    """
+
+    realtime: bool
+    sample_rate: int
+    channels: int
+    thread: Optional[threading.Thread]
+    running: bool
+
+    def __init__(self, realtime: bool = True) -> None:
+        self.realtime = realtime
+        self.sample_rate = 44100
+        self.channels = 2
+        self.thread = None
+        self.running = False
+
+    @abstractmethod
+    def read_block(self, frame_count: int) -> Optional[np.ndarray]:
+        """Produce the next block of int16 frames, or None when exhausted."""
+        pass
+
+    def open(
+        self,
+        stream_callback: StreamCallback,
+        input_device_index: int = 0,
+        sample_rate: int = 44100,
+        channels: int = 2,
+        frames_per_buffer: int = 1024,
+    ) -> None:
+        self.stop()
+        self.sample_rate, self.channels = self.get_format(sample_rate, channels)
+
+        self.running = True
+        self.thread = threading.Thread(
+            target=self.run,
+            args=(stream_callback, max(1, frames_per_buffer)),
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is not None:
+            self.running = False
+            self.thread.join()
+            self.thread = None
+
+    def close(self) -> None:
+        self.stop()
+
+    def run(self, stream_callback: StreamCallback, frames_per_buffer: int) -> None:
+        start = time.perf_counter()
+        delivered = 0
+
+        while self.running:
+            frames = self.read_block(frames_per_buffer)
+            if frames is None:
+                break
+
+            stream_callback(frames.tobytes(), len(frames), None, 0)
+            delivered += len(frames)
+
+            if self.realtime:
+                delay = start + delivered / self.sample_rate - time.perf_counter()
+                if delay > 0.0:
+                    time.sleep(delay)
+
+        self.running = False
+
+
+class FileAudioSource(ThreadedAudioSource):
+    """Streams a WAV file, or headerless int16 samples, in blocks."""
+
+    path: str
+    loop: bool
+    reader: Optional[WavReader]
+
+    def __init__(self, path: str, loop: bool = True, realtime: bool = True) -> None:
+        super().__init__(realtime)
+        self.path = path
+        self.loop = loop
+        self.reader = None
+
+    def get_format(self, sample_rate: int, channels: int) -> Tuple[int, int]:
+        # wav files play at their own rate, raw files are taken as requested,
+        # opening either raises if the file is missing or cannot be played
+        if os.path.splitext(self.path)[1].lower() == ".wav":
+            reader = WavReader(self.path)
+            sample_rate = reader.sample_rate
+        else:
+            reader = RawReader(self.path, sample_rate, channels)
+        reader.close()
+
+        return sample_rate, channels
+
+    def open(
+        self,
+        stream_callback: StreamCallback,
+        input_device_index: int = 0,
+        sample_rate: int = 44100,
+        channels: int = 2,
+        frames_per_buffer: int = 1024,
+    ) -> None:
+        self.close()
+
+        if os.path.splitext(self.path)[1].lower() == ".wav":
+            self.reader = WavReader(self.path)
+        else:
+            self.reader = RawReader(self.path, sample_rate, channels)
+
+        super().open(
+            stream_callback,
+            input_device_index,
+            sample_rate,
+            channels,
+            frames_per_buffer,
+        )
+
+    def close(self) -> None:
+        super().close()
+
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def read_block(self, frame_count: int) -> Optional[np.ndarray]:
+        frames = self.reader.read_until(self.reader.position + frame_count)
+
+        if len(frames) < frame_count and self.loop and self.reader.num_frames > 0:
+            self.reader.rewind()
+            rest = self.reader.read_until(frame_count - len(frames))
+            frames = np.concatenate((frames, rest))
+
+        if len(frames) == 0:
+            return None
+
+        return convert_channels(frames, self.channels)
+
+
+class SyntheticAudioSource(ThreadedAudioSource):
+    """Generates test signals: a sum of sines, white noise or a click track."""
+
+    signal: str
+    frequencies: Sequence[float]
+    amplitude: float
+    bpm: float
+    position: int
+    random: np.random.Generator
+
+    def __init__(
+        self,
+        signal: str = DEFAULT_SIGNAL,
+        frequencies: Sequence[float] = DEFAULT_FREQUENCIES,
+        amplitude: float = DEFAULT_AMPLITUDE,
+        bpm: float = DEFAULT_BPM,
+        realtime: bool = True,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(realtime)
+
+        if signal not in SIGNALS:
+            raise ValueError(f"unknown signal: {signal}")
+
+        self.signal = signal
+        self.frequencies = frequencies
+        self.amplitude = amplitude
+        self.bpm = bpm
+        self.position = 0
+        self.random = np.random.default_rng(seed)
+
+    def generate(self, frame_count: int) -> np.ndarray:
+        """Generate the next `frame_count` mono samples, in [-1, 1]."""
+        t = (self.position + np.arange(frame_count)) / self.sample_rate
+        self.position += frame_count
+
+        if self.signal == "noise":
+            return self.random.uniform(-1.0, 1.0, frame_count)
+
+        if self.signal == "click":
+            beat = 60.0 / self.bpm
+            since_beat = np.mod(t, beat)
+            return np.where(
+                since_beat < CLICK_DURATION_SECONDS,
+                np.sin(2.0 * np.pi * CLICK_FREQUENCY * since_beat),
+                0.0,
+            )
+
+        phases = 2.0 * np.pi * np.outer(t, self.frequencies)
+        return np.sin(phases).sum(axis=1) / max(1, len(self.frequencies))
+
+    def read_block(self, frame_count: int) -> Optional[np.ndarray]:
+        samples = self.generate(frame_count) * (self.amplitude * INT16_MAX)
+        frames = samples.astype(np.int16)[:, np.newaxis]
+        return np.repeat(frames, self.channels, axis=1)
+
+
+def create_audio_source(
+    source_type: str = "device", path: str = "", signal: str = DEFAULT_SIGNAL
+) -> AudioSource:
+    """Create an audio source by type name, one of SOURCE_TYPES.
+
+    Falls back to a synthetic source when PortAudio is not available.
+    """
+    if source_type == "file":
+        return FileAudioSource(path)
+
+    if source_type == "device":
+        try:
+            return PortAudioSource()
+        except ImportError:
+            print("PortAudio is not available, using a synthetic audio source")
+
+    return SyntheticAudioSource(signal)
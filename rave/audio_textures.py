@@ -0,0 +1,107 @@
+import moderngl
+import numpy as np
+
+from typing import Optional
+
+from rave.audio_analyzer import AudioFeatures
+
+
+# constants
+FFT_TEXTURE_UNIT: int = 1
+SPECTROGRAM_TEXTURE_UNIT: int = 2
+
+
+class AudioTextures:
+    """Float textures holding the audio spectrum, for shaders that sample them.
+
+    `fft_texture` is a (num_bins x 1) texture holding the latest spectrum.
+    `spectrogram_texture` is a (num_bins x history_size) ring of past spectra,
+    of which only the rows added since the last update are uploaded, each with
+    a sub-region write. Textures are created on first use, so shaders that do
+    not declare the samplers cost nothing.
+    """
+
+    ctx: moderngl.Context
+    fft_texture: Optional[moderngl.Texture]
+    spectrogram_texture: Optional[moderngl.Texture]
+    uploaded_history: Optional[np.ndarray]
+    uploaded_rows: int
+
+    def __init__(self, ctx: moderngl.Context) -> None:
+        self.ctx = ctx
+        self.fft_texture = None
+        self.spectrogram_texture = None
+        self.uploaded_history = None
+        self.uploaded_rows = 0
+
+    def release(self) -> None:
+        if self.fft_texture is not None:
+            self.fft_texture.release()
+            self.fft_texture = None
+
+        if self.spectrogram_texture is not None:
+            self.spectrogram_texture.release()
+            self.spectrogram_texture = None
+
+    def create_texture(self, width: int, height: int) -> moderngl.Texture:
+        texture = self.ctx.texture((width, height), 1, dtype="f4")
+        texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        texture.repeat_x = False
+        texture.repeat_y = True
+        return texture
+
+    def update_fft(self, features: AudioFeatures) -> int:
+        """Upload the latest spectrum and bind the texture.
+
+        Returns:
+            int: The texture unit to assign to the sampler uniform.
+        """
+        if self.fft_texture is None or self.fft_texture.width != features.num_bins:
+            if self.fft_texture is not None:
+                self.fft_texture.release()
+            self.fft_texture = self.create_texture(features.num_bins, 1)
+
+        self.fft_texture.write(features.magnitude)
+        self.fft_texture.use(location=FFT_TEXTURE_UNIT)
+        return FFT_TEXTURE_UNIT
+
+    def update_spectrogram(self, features: AudioFeatures) -> int:
+        """Upload the spectrogram rows added since the last update and bind the texture.
+
+        Returns:
+            int: The texture unit to assign to the sampler uniform.
+        """
+        size = (features.num_bins, features.history_size)
+        texture = self.spectrogram_texture
+
+        if texture is None or texture.size != size:
+            if texture is not None:
+                texture.release()
+            texture = self.spectrogram_texture = self.create_texture(*size)
+            self.uploaded_history = None
+
+        # a new analyzer starts a new history
+        if (
+            features.history is not self.uploaded_history
+            or features.frame_count < self.uploaded_rows
+        ):
+            self.uploaded_history = features.history
+            self.uploaded_rows = 0
+
+        # rows older than the ring can hold are gone already
+        first = max(self.uploaded_rows, features.frame_count - features.history_size)
+
+        for row in range(first, features.frame_count):
+            y = row % features.history_size
+            texture.write(
+                features.history[y], viewport=(0, y, features.num_bins, 1), alignment=4
+            )
+
+        self.uploaded_rows = features.frame_count
+
+        texture.use(location=SPECTROGRAM_TEXTURE_UNIT)
+        return SPECTROGRAM_TEXTURE_UNIT
+
+    def get_spectrogram_row(self, features: AudioFeatures) -> int:
+        """Row of the spectrogram texture holding the newest spectrum."""
+        return (features.frame_count - 1) % features.history_size
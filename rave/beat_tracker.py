@@ -0,0 +1,211 @@
+import numpy as np
+
+
+# constants
+MIN_BPM: float = 60.0
+MAX_BPM: float = 200.0
+PREFERRED_BPM: float = 120.0
+TEMPO_PRIOR_WIDTH: float = 1.0
+COMPRESSION: float = 1000.0
+THRESHOLD_TIME_CONSTANT: float = 0.5
+THRESHOLD_DEVIATIONS: float = 1.5
+THRESHOLD_RATIO: float = 1.5
+MIN_FLUX_PER_BIN: float = 0.02
+MIN_ONSET_INTERVAL: float = 0.1
+AUTOCORRELATION_TIME_CONSTANT: float = 4.0
+MIN_TEMPO_CONFIDENCE: float = 0.1
+PHASE_CORRECTION: float = 0.2
+PHASE_WINDOW: float = 0.25
+MAX_BEAT_GAP_SECONDS: float = 2.0
+BEAT_DECAY_SECONDS: float = 0.1
+EPSILON: float = 1e-9
+
+
+class BeatTracker:
+    """Streaming onset, beat and tempo tracker fed with the spectrum of every hop.
+
+    Onsets are detected on the spectral flux, the summed increase of the
+    log-compressed magnitudes since the previous hop, against a threshold
+    that follows its running mean and deviation. The flux above its mean
+    forms the onset envelope, whose autocorrelation over the tempo range is
+    updated recursively with every hop and decays over a few seconds, so
+    memory is bounded by the longest beat period and every hop costs the
+    same. The tempo is the lag with the strongest autocorrelation, weighted
+    towards PREFERRED_BPM to settle octave ambiguities.
+
+    The beat phase runs freely at the tempo and is pulled towards the onsets
+    close to a beat, a beat falling on every wrap while onsets keep coming.
+    `beat` is 1.0 on a beat and decays towards 0.0 in between, `bpm` is 0.0
+    until a tempo was found.
+    """
+
+    hop_rate: float
+    min_flux: float
+    lags: np.ndarray
+    prior: np.ndarray
+    threshold_coefficient: float
+    autocorrelation_decay: float
+    beat_decay: float
+
+    previous: np.ndarray
+    compressed: np.ndarray
+    envelope: np.ndarray
+    autocorrelation: np.ndarray
+    energy: float
+    hop_count: int
+
+    flux_mean: float
+    flux_variance: float
+    was_above: bool
+    last_onset: int
+
+    onset: bool
+    beat: float
+    bpm: float
+    beat_phase: float
+
+    def __init__(self, num_bins: int, sample_rate: int, hop_size: int) -> None:
+        self.hop_rate = sample_rate / hop_size
+        self.min_flux = MIN_FLUX_PER_BIN * num_bins
+
+        # beat periods of the tempo range, in hops
+        min_lag = max(int(np.floor(60.0 * self.hop_rate / MAX_BPM)), 1)
+        max_lag = max(int(np.ceil(60.0 * self.hop_rate / MIN_BPM)), min_lag + 2)
+        self.lags = np.arange(min_lag, max_lag + 1)
+        self.prior = np.exp(
+            -0.5
+            * np.square(
+                np.log2(60.0 * self.hop_rate / self.lags / PREFERRED_BPM)
+                / TEMPO_PRIOR_WIDTH
+            )
+        ).astype("f4")
+
+        self.threshold_coefficient = self.get_coefficient(THRESHOLD_TIME_CONSTANT)
+        self.autocorrelation_decay = 1.0 - self.get_coefficient(
+            AUTOCORRELATION_TIME_CONSTANT
+        )
+        self.beat_decay = 1.0 - self.get_coefficient(BEAT_DECAY_SECONDS)
+
+        self.previous = np.zeros(num_bins, dtype="f4")
+        self.compressed = np.zeros(num_bins, dtype="f4")
+        self.envelope = np.zeros(max_lag + 1, dtype="f4")
+        self.autocorrelation = np.zeros(len(self.lags), dtype="f4")
+        self.energy = 0.0
+        self.hop_count = 0
+
+        self.flux_mean = 0.0
+        self.flux_variance = 0.0
+        self.was_above = False
+        self.last_onset = -(1 << 30)
+
+        self.onset = False
+        self.beat = 0.0
+        self.bpm = 0.0
+        self.beat_phase = 0.0
+
+    def get_coefficient(self, time_constant: float) -> float:
+        """Smoothing coefficient of a one-pole filter updated once per hop."""
+        return 1.0 - float(np.exp(-1.0 / (time_constant * self.hop_rate)))
+
+    def update(self, magnitudes: np.ndarray) -> None:
+        """Advance the tracker by the new hops.
+
+        Args:
+            magnitudes (np.ndarray): Magnitude spectra of shape (hops, num_bins), oldest first.
+        """
+        onset = False
+        for magnitude in magnitudes:
+            onset |= self.update_hop(magnitude)
+        self.onset = onset
+
+    def update_hop(self, magnitude: np.ndarray) -> bool:
+        """Advance the tracker by one hop.
+
+        Returns:
+            bool: Whether an onset was detected.
+        """
+        # spectral flux of the log-compressed magnitudes
+        np.multiply(magnitude, COMPRESSION, out=self.compressed)
+        np.log1p(self.compressed, out=self.compressed)
+        np.subtract(self.compressed, self.previous, out=self.previous)
+        np.maximum(self.previous, 0.0, out=self.previous)
+        flux = float(self.previous.sum())
+        self.previous, self.compressed = self.compressed, self.previous
+
+        # adaptive threshold from the running mean and deviation of the flux,
+        #   above the mean by a ratio too so steady noise does not trigger it
+        coefficient = self.threshold_coefficient
+        deviation = flux - self.flux_mean
+        threshold = max(
+            self.flux_mean + THRESHOLD_DEVIATIONS * np.sqrt(self.flux_variance),
+            self.flux_mean * THRESHOLD_RATIO,
+            self.min_flux,
+        )
+        self.flux_mean += coefficient * deviation
+        self.flux_variance += coefficient * (deviation * deviation - self.flux_variance)
+
+        # an onset on the rising edge, at most one per interval
+        above = flux > threshold
+        onset = (
+            above
+            and not self.was_above
+            and self.hop_count - self.last_onset >= MIN_ONSET_INTERVAL * self.hop_rate
+        )
+        self.was_above = above
+        if onset:
+            self.last_onset = self.hop_count
+
+        self.update_tempo(max(deviation, 0.0))
+        self.update_beat(onset)
+        self.hop_count += 1
+        return onset
+
+    def update_tempo(self, novelty: float) -> None:
+        size = len(self.envelope)
+        index = self.hop_count % size
+        self.envelope[index] = novelty
+
+        # decaying autocorrelation of the envelope, one product per lag
+        decay = self.autocorrelation_decay
+        self.autocorrelation *= decay
+        self.autocorrelation += novelty * self.envelope[(index - self.lags) % size]
+        self.energy = self.energy * decay + novelty * novelty
+
+        if self.energy <= EPSILON:
+            return
+
+        weighted = self.autocorrelation * self.prior
+        best = int(np.argmax(weighted))
+        if self.autocorrelation[best] < MIN_TEMPO_CONFIDENCE * self.energy:
+            return
+
+        # parabolic interpolation between the neighbouring lags
+        lag = float(self.lags[best])
+        if 0 < best < len(weighted) - 1:
+            left, center, right = weighted[best - 1 : best + 2]
+            curvature = left - 2.0 * center + right
+            if curvature < 0.0:
+                lag += 0.5 * float(left - right) / float(curvature)
+
+        self.bpm = 60.0 * self.hop_rate / lag
+
+    def update_beat(self, onset: bool) -> None:
+        self.beat *= self.beat_decay
+
+        if self.bpm <= 0.0:
+            return
+
+        # pull the phase towards onsets close to a beat, off-beats are ignored
+        if onset:
+            error = self.beat_phase - round(self.beat_phase)
+            if abs(error) <= PHASE_WINDOW:
+                self.beat_phase -= PHASE_CORRECTION * error
+
+        # the phase keeps running through breaks, beats only fire with onsets
+        self.beat_phase += self.bpm / (60.0 * self.hop_rate)
+        if self.beat_phase >= 1.0:
+            self.beat_phase %= 1.0
+            if self.hop_count - self.last_onset <= MAX_BEAT_GAP_SECONDS * self.hop_rate:
+                self.beat = 1.0
+        elif self.beat_phase < 0.0:
+            self.beat_phase %= 1.0
@@ -0,0 +1,599 @@
+import itertools
+import json
+import numpy as np
+import os
+import platform
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from rave.audio_analyzer import (
+    AudioAnalyzer,
+    get_audio_array_scales,
+    get_audio_uniform_sources,
+)
+from rave.audio_device import AudioDevice
+from rave.audio_source import SyntheticAudioSource
+from rave.modulation import MODULATION_SOURCES, ModulationEngine
+from rave.project import Modulation, Project, UniformField
+from rave.uniform_bindings import UniformBindingTable, match_uniform_fields
+from rave.uniform_block import UniformBlock
+
+
+# type aliases
+BenchmarkStats = Dict[str, float]
+BenchmarkResults = Dict[str, BenchmarkStats]
+
+
+# constants
+BENCHMARK_FORMAT_VERSION: int = 1
+DEFAULT_ITERATIONS: int = 200
+DEFAULT_WARMUP: int = 10
+DEFAULT_THRESHOLD: float = 0.1
+DEFAULT_BUFFER_SIZES: Tuple[int, ...] = (256, 512, 1024, 2048, 4096)
+DEFAULT_CHANNEL_COUNTS: Tuple[int, ...] = (1, 2)
+DEFAULT_FRAME_SIZES: Tuple[Tuple[int, int], ...] = ((640, 360), (1920, 1080))
+NUM_AUDIO_BLOCKS: int = 16
+NUM_USER_FLOATS: int = 24
+NUM_USER_VECTORS: int = 8
+DEFAULT_MODULATION_COUNTS: Tuple[int, ...] = (1, 48)
+LARGE_SHADER_FUNCTIONS: int = 64
+COMPARED_STATISTIC: str = "median"
+
+UNIFORM_SHADER_TEMPLATE: str = """#version 330 core
+
+uniform vec2 rResolution;
+uniform float rTime;
+uniform float rFrameTime;
+uniform float rAudioRMS;
+uniform float rAudioRMSLeft;
+uniform float rAudioRMSRight;
+uniform float rAudioFFT[512];
+uniform float rAudioFFTLeft[512];
+uniform float rAudioFFTRight[512];
+uniform float rAudioFFTMid[512];
+uniform float rAudioFFTSide[512];
+uniform float rAudioBands[16];
+uniform sampler2D rAudioFFTTex;
+uniform sampler2D rAudioSpectrogram;
+uniform int rAudioSpectrogramRow;
+{declarations}
+out vec4 fragColor;
+
+{functions}
+void main()
+{{
+    vec2 uv = gl_FragCoord.xy / rResolution;
+    int bin = int(uv.x * 511.0);
+    float row = (float(rAudioSpectrogramRow) + 0.5) / 256.0;
+    vec3 color = vec3(
+        rAudioFFT[bin] + rAudioFFTLeft[bin] + rAudioFFTRight[bin],
+        rAudioFFTMid[bin] + rAudioFFTSide[bin] + rAudioBands[bin % 16],
+        texture(rAudioFFTTex, uv).r + texture(rAudioSpectrogram, vec2(uv.x, row)).r
+    );
+    color *= rAudioRMS + rAudioRMSLeft + rAudioRMSRight + fract(rTime + rFrameTime);
+{body}
+    fragColor = vec4(color, 1.0);
+}}
+"""
+
+LARGE_SHADER_FUNCTION_TEMPLATE: str = """
+vec3 layer{index}(vec2 uv, float t)
+{{
+    vec3 c = vec3(0.0);
+    for (int i = 0; i < 8; i++)
+    {{
+        vec2 p = uv * float(i + {index}) + vec2(sin(t + float(i)), cos(t * 0.{index}1));
+        c += vec3(sin(p.x * 3.1), cos(p.y * 2.7), sin(dot(p, p))) / float(i + 1);
+    }}
+    return c * rAudioBands[{index} % 16];
+}}
+"""
+
+
+def create_uniform_shader(large: bool = False) -> str:
+    """Fragment shader using every RAVE uniform and a realistic set of user uniforms.
+
+    Args:
+        large (bool): Whether to add many unrolled functions, to stress the compiler.
+    """
+    declarations = [f"uniform float uParam{i};" for i in range(NUM_USER_FLOATS)]
+    declarations += [f"uniform vec3 uColor{i};" for i in range(NUM_USER_VECTORS)]
+
+    body = [f"    color += uParam{i} * 0.01;" for i in range(NUM_USER_FLOATS)]
+    body += [f"    color *= uColor{i};" for i in range(NUM_USER_VECTORS)]
+
+    functions = []
+    if large:
+        functions = [
+            LARGE_SHADER_FUNCTION_TEMPLATE.format(index=i)
+            for i in range(LARGE_SHADER_FUNCTIONS)
+        ]
+        body += [
+            f"    color += layer{i}(uv, rTime) * 0.01;"
+            for i in range(LARGE_SHADER_FUNCTIONS)
+        ]
+
+    return UNIFORM_SHADER_TEMPLATE.format(
+        declarations="\n".join(declarations),
+        functions="".join(functions),
+        body="\n".join(body),
+    )
+
+
+def summarize(samples: np.ndarray) -> BenchmarkStats:
+    return {
+        "iterations": float(len(samples)),
+        "mean": float(samples.mean()),
+        "median": float(np.median(samples)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+        "min": float(samples.min()),
+        "max": float(samples.max()),
+    }
+
+
+def measure(
+    function: Callable[[], Any],
+    iterations: int = DEFAULT_ITERATIONS,
+    warmup: int = DEFAULT_WARMUP,
+    setup: Optional[Callable[[], Any]] = None,
+) -> BenchmarkStats:
+    """Time repeated calls of a function.
+
+    Args:
+        function (Callable[[], Any]): The measured function.
+        iterations (int): Number of measured calls.
+        warmup (int): Number of calls made before measuring.
+        setup (Optional[Callable[[], Any]]): Called before each call, outside of the measurement.
+
+    Returns:
+        BenchmarkStats: Statistics of the call durations, in milliseconds.
+    """
+    samples = np.empty(iterations, dtype="f8")
+
+    for i in range(warmup + iterations):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+
+        if i >= warmup:
+            samples[i - warmup] = elapsed * 1000.0
+
+    return summarize(samples)
+
+
+def create_audio_blocks(
+    channels: int, frames_per_buffer: int, sample_rate: int = 44100
+) -> List[bytes]:
+    """Interleaved int16 blocks of a synthetic signal, as delivered to the stream callback."""
+    source = SyntheticAudioSource(realtime=False)
+    source.sample_rate = sample_rate
+    source.channels = channels
+    return [
+        source.read_block(frames_per_buffer).tobytes() for _ in range(NUM_AUDIO_BLOCKS)
+    ]
+
+
+def bench_stream_callback(
+    buffer_sizes: Sequence[int] = DEFAULT_BUFFER_SIZES,
+    channel_counts: Sequence[int] = DEFAULT_CHANNEL_COUNTS,
+    iterations: int = DEFAULT_ITERATIONS,
+) -> BenchmarkResults:
+    """Time AudioDevice.stream_callback, the work done on the audio thread per buffer."""
+    results = {}
+
+    for channels in channel_counts:
+        for frames_per_buffer in buffer_sizes:
+            device = AudioDevice(SyntheticAudioSource(realtime=False))
+            device.analyzer = AudioAnalyzer(
+                channels=channels, frames_per_buffer=frames_per_buffer
+            )
+            blocks = itertools.cycle(create_audio_blocks(channels, frames_per_buffer))
+
+            results[f"stream_callback/{channels}ch/{frames_per_buffer}"] = measure(
+                lambda: device.stream_callback(
+                    next(blocks), frames_per_buffer, None, 0
+                ),
+                iterations,
+            )
+            device.close()
+
+    return results
+
+
+def bench_analysis(
+    buffer_sizes: Sequence[int] = DEFAULT_BUFFER_SIZES,
+    channel_counts: Sequence[int] = DEFAULT_CHANNEL_COUNTS,
+    iterations: int = DEFAULT_ITERATIONS,
+) -> BenchmarkResults:
+    """Time the analysis of one buffer, the work done by the analysis worker."""
+    results = {}
+
+    for channels in channel_counts:
+        for frames_per_buffer in buffer_sizes:
+            analyzer = AudioAnalyzer(
+                channels=channels, frames_per_buffer=frames_per_buffer
+            )
+            blocks = itertools.cycle(create_audio_blocks(channels, frames_per_buffer))
+
+            results[f"analysis/{channels}ch/{frames_per_buffer}"] = measure(
+                lambda: analyzer.process_bytes(next(blocks)), iterations
+            )
+
+    return results
+
+
+def bench_modulation(
+    modulation_counts: Sequence[int] = DEFAULT_MODULATION_COUNTS,
+    iterations: int = DEFAULT_ITERATIONS,
+) -> BenchmarkResults:
+    """Time the evaluation of the modulations of a frame, cycling through every source."""
+    results = {}
+
+    analyzer = AudioAnalyzer(channels=2)
+    for block in create_audio_blocks(2, 1024):
+        analyzer.process_bytes(block)
+    analyzer.acquire()
+
+    for count in modulation_counts:
+        members = [(f"uParam{i}", "float") for i in range(count)]
+        project = Project(
+            uniform_fields=[
+                UniformField(name, "1f", 0.0, 0.0, 1.0) for name, _ in members
+            ],
+            modulations=[
+                Modulation(
+                    target=name,
+                    source=MODULATION_SOURCES[i % len(MODULATION_SOURCES)],
+                    index=i,
+                    count=8,
+                )
+                for i, (name, _) in enumerate(members)
+            ],
+        )
+        block = UniformBlock(members)
+        engine = ModulationEngine()
+
+        results[f"modulation/{count}"] = measure(
+            lambda: engine.update(project, block, analyzer.features, 1.0 / 60.0),
+            iterations,
+        )
+
+    return results
+
+
+class GLBenchmark:
+    """Benchmarks needing an OpenGL context: uniform updates, compiles and frames."""
+
+    def __init__(self, backend: Optional[str] = None) -> None:
+        # imported here, so the audio benchmarks run without OpenGL
+        from rave.audio_textures import AudioTextures
+        from rave.offline_renderer import create_headless_context
+        from rave.shader_viewer import ShaderViewer
+
+        self.ctx = create_headless_context(backend)
+        self.size = DEFAULT_FRAME_SIZES[0]
+
+        self.analyzer = AudioAnalyzer(channels=2)
+        self.blocks = itertools.cycle(create_audio_blocks(2, 1024))
+        self.audio_textures = AudioTextures(self.ctx)
+        self.uniform_sources = {
+            "rResolution": lambda time, frametime: self.size,
+            "rTime": lambda time, frametime: time,
+            "rFrameTime": lambda time, frametime: frametime,
+            **get_audio_uniform_sources(self.analyzer, self.audio_textures),
+        }
+
+        # the app's uniform handling, run against a bare project
+        self.project = Project(uniform_fields=[])
+        self.shader_viewer = ShaderViewer(self.update_uniforms_callback)
+
+        self.frame_index = 0
+
+    @property
+    def renderer(self) -> str:
+        return self.ctx.info.get("GL_RENDERER", "unknown")
+
+    def close(self) -> None:
+        self.audio_textures.release()
+        self.ctx.release()
+
+    def update_uniforms_callback(
+        self, bindings: UniformBindingTable, time: float, frametime: float
+    ) -> None:
+        bindings.update(time, frametime)
+
+    def load_shader(self, source: str) -> None:
+        from rave.app import EXPOSED_UNIFORMS
+
+        self.project.fragment_shader_source_code = source
+
+        uniforms = self.shader_viewer.compile(self.ctx, self.project)
+        if uniforms is None:
+            raise RuntimeError(f"benchmark shader failed: {self.shader_viewer.error}")
+
+        bindings = self.shader_viewer.bindings
+        self.project.uniform_fields = match_uniform_fields(
+            bindings, [], EXPOSED_UNIFORMS
+        )
+        bindings.bind_fields(self.project.uniform_fields)
+        bindings.bind_sources(self.uniform_sources, get_audio_array_scales())
+
+    def next_audio_frame(self) -> None:
+        self.analyzer.process_bytes(next(self.blocks))
+        self.analyzer.acquire()
+        self.frame_index += 1
+
+    def bench_update_uniforms(self, iterations: int) -> BenchmarkResults:
+        """Time the per-frame uniform update, with new audio features every frame."""
+        self.load_shader(create_uniform_shader())
+        bindings = self.shader_viewer.bindings
+
+        return {
+            "update_uniforms": measure(
+                lambda: self.update_uniforms_callback(
+                    bindings, self.frame_index / 60.0, 1.0 / 60.0
+                ),
+                iterations,
+                setup=self.next_audio_frame,
+            )
+        }
+
+    def bench_compile(self, iterations: int) -> BenchmarkResults:
+        """Time ShaderViewer.compile of a small and a large shader."""
+        results = {}
+        shaders = {
+            "small": Project().fragment_shader_source_code,
+            "large": create_uniform_shader(large=True),
+        }
+
+        for name, source in shaders.items():
+            project = Project(uniform_fields=[])
+            counter = itertools.count(time.time_ns())
+
+            def setup() -> None:
+                # release the previous program outside the measurement
+                program = self.shader_viewer.program
+                if program is not None:
+                    self.shader_viewer.program = None
+                    self.shader_viewer.release_program(
+                        program, self.shader_viewer.bindings
+                    )
+
+                # unique source, so driver shader caches, also on disk, do not hide the compile
+                project.fragment_shader_source_code = f"{source}\n// {next(counter)}\n"
+
+            results[f"compile/{name}"] = measure(
+                lambda: self.shader_viewer.compile(self.ctx, project),
+                iterations,
+                warmup=1,
+                setup=setup,
+            )
+
+        return results
+
+    def bench_frames(
+        self,
+        iterations: int,
+        frame_sizes: Sequence[Tuple[int, int]] = DEFAULT_FRAME_SIZES,
+    ) -> BenchmarkResults:
+        """Time full headless frames: uniform updates, draw, and waiting for the GPU."""
+        results = {}
+        self.load_shader(create_uniform_shader())
+
+        for size in frame_sizes:
+            self.size = size
+            framebuffer = self.ctx.framebuffer(
+                color_attachments=[self.ctx.texture(size, 4)]
+            )
+
+            def frame() -> None:
+                framebuffer.use()
+                framebuffer.clear()
+                self.shader_viewer.render(self.frame_index / 60.0, 1.0 / 60.0)
+                self.ctx.finish()
+
+            results[f"frame/{size[0]}x{size[1]}"] = measure(
+                frame, iterations, setup=self.next_audio_frame
+            )
+
+            framebuffer.color_attachments[0].release()
+            framebuffer.release()
+
+        return results
+
+
+def run_benchmarks(
+    iterations: int = DEFAULT_ITERATIONS,
+    gl: bool = True,
+    backend: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run the benchmark suite.
+
+    Returns:
+        Dict[str, Any]: JSON serializable report, with the environment and the results.
+    """
+    metadata = {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+    results = bench_stream_callback(iterations=iterations)
+    results.update(bench_analysis(iterations=iterations))
+    results.update(bench_modulation(iterations=iterations))
+
+    if gl:
+        benchmark = GLBenchmark(backend)
+        try:
+            metadata["renderer"] = benchmark.renderer
+            results.update(benchmark.bench_update_uniforms(iterations))
+            results.update(benchmark.bench_compile(max(1, iterations // 10)))
+            results.update(benchmark.bench_frames(iterations))
+        finally:
+            benchmark.close()
+
+    return {"metadata": metadata, "results": results}
+
+
+def compare_results(
+    results: BenchmarkResults,
+    baseline: BenchmarkResults,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Tuple[str, float, float, float]]:
+    """Compare results against a baseline, by the median duration.
+
+    Args:
+        results (BenchmarkResults): Current results.
+        baseline (BenchmarkResults): Stored results to compare to.
+        threshold (float): Relative slowdown above which a benchmark counts as a regression.
+
+    Returns:
+        List[Tuple[str, float, float, float]]: The regressions, as (name, baseline, current, change).
+    """
+    regressions = []
+
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+
+        before = baseline[name][COMPARED_STATISTIC]
+        after = stats[COMPARED_STATISTIC]
+        change = (after - before) / before if before > 0.0 else 0.0
+
+        if change > threshold:
+            regressions.append((name, before, after, change))
+
+    return regressions
+
+
+def format_results(
+    results: BenchmarkResults, baseline: Optional[BenchmarkResults] = None
+) -> str:
+    lines = [f"{'benchmark':<32} {'median ms':>10} {'p95 ms':>10} {'change':>8}"]
+
+    for name, stats in results.items():
+        change = ""
+        if baseline is not None and name in baseline:
+            before = baseline[name][COMPARED_STATISTIC]
+            if before > 0.0:
+                change = f"{(stats[COMPARED_STATISTIC] - before) / before:+.1%}"
+
+        lines.append(
+            f"{name:<32} {stats['median']:>10.4f} {stats['p95']:>10.4f} {change:>8}"
+        )
+
+    return "\n".join(lines)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r") as fp:
+        return json.load(fp)
+
+
+def save_report(path: str, report: Dict[str, Any]) -> None:
+    with open(path, "w") as fp:
+        json.dump(report, fp, indent=2)
+
+
+def run_gpu_comparison(
+    paths: Sequence[str],
+    size: Tuple[int, int] = DEFAULT_FRAME_SIZES[1],
+    frames: int = DEFAULT_ITERATIONS,
+    warmup: int = DEFAULT_WARMUP,
+    backend: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Measure the GPU time per frame of several projects' shaders, offscreen.
+
+    The projects are rendered in turn within each frame, against the same
+    synthetic audio, so drift in clocks or temperature affects all of them
+    alike.
+
+    Returns:
+        Dict[str, Any]: JSON serializable report, with the GPU frame time statistics per project, in milliseconds.
+    """
+    from rave.gpu_timer import GPUTimer
+    from rave.project import load_project
+    from rave.shader_viewer import ShaderViewer
+
+    benchmark = GLBenchmark(backend)
+    benchmark.size = size
+    framebuffer = benchmark.ctx.framebuffer(
+        color_attachments=[benchmark.ctx.texture(size, 4)]
+    )
+
+    try:
+        viewers = []
+        for path in paths:
+            project = load_project(path)
+            if project is None:
+                raise ValueError(f"failed to load project: {path}")
+
+            viewer = ShaderViewer(
+                lambda bindings, time, frametime: bindings.update(time, frametime)
+            )
+            viewer.gpu_timer = GPUTimer(benchmark.ctx, history_size=frames)
+
+            if viewer.compile(benchmark.ctx, project) is None:
+                raise ValueError(f"failed to compile {path}: {viewer.error}")
+            viewer.bindings.bind_sources(
+                benchmark.uniform_sources, get_audio_array_scales()
+            )
+            viewer.bindings.bind_fields(project.uniform_fields)
+
+            viewers.append(viewer)
+
+        for i in range(warmup + frames):
+            benchmark.next_audio_frame()
+
+            for viewer in viewers:
+                framebuffer.use()
+                framebuffer.clear()
+                viewer.render(i / 60.0, 1.0 / 60.0)
+
+            if i == warmup - 1:
+                for viewer in viewers:
+                    viewer.gpu_timer.clear()
+
+        results = {}
+        for path, viewer in zip(paths, viewers):
+            viewer.gpu_timer.flush()
+            results[path] = summarize(viewer.gpu_timer.get_samples())
+
+        metadata = {
+            "version": BENCHMARK_FORMAT_VERSION,
+            "renderer": benchmark.renderer,
+            "size": list(size),
+        }
+    finally:
+        framebuffer.color_attachments[0].release()
+        framebuffer.release()
+        benchmark.close()
+
+    return {"metadata": metadata, "results": results}
+
+
+def format_gpu_comparison(results: BenchmarkResults) -> str:
+    """Side by side GPU time distributions, relative to the first project."""
+    lines = [
+        f"{'project':<32} {'median':>9} {'p95':>9} {'p99':>9} {'max':>9} {'vs first':>9}"
+    ]
+
+    reference = None
+    for path, stats in results.items():
+        if reference is None:
+            reference = stats["median"]
+
+        ratio = stats["median"] / reference if reference > 0.0 else 0.0
+        lines.append(
+            f"{os.path.basename(path):<32} {stats['median']:>9.3f} {stats['p95']:>9.3f} "
+            f"{stats['p99']:>9.3f} {stats['max']:>9.3f} {ratio:>8.2f}x"
+        )
+
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+import moderngl
+
+from moderngl_window.opengl.vao import VAO
+from typing import Optional
+
+
+# constants
+COMPOSITE_VERTEX_SHADER_SOURCE_CODE: str = """#version 330 core
+
+in vec3 in_position;
+in vec2 in_texcoord_0;
+
+out vec2 uv0;
+
+void main()
+{
+    gl_Position = vec4(in_position, 1.0);
+    uv0 = in_texcoord_0;
+}
+"""
+
+COMPOSITE_FRAGMENT_SHADER_SOURCE_CODE: str = """#version 330 core
+
+uniform sampler2D uTexture;
+uniform float uAlpha;
+uniform bool uOpaque;
+
+in vec2 uv0;
+
+out vec4 fragColor;
+
+void main()
+{
+    vec4 color = texture(uTexture, uv0);
+    if (uOpaque)
+    {
+        color.a = 1.0;
+    }
+
+    // premultiplied alpha
+    fragColor = color * uAlpha;
+}
+"""
+
+
+class Compositor:
+    """Draws textures over the whole bound framebuffer, on a shared fullscreen quad.
+
+    The output is premultiplied, so blending over the target takes
+    ONE, ONE_MINUS_SRC_ALPHA. Opaque textures, such as a rendered visual,
+    have their alpha ignored, the others are expected to be premultiplied.
+    """
+
+    VAO: VAO
+    program: Optional[moderngl.Program]
+
+    def __init__(self, vao: VAO) -> None:
+        self.VAO = vao
+        self.program = None
+
+    def release(self) -> None:
+        if self.program is not None:
+            # the geometry caches a vertex array per program
+            vao = self.VAO.vaos.pop(self.program.glo, None)
+            if vao is not None:
+                vao.release()
+            self.program.release()
+            self.program = None
+
+    def draw(
+        self, texture: moderngl.Texture, alpha: float = 1.0, opaque: bool = True
+    ) -> None:
+        """Draw a texture over the whole bound framebuffer, with the current blending."""
+        if self.program is None:
+            self.program = self.VAO.ctx.program(
+                vertex_shader=COMPOSITE_VERTEX_SHADER_SOURCE_CODE,
+                fragment_shader=COMPOSITE_FRAGMENT_SHADER_SOURCE_CODE,
+            )
+            self.program["uTexture"].value = 0
+
+        texture.use(location=0)
+        self.program["uAlpha"].value = alpha
+        self.program["uOpaque"].value = opaque
+        self.VAO.render(self.program)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from typing import Callable, Dict, List, Tuple
+
+
+# type aliases
+FrequencyScale = Tuple[
+    Callable[[np.ndarray], np.ndarray], Callable[[np.ndarray], np.ndarray]
+]
+
+
+# constants
+FREQUENCY_SCALES: Dict[str, FrequencyScale] = {
+    "log": (
+        lambda hz: np.log2(hz),
+        lambda x: np.power(2.0, x),
+    ),
+    "mel": (
+        lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0),
+        lambda mel: 700.0 * (np.power(10.0, mel / 2595.0) - 1.0),
+    ),
+    "bark": (
+        lambda hz: 26.81 * hz / (1960.0 + hz) - 0.53,
+        lambda bark: 1960.0 * (bark + 0.53) / (26.28 - bark),
+    ),
+}
+BAND_SCALES: List[str] = list(FREQUENCY_SCALES.keys())
+DEFAULT_BAND_SCALE: str = "mel"
+DEFAULT_NUM_BANDS: int = 16
+MIN_FREQUENCY: float = 20.0
+
+
+class Filterbank:
+    """Triangular filterbank reducing a magnitude spectrum to a few bands.
+
+    Band edges are spaced evenly on a log, mel or bark frequency scale. The
+    filter matrix is built once per FFT size and sample rate, and restricted
+    to the span of bins any band covers, so reducing a spectrum is a single
+    matrix product over that span. Each band is the weighted mean magnitude of
+    the bins it covers.
+    """
+
+    num_bands: int
+    scale: str
+    fft_size: int
+    sample_rate: int
+
+    matrix: np.ndarray
+    first_bin: int
+    last_bin: int
+
+    bands: np.ndarray
+
+    def __init__(
+        self,
+        fft_size: int,
+        sample_rate: int,
+        num_bands: int = DEFAULT_NUM_BANDS,
+        scale: str = DEFAULT_BAND_SCALE,
+    ) -> None:
+        if scale not in FREQUENCY_SCALES:
+            raise ValueError(f"unknown band scale: {scale}")
+        if num_bands <= 0:
+            raise ValueError("num_bands must be greater than 0")
+
+        self.num_bands = num_bands
+        self.scale = scale
+        self.fft_size = fft_size
+        self.sample_rate = sample_rate
+
+        self.matrix, self.first_bin, self.last_bin = self.build_matrix()
+        self.bands = np.zeros(num_bands, dtype="f4")
+
+    def build_matrix(self) -> Tuple[np.ndarray, int, int]:
+        """Build the (bins, bands) filter matrix.
+
+        Returns:
+            Tuple[np.ndarray, int, int]: The matrix, trimmed to the bins from
+                `first_bin` up to, but not including, `last_bin`.
+        """
+        to_scale, from_scale = FREQUENCY_SCALES[self.scale]
+
+        num_bins = self.fft_size // 2
+        nyquist = self.sample_rate / 2.0
+        bin_hz = np.arange(num_bins) * self.sample_rate / self.fft_size
+
+        # num_bands + 2 edges, each band spans from edge i to edge i + 2
+        edges = from_scale(
+            np.linspace(to_scale(MIN_FREQUENCY), to_scale(nyquist), self.num_bands + 2)
+        )
+        lower = edges[:-2, np.newaxis]
+        center = edges[1:-1, np.newaxis]
+        upper = edges[2:, np.newaxis]
+
+        rising = (bin_hz - lower) / (center - lower)
+        falling = (upper - bin_hz) / (upper - center)
+        weights = np.maximum(0.0, np.minimum(rising, falling))
+
+        # low bands can be narrower than a bin, fall back to the nearest bin
+        empty = weights.sum(axis=1) == 0.0
+        nearest = np.rint(center[:, 0] * self.fft_size / self.sample_rate)
+        nearest = np.clip(nearest.astype(int), 0, num_bins - 1)
+        weights[empty, nearest[empty]] = 1.0
+
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        used = np.flatnonzero(weights.any(axis=0))
+        first_bin, last_bin = int(used[0]), int(used[-1]) + 1
+
+        matrix = np.ascontiguousarray(weights[:, first_bin:last_bin].T, dtype="f4")
+        return matrix, first_bin, last_bin
+
+    def apply(self, spectrum: np.ndarray) -> np.ndarray:
+        """Reduce a spectrum, or a stack of spectra, to bands.
+
+        Args:
+            spectrum (np.ndarray): Magnitudes of shape (..., fft_size / 2).
+
+        Returns:
+            np.ndarray: Band energies of shape (..., num_bands).
+        """
+        return spectrum[..., self.first_bin : self.last_bin] @ self.matrix
+
+    def update(self, spectrum: np.ndarray) -> np.ndarray:
+        """Reduce a single spectrum into the preallocated `bands` array."""
+        np.dot(spectrum[self.first_bin : self.last_bin], self.matrix, out=self.bands)
+        return self.bands
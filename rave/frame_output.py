@@ -0,0 +1,264 @@
+import moderngl
+import numpy as np
+import os
+import time
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+from rave.frame_reader import (
+    DEFAULT_FRAME_RING_NAME,
+    FLAG_BOTTOM_UP,
+    FORMAT_COMPONENTS,
+    FORMAT_RGBA8,
+    FRAME_RING_HEADER_DTYPE,
+    FRAME_RING_MAGIC,
+    FRAME_RING_VERSION,
+    FRAME_SLOT_DTYPE,
+    STATE_CLOSED,
+    STATE_OPEN,
+)
+
+
+# constants
+DEFAULT_NUM_SLOTS: int = 3
+DEFAULT_READBACK_DEPTH: int = 3
+
+# slots start on cache lines
+SLOT_ALIGNMENT: int = 64
+
+
+def align(size: int, alignment: int = SLOT_ALIGNMENT) -> int:
+    return (size + alignment - 1) // alignment * alignment
+
+
+def is_process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # named shared memory goes away with the last process holding it
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class FrameOutput:
+    """Publishes rendered frames into a ring of frames in POSIX shared memory.
+
+    Other processes on the host map the ring with FrameReader and read the
+    frames in place. Captures go through a ring of pixel buffers like the
+    offline renderer's: the framebuffer is read into a buffer asynchronously,
+    and the buffer is copied into the next slot of the ring `depth - 1`
+    frames later, when the GPU is long done with it. That copy is the only
+    one a frame takes on its way to the consumers.
+
+    Each slot carries a sequence number, odd while the slot is written, so
+    readers can tell whether a frame was overwritten while they used it. The
+    ring is recreated under the same name whenever the framebuffer size
+    changes, the old one being marked closed for the readers to reopen.
+    Frames still in flight then, or when the output is closed, are dropped.
+
+    The header records the pid of the writer. A ring of the same name is
+    only replaced when its writer is gone, so a second instance of RAVE
+    cannot take over the ring of the first.
+    """
+
+    ctx: moderngl.Context
+    name: str
+    num_slots: int
+    readback_depth: int
+    size: Tuple[int, int]
+
+    block: Optional[shared_memory.SharedMemory]
+    header: Optional[np.ndarray]
+    slots: Optional[np.ndarray]
+    slot_buffers: List[memoryview]
+    readback_buffers: List[moderngl.Buffer]
+    pending: List[Tuple[float, float]]
+    submitted: int
+
+    def __init__(
+        self,
+        ctx: moderngl.Context,
+        name: str = DEFAULT_FRAME_RING_NAME,
+        num_slots: int = DEFAULT_NUM_SLOTS,
+        readback_depth: int = DEFAULT_READBACK_DEPTH,
+    ) -> None:
+        self.ctx = ctx
+        self.name = name
+        self.num_slots = max(1, num_slots)
+        self.readback_depth = max(1, readback_depth)
+        self.size = (0, 0)
+
+        self.block = None
+        self.header = None
+        self.slots = None
+        self.slot_buffers = []
+        self.readback_buffers = []
+        self.pending = []
+        self.submitted = 0
+
+    @property
+    def frame_count(self) -> int:
+        """Number of frames published since the ring was created."""
+        return 0 if self.header is None else int(self.header[0]["sequence"])
+
+    def open(self, size: Tuple[int, int]) -> None:
+        """Create the ring for frames of the given size."""
+        self.close()
+
+        width, height = size
+        components = FORMAT_COMPONENTS[FORMAT_RGBA8]
+        stride = width * components
+        slot_size = align(stride * height)
+        data_offset = align(
+            FRAME_RING_HEADER_DTYPE.itemsize
+            + self.num_slots * FRAME_SLOT_DTYPE.itemsize
+        )
+        total_size = data_offset + self.num_slots * slot_size
+
+        try:
+            block = shared_memory.SharedMemory(
+                name=self.name, create=True, size=total_size
+            )
+        except FileExistsError:
+            self.reclaim()
+            block = shared_memory.SharedMemory(
+                name=self.name, create=True, size=total_size
+            )
+
+        self.block = block
+        self.size = (width, height)
+        self.header = np.ndarray((1,), dtype=FRAME_RING_HEADER_DTYPE, buffer=block.buf)
+
+        # claimed right away, so other writers see the ring taken
+        self.header[0]["magic"] = FRAME_RING_MAGIC
+        self.header[0]["pid"] = os.getpid()
+        self.slots = np.ndarray(
+            (self.num_slots,),
+            dtype=FRAME_SLOT_DTYPE,
+            buffer=block.buf,
+            offset=FRAME_RING_HEADER_DTYPE.itemsize,
+        )
+        self.slots[:] = 0
+        self.slot_buffers = [
+            block.buf[offset : offset + stride * height]
+            for offset in range(data_offset, total_size, slot_size)
+        ]
+
+        self.readback_buffers = [
+            self.ctx.buffer(reserve=stride * height) for _ in range(self.readback_depth)
+        ]
+        self.pending = []
+        self.submitted = 0
+
+        # the header is complete before readers can see the ring open
+        h = self.header[0]
+        h["version"] = FRAME_RING_VERSION
+        h["format"] = FORMAT_RGBA8
+        h["flags"] = FLAG_BOTTOM_UP
+        h["width"] = width
+        h["height"] = height
+        h["stride"] = stride
+        h["num_slots"] = self.num_slots
+        h["slot_size"] = slot_size
+        h["data_offset"] = data_offset
+        h["sequence"] = 0
+        h["state"] = STATE_OPEN
+
+    def reclaim(self) -> None:
+        """Remove a ring of the same name, left behind by a process that is gone.
+
+        Raises:
+            FileExistsError: If the ring belongs to a running process, or is
+                not a frame ring.
+        """
+        existing = shared_memory.SharedMemory(name=self.name)
+
+        pid = None
+        if existing.size >= FRAME_RING_HEADER_DTYPE.itemsize:
+            header = np.ndarray(
+                (1,), dtype=FRAME_RING_HEADER_DTYPE, buffer=existing.buf
+            )
+            if header[0]["magic"] == FRAME_RING_MAGIC:
+                pid = int(header[0]["pid"])
+            del header
+
+        if pid is None or is_process_alive(pid):
+            # not ours to unlink, neither now nor by the resource tracker at exit
+            resource_tracker.unregister(existing._name, "shared_memory")
+            existing.close()
+            owner = "another program" if pid is None else f"process {pid}"
+            raise FileExistsError(f"shared memory '{self.name}' is in use by {owner}")
+
+        existing.close()
+        existing.unlink()
+
+    def close(self) -> None:
+        """Close the ring, telling the readers, and drop the frames in flight."""
+        for buffer in self.readback_buffers:
+            buffer.release()
+        self.readback_buffers = []
+        self.pending = []
+
+        if self.block is not None:
+            self.header[0]["state"] = STATE_CLOSED
+
+            # views must be gone before the shared memory can be closed
+            for view in self.slot_buffers:
+                view.release()
+            self.slot_buffers = []
+            self.header = None
+            self.slots = None
+
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+        self.size = (0, 0)
+
+    def capture(self, framebuffer: moderngl.Framebuffer, render_time: float) -> None:
+        """Read a rendered frame back, and publish the one read `depth - 1` frames ago.
+
+        Args:
+            framebuffer (moderngl.Framebuffer): Framebuffer holding the frame.
+            render_time (float): Render time of the frame, in seconds.
+        """
+        if framebuffer.size != self.size:
+            self.open(framebuffer.size)
+
+        depth = self.readback_depth
+        index = self.submitted
+
+        # asynchronous read into the pixel buffer, copied out `depth - 1` frames later
+        framebuffer.read_into(
+            self.readback_buffers[index % depth], components=4, alignment=1
+        )
+        # capture timestamps on the monotonic clock every process of the host shares
+        self.pending.append((time.monotonic(), render_time))
+        self.submitted += 1
+
+        ready = index - (depth - 1)
+        if ready >= 0:
+            self.publish(ready)
+
+    def publish(self, index: int) -> None:
+        """Copy a frame read back earlier into its slot of the ring."""
+        slot = self.slots[index % self.num_slots]
+        timestamp, render_time = self.pending.pop(0)
+
+        # odd while the slot is written
+        slot["sequence"] += 1
+        self.readback_buffers[index % self.readback_depth].read_into(
+            self.slot_buffers[index % self.num_slots]
+        )
+        slot["frame"] = index
+        slot["timestamp"] = timestamp
+        slot["time"] = render_time
+        slot["sequence"] += 1
+
+        self.header[0]["sequence"] = index + 1
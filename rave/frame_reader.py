@@ -0,0 +1,251 @@
+import numpy as np
+import time
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+
+# shared memory layout of the frame ring, see FrameOutput
+#   header, then one slot header per slot, then the pixels of each slot
+FRAME_RING_MAGIC: bytes = b"RVFR"
+FRAME_RING_VERSION: int = 1
+FRAME_RING_HEADER_DTYPE: np.dtype = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u2"),
+        ("format", "<u2"),
+        ("flags", "<u4"),
+        ("width", "<u4"),
+        ("height", "<u4"),
+        ("stride", "<u4"),
+        ("num_slots", "<u4"),
+        ("state", "<u4"),
+        ("pid", "<u4"),
+        ("padding", "<u4"),
+        ("slot_size", "<u8"),
+        ("data_offset", "<u8"),
+        ("sequence", "<u8"),
+    ]
+)
+FRAME_SLOT_DTYPE: np.dtype = np.dtype(
+    [
+        ("sequence", "<u8"),
+        ("frame", "<u8"),
+        ("timestamp", "<f8"),
+        ("time", "<f8"),
+    ]
+)
+
+# pixel formats
+FORMAT_RGBA8: int = 1
+FORMAT_COMPONENTS = {FORMAT_RGBA8: 4}
+
+# flags
+FLAG_BOTTOM_UP: int = 1 << 0
+
+# states of the ring, a closed ring was replaced by one of the same name
+STATE_OPEN: int = 1
+STATE_CLOSED: int = 2
+
+DEFAULT_FRAME_RING_NAME: str = "rave-frames"
+POLL_SECONDS: float = 0.001
+
+
+class Frame:
+    """A frame of the ring, viewed in place in shared memory.
+
+    `pixels` is a (height, width, components) view in top-down row order,
+    without any copy. The writer reuses the slot `num_slots` frames later:
+    `is_valid` tells whether the view still holds this frame, so check it
+    after using the pixels, or use `copy` for pixels that stay put.
+    """
+
+    index: int
+    timestamp: float
+    time: float
+    pixels: np.ndarray
+    slot: np.ndarray
+    sequence: int
+
+    def __init__(
+        self,
+        index: int,
+        timestamp: float,
+        time: float,
+        pixels: np.ndarray,
+        slot: np.ndarray,
+        sequence: int,
+    ) -> None:
+        self.index = index
+        self.timestamp = timestamp
+        self.time = time
+        self.pixels = pixels
+        self.slot = slot
+        self.sequence = sequence
+
+    def is_valid(self) -> bool:
+        """Whether the slot was not overwritten since the frame was read."""
+        return int(self.slot["sequence"]) == self.sequence
+
+    def copy(self) -> Optional[np.ndarray]:
+        """Copy the pixels out of shared memory, or None if the frame was overwritten meanwhile."""
+        pixels = self.pixels.copy()
+        return pixels if self.is_valid() else None
+
+
+class FrameReader:
+    """Reads the frames RAVE publishes into shared memory, from any local process.
+
+    Frames are read in place, from the ring written by FrameOutput. The ring
+    is replaced when the output size changes, which the reader follows by
+    opening it again. Only numpy is needed, not OpenGL.
+
+    Example:
+        reader = FrameReader()
+        while True:
+            frame = reader.read(timeout=1.0)
+            if frame is not None:
+                consume(frame.pixels)
+    """
+
+    name: str
+    block: Optional[shared_memory.SharedMemory]
+    header: Optional[np.ndarray]
+    slots: Optional[np.ndarray]
+    pixels: Optional[np.ndarray]
+    last_index: int
+
+    def __init__(self, name: str = DEFAULT_FRAME_RING_NAME) -> None:
+        self.name = name
+        self.block = None
+        self.header = None
+        self.slots = None
+        self.pixels = None
+        self.last_index = -1
+
+    @property
+    def is_open(self) -> bool:
+        return self.block is not None
+
+    @property
+    def size(self) -> tuple:
+        """Width and height of the frames, (0, 0) when the ring is not open."""
+        if self.header is None:
+            return (0, 0)
+        return (int(self.header[0]["width"]), int(self.header[0]["height"]))
+
+    def open(self) -> bool:
+        """Map the ring, if RAVE publishes one.
+
+        Returns:
+            bool: Whether the ring is open.
+        """
+        self.close()
+
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+
+        # the ring belongs to the writer, which unlinks it
+        resource_tracker.unregister(block._name, "shared_memory")
+
+        header = np.ndarray((1,), dtype=FRAME_RING_HEADER_DTYPE, buffer=block.buf)
+        h = header[0]
+        if (
+            h["magic"] != FRAME_RING_MAGIC
+            or h["version"] != FRAME_RING_VERSION
+            or h["state"] != STATE_OPEN
+            or int(h["format"]) not in FORMAT_COMPONENTS
+        ):
+            del header, h
+            block.close()
+            return False
+
+        num_slots = int(h["num_slots"])
+        height, stride = int(h["height"]), int(h["stride"])
+        components = FORMAT_COMPONENTS[int(h["format"])]
+
+        self.block = block
+        self.header = header
+        self.slots = np.ndarray(
+            (num_slots,),
+            dtype=FRAME_SLOT_DTYPE,
+            buffer=block.buf,
+            offset=FRAME_RING_HEADER_DTYPE.itemsize,
+        )
+        self.pixels = np.ndarray(
+            (num_slots, height, int(h["width"]), components),
+            dtype=np.uint8,
+            buffer=block.buf,
+            offset=int(h["data_offset"]),
+            strides=(int(h["slot_size"]), stride, components, 1),
+        )
+
+        # rows in top-down order, still without copying
+        if int(h["flags"]) & FLAG_BOTTOM_UP:
+            self.pixels = self.pixels[:, ::-1]
+
+        self.last_index = -1
+        return True
+
+    def close(self) -> None:
+        if self.block is not None:
+            # views must be gone before the shared memory can be closed
+            self.header = self.slots = self.pixels = None
+            try:
+                self.block.close()
+            except BufferError:
+                # frames still held elsewhere, unmapped once they are gone
+                pass
+            self.block = None
+
+    def latest(self) -> Optional[Frame]:
+        """The newest complete frame, or None if there is none yet."""
+        if self.block is None or int(self.header[0]["state"]) != STATE_OPEN:
+            if not self.open():
+                return None
+
+        count = int(self.header[0]["sequence"])
+        if count == 0:
+            return None
+
+        index = count - 1
+        slot = self.slots[index % len(self.slots)]
+        sequence = int(slot["sequence"])
+
+        # a slot being written, or already reused for a newer frame
+        if sequence % 2 == 1 or int(slot["frame"]) != index:
+            return None
+
+        frame = Frame(
+            index,
+            float(slot["timestamp"]),
+            float(slot["time"]),
+            self.pixels[index % len(self.slots)],
+            slot,
+            sequence,
+        )
+        return frame if frame.is_valid() else None
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Wait for a frame newer than the last one read.
+
+        Args:
+            timeout (Optional[float]): Longest wait in seconds, None to wait forever.
+
+        Returns:
+            Optional[Frame]: The newest frame, or None on timeout. Frames
+                published faster than they are read are skipped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            frame = self.latest()
+            if frame is not None and frame.index != self.last_index:
+                self.last_index = frame.index
+                return frame
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_SECONDS)
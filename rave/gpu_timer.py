@@ -0,0 +1,92 @@
+import moderngl
+import numpy as np
+
+from typing import List
+
+
+# constants
+DEFAULT_QUERY_LATENCY: int = 4
+DEFAULT_GPU_HISTORY_SIZE: int = 240
+PERCENTILES: List[float] = [50.0, 95.0, 99.0]
+NANOSECONDS_PER_MILLISECOND: float = 1e6
+
+
+class GPUTimer:
+    """Measures the GPU time of a block of draws with timer queries.
+
+    Reading a query's result waits for the GPU to finish the measured draws,
+    so results are read `latency` frames after their query was issued, just
+    before its slot in the ring of queries is reused. By then the GPU has
+    long finished the frame and the read returns without stalling.
+
+    Used as a context manager around the draws of one frame. Time queries
+    cannot be nested. moderngl does not release queries, they live as long
+    as their context.
+    """
+
+    ctx: moderngl.Context
+    queries: List[moderngl.Query]
+    pending: List[bool]
+    frame: int
+
+    samples: np.ndarray
+    written: int
+    last: float
+
+    def __init__(
+        self,
+        ctx: moderngl.Context,
+        latency: int = DEFAULT_QUERY_LATENCY,
+        history_size: int = DEFAULT_GPU_HISTORY_SIZE,
+    ) -> None:
+        self.ctx = ctx
+        self.queries = [ctx.query(time=True) for _ in range(max(1, latency))]
+        self.pending = [False] * len(self.queries)
+        self.frame = 0
+
+        self.samples = np.zeros(history_size, dtype="f8")
+        self.written = 0
+        self.last = 0.0
+
+    def __enter__(self) -> "GPUTimer":
+        slot = self.frame % len(self.queries)
+        if self.pending[slot]:
+            self.collect(slot)
+
+        self.queries[slot].__enter__()
+        return self
+
+    def __exit__(self, *args) -> None:
+        slot = self.frame % len(self.queries)
+        self.queries[slot].__exit__(*args)
+        self.pending[slot] = True
+        self.frame += 1
+
+    def collect(self, slot: int) -> None:
+        self.last = self.queries[slot].elapsed / NANOSECONDS_PER_MILLISECOND
+        self.samples[self.written % len(self.samples)] = self.last
+        self.written += 1
+        self.pending[slot] = False
+
+    def flush(self) -> None:
+        """Read the results of every query in flight, oldest first. Waits for the GPU."""
+        for i in range(len(self.queries)):
+            slot = (self.frame + i) % len(self.queries)
+            if self.pending[slot]:
+                self.collect(slot)
+
+    def clear(self) -> None:
+        """Forget the measured frames, including those still in flight."""
+        self.flush()
+        self.written = 0
+
+    def get_samples(self) -> np.ndarray:
+        """GPU time of the most recent frames, in milliseconds, in no particular order."""
+        return self.samples[: min(self.written, len(self.samples))]
+
+    def get_stats(self) -> np.ndarray:
+        """[p50, p95, p99, max] of the recent GPU frame times, in milliseconds."""
+        samples = self.get_samples()
+        if len(samples) == 0:
+            return np.zeros(len(PERCENTILES) + 1)
+        return np.append(np.percentile(samples, PERCENTILES), samples.max())
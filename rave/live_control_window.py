@@ -1,14 +1,52 @@
 import imgui
+import numpy as np
 
-from rave.project import Project
+from typing import Any, Callable, Dict, List, Optional
+
+from rave.modulation import MODULATION_SOURCES
+from rave.project import Modulation, Project, UniformField
 from rave.tool_window import ToolWindow
 
 
+ModulationsChangedCallback = Optional[Callable[[None], None]]
+
+
+# sliders by number of components, called as (label, *values, min, max)
+FLOAT_SLIDERS: Dict[int, Callable[..., Any]] = {
+    1: imgui.slider_float,
+    2: imgui.slider_float2,
+    3: imgui.slider_float3,
+    4: imgui.slider_float4,
+}
+INT_SLIDERS: Dict[int, Callable[..., Any]] = {
+    1: imgui.slider_int,
+    2: imgui.slider_int2,
+    3: imgui.slider_int3,
+    4: imgui.slider_int4,
+}
+
+# smallest exponent of a modulation curve, flatter curves amplify noise
+MIN_CURVE: float = 0.05
+
+# formats of uniforms set one by one, outside of the uniform block
+LEGACY_COMPONENTS: Dict[str, int] = {"1f": 1, "2f": 2, "3f": 3, "4f": 4}
+
+
 class LiveControlWindow(ToolWindow):
-    def __init__(self, opened: bool = False) -> None:
+    modulations_changed_callback: ModulationsChangedCallback
+
+    def __init__(
+        self,
+        modulations_changed_callback: ModulationsChangedCallback = None,
+        opened: bool = False,
+    ) -> None:
         super().__init__("Live Control", opened)
+        self.modulations_changed_callback = modulations_changed_callback
 
     def draw(self, project: Project, **kwargs) -> None:
+        modulations = {m.target: m for m in project.modulations}
+        modulations_changed = False
+
         for u in project.uniform_fields:
             expanded, _ = imgui.collapsing_header(u.name)
 
@@ -25,22 +63,145 @@ class LiveControlWindow(ToolWindow):
                     u.min_value = min_max[0]
                     u.max_value = min_max[1]
 
-                imgui.same_line()
+                # modulated values are clamped to the range
+                modulations_changed |= changed and u.name in modulations
 
-                # @todo: make this not a huge if.elif statement, maybe?
-                if u.fmt == "1f":
-                    imgui.push_item_width(200.0)
-                    _, u.value = imgui.slider_float(
-                        f"Value##{u.name}", u.value, u.min_value, u.max_value
-                    )
-                    imgui.pop_item_width()
-                elif u.fmt == "2f":
-                    _, u.value = imgui.slider_float2(
-                        f"Value##{u.name}",
-                        u.value[0],
-                        u.value[1],
-                        u.min_value,
-                        u.max_value,
-                    )
+                if isinstance(u.value, np.ndarray):
+                    self.draw_block_value(u)
+                    if u.value.dtype.kind == "f":
+                        modulations_changed |= self.draw_modulation(
+                            project, u, modulations.get(u.name)
+                        )
+                elif u.fmt in LEGACY_COMPONENTS:
+                    self.draw_legacy_value(u)
 
             imgui.separator()
+
+        if modulations_changed and self.modulations_changed_callback is not None:
+            self.modulations_changed_callback()
+
+    def draw_block_value(self, u: UniformField) -> None:
+        """Edit a member of the uniform block, in place.
+
+        Vectors get one slider per component, matrices one row of sliders
+        per column.
+        """
+        value = u.value
+        rows = (
+            value.reshape(-1, value.shape[-1]) if value.ndim > 0 else value[None, None]
+        )
+
+        for i, row in enumerate(rows):
+            label = f"Value##{u.name}{i}"
+
+            if u.fmt.startswith("b"):
+                for j in range(len(row)):
+                    if j > 0:
+                        imgui.same_line()
+                    changed, checked = imgui.checkbox(f"{label}{j}", bool(row[j]))
+                    if changed:
+                        row[j] = checked
+            elif value.dtype.kind == "f":
+                changed, values = FLOAT_SLIDERS[len(row)](
+                    label, *row.tolist(), u.min_value, u.max_value
+                )
+                if changed:
+                    row[:] = values
+            else:
+                changed, values = INT_SLIDERS[len(row)](
+                    label, *row.tolist(), int(u.min_value), int(u.max_value)
+                )
+                if changed:
+                    row[:] = (
+                        np.maximum(values, 0) if value.dtype.kind == "u" else values
+                    )
+
+    def draw_legacy_value(self, u: UniformField) -> None:
+        components = LEGACY_COMPONENTS[u.fmt]
+        values: List[float] = [u.value] if components == 1 else list(u.value)
+
+        imgui.same_line()
+        imgui.push_item_width(200.0)
+        changed, values = FLOAT_SLIDERS[components](
+            f"Value##{u.name}", *values, u.min_value, u.max_value
+        )
+        imgui.pop_item_width()
+
+        if changed:
+            u.value = values
+
+    def draw_modulation(
+        self, project: Project, u: UniformField, modulation: Optional[Modulation]
+    ) -> bool:
+        """Edit the audio modulation of a float uniform of the uniform block.
+
+        Returns:
+            bool: Whether the modulation was added, removed or edited.
+        """
+        changed, enabled = imgui.checkbox(f"Modulate##{u.name}", modulation is not None)
+        if changed:
+            if enabled:
+                project.modulations.append(Modulation(target=u.name))
+            else:
+                project.modulations.remove(modulation)
+            return True
+
+        if modulation is None:
+            return False
+
+        imgui.indent()
+        imgui.push_item_width(200.0)
+        edited = False
+
+        source = (
+            MODULATION_SOURCES.index(modulation.source)
+            if modulation.source in MODULATION_SOURCES
+            else 0
+        )
+        changed, source = imgui.combo(f"Source##{u.name}", source, MODULATION_SOURCES)
+        if changed:
+            modulation.source = MODULATION_SOURCES[source]
+            edited = True
+
+        if u.value.size > 1:
+            changed, component = imgui.slider_int(
+                f"Component##{u.name}", modulation.component, 0, u.value.size - 1
+            )
+            if changed:
+                modulation.component = component
+                edited = True
+
+        if modulation.source in ("band", "fft"):
+            changed, index = imgui.input_int(f"Index##{u.name}", modulation.index)
+            if changed:
+                modulation.index = max(index, 0)
+                edited = True
+
+        if modulation.source == "fft":
+            changed, count = imgui.input_int(f"Count##{u.name}", modulation.count)
+            if changed:
+                modulation.count = max(count, 1)
+                edited = True
+
+        changed, values = imgui.input_float3(
+            f"Gain/Curve/Offset##{u.name}",
+            modulation.gain,
+            modulation.curve,
+            modulation.offset,
+        )
+        if changed:
+            modulation.gain, modulation.offset = values[0], values[2]
+            modulation.curve = max(values[1], MIN_CURVE)
+            edited = True
+
+        changed, values = imgui.input_float2(
+            f"Attack/Release##{u.name}", modulation.attack, modulation.release
+        )
+        if changed:
+            modulation.attack = max(values[0], 0.0)
+            modulation.release = max(values[1], 0.0)
+            edited = True
+
+        imgui.pop_item_width()
+        imgui.unindent()
+        return edited
@@ -0,0 +1,246 @@
+import numpy as np
+
+from typing import Dict, FrozenSet, List, Optional
+
+from rave.audio_analyzer import AudioFeatures
+from rave.project import Modulation, Project
+from rave.uniform_block import (
+    COMPONENT_SIZE,
+    GLSL_TYPES,
+    STD140_VEC4_SIZE,
+    UniformBlock,
+)
+
+
+# constants
+MODULATION_SOURCES: List[str] = ["rms", "rms_left", "rms_right", "onset", "band", "fft"]
+ONSET_TIME_CONSTANT: float = 0.25
+MIN_TIME_CONSTANT: float = 1e-4
+
+# audio uniforms equivalent to the sources, for the analysis they need
+MODULATION_SOURCE_UNIFORMS: Dict[str, str] = {
+    "band": "rAudioBands",
+    "fft": "rAudioFFT",
+}
+
+# layout of the input vector, a zero first so scalar sources subtract nothing
+INPUT_ZERO: int = 0
+INPUT_SCALARS: int = 1
+NUM_SCALAR_SOURCES: int = 4
+
+
+class ModulationEngine:
+    """Evaluates the project's modulations and writes them into the uniform block.
+
+    Each frame, the audio features are laid out in one input vector: the
+    scalar features, the bands, then the running sum of the spectrum. Every
+    modulation reads two entries of it and scales their difference, which
+    is the feature itself for scalar sources and the mean of a range of bins
+    for the fft source. Smoothing, shaping and clamping then run as array
+    operations over all modulations at once, and the results are scattered
+    into the block with one indexed assignment. The cost hardly depends on
+    the number of modulations.
+
+    The index arrays are rebuilt by `bind` when the project, its uniform
+    block or its modulations change. `uniforms` then names the audio
+    uniforms whose analysis the bound modulations read.
+    """
+
+    project: Optional[Project]
+    block: Optional[UniformBlock]
+    dirty: bool
+    uniforms: FrozenSet[str]
+
+    num_bands: int
+    num_bins: int
+    inputs: np.ndarray
+
+    high: np.ndarray
+    low: np.ndarray
+    scale: np.ndarray
+    gain: np.ndarray
+    curve: np.ndarray
+    offset: np.ndarray
+    attack: np.ndarray
+    release: np.ndarray
+    min_value: np.ndarray
+    max_value: np.ndarray
+    targets: np.ndarray
+
+    state: np.ndarray
+    values: np.ndarray
+    slow_rms: float
+
+    def __init__(self) -> None:
+        self.project = None
+        self.block = None
+        self.dirty = True
+        self.uniforms = frozenset()
+        self.num_bands = 0
+        self.num_bins = 0
+        self.inputs = np.zeros(INPUT_SCALARS + NUM_SCALAR_SOURCES, dtype="f4")
+        self.slow_rms = 0.0
+        self.bind_modulations([])
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def invalidate(self) -> None:
+        """Rebuild the bindings on the next update, after the modulations were edited."""
+        self.dirty = True
+
+    def get_target_index(self, block: UniformBlock, modulation: Modulation) -> int:
+        """Index of the modulated float in the block, or -1 if it cannot be modulated."""
+        if modulation.target not in block:
+            return -1
+
+        glsl_type = dict(block.members)[modulation.target]
+        dtype, columns, rows = GLSL_TYPES[glsl_type]
+        if dtype != "<f4" or not 0 <= modulation.component < columns * rows:
+            return -1
+
+        # matrix columns are padded to a vec4
+        column, row = divmod(modulation.component, rows)
+        offset = block.offsets[modulation.target] + column * STD140_VEC4_SIZE
+        return (offset + row * COMPONENT_SIZE) // COMPONENT_SIZE
+
+    def get_input_range(self, modulation: Modulation) -> tuple:
+        """Entries of the input vector read by a modulation, and their scale."""
+        bands = INPUT_SCALARS + NUM_SCALAR_SOURCES
+        spectrum = bands + self.num_bands
+
+        if modulation.source == "band":
+            index = min(max(modulation.index, 0), max(self.num_bands - 1, 0))
+            return bands + index, INPUT_ZERO, 1.0
+
+        if modulation.source == "fft":
+            first = min(max(modulation.index, 0), self.num_bins)
+            last = min(first + max(modulation.count, 1), self.num_bins)
+            return spectrum + last, spectrum + first, 1.0 / max(last - first, 1)
+
+        index = MODULATION_SOURCES.index(modulation.source)
+        return INPUT_SCALARS + index, INPUT_ZERO, 1.0
+
+    def bind(
+        self, project: Project, block: Optional[UniformBlock], features: AudioFeatures
+    ) -> None:
+        self.project = project
+        self.block = block
+        self.dirty = False
+        self.num_bands = len(features.bands)
+        self.num_bins = features.num_bins
+        self.inputs = np.zeros(
+            INPUT_SCALARS + NUM_SCALAR_SOURCES + self.num_bands + self.num_bins + 1,
+            dtype="f4",
+        )
+
+        # modulations of uniforms missing from the program are skipped
+        fields = {u.name for u in project.uniform_fields}
+        modulations = []
+        if block is not None:
+            modulations = [
+                m
+                for m in project.modulations
+                if m.source in MODULATION_SOURCES
+                and m.target in fields
+                and self.get_target_index(block, m) >= 0
+            ]
+
+        self.bind_modulations(modulations)
+        self.uniforms = frozenset(
+            MODULATION_SOURCE_UNIFORMS[m.source]
+            for m in modulations
+            if m.source in MODULATION_SOURCE_UNIFORMS
+        )
+
+    def bind_modulations(self, modulations: List[Modulation]) -> None:
+        fields = {}
+        if self.project is not None:
+            fields = {u.name: u for u in self.project.uniform_fields}
+
+        ranges = [self.get_input_range(m) for m in modulations]
+        self.high = np.array([r[0] for r in ranges], dtype=np.intp)
+        self.low = np.array([r[1] for r in ranges], dtype=np.intp)
+        self.scale = np.array([r[2] for r in ranges], dtype="f4")
+
+        self.gain = np.array([m.gain for m in modulations], dtype="f4")
+        self.curve = np.array([m.curve for m in modulations], dtype="f4")
+        self.offset = np.array([m.offset for m in modulations], dtype="f4")
+        self.attack = np.array([m.attack for m in modulations], dtype="f4")
+        self.release = np.array([m.release for m in modulations], dtype="f4")
+        self.min_value = np.array(
+            [fields[m.target].min_value for m in modulations], dtype="f4"
+        )
+        self.max_value = np.array(
+            [fields[m.target].max_value for m in modulations], dtype="f4"
+        )
+        self.targets = np.array(
+            [self.get_target_index(self.block, m) for m in modulations], dtype=np.intp
+        )
+
+        self.state = np.zeros(len(modulations), dtype="f4")
+        self.values = np.zeros(len(modulations), dtype="f4")
+
+    def update(
+        self,
+        project: Project,
+        block: Optional[UniformBlock],
+        features: AudioFeatures,
+        frametime: float,
+    ) -> None:
+        """Evaluate every modulation and write the results into the uniform block.
+
+        Args:
+            project (Project): Project holding the modulations and uniform fields.
+            block (Optional[UniformBlock]): Uniform block of the rendered program.
+            features (AudioFeatures): Audio features of the frame.
+            frametime (float): Time since the previous frame, in seconds.
+        """
+        if (
+            self.dirty
+            or project is not self.project
+            or block is not self.block
+            or len(features.bands) != self.num_bands
+            or features.num_bins != self.num_bins
+        ):
+            self.bind(project, block, features)
+
+        # onsets are the rise of the rms above its slow average
+        dt = max(frametime, 0.0)
+        rms = features.rms
+        onset = max(rms - self.slow_rms, 0.0)
+        self.slow_rms += (1.0 - np.exp(-dt / ONSET_TIME_CONSTANT)) * (
+            rms - self.slow_rms
+        )
+
+        if len(self.targets) == 0:
+            return
+
+        inputs = self.inputs
+        inputs[INPUT_SCALARS : INPUT_SCALARS + NUM_SCALAR_SOURCES] = (
+            rms,
+            features.channel_rms[0],
+            features.channel_rms[1],
+            onset,
+        )
+        bands = INPUT_SCALARS + NUM_SCALAR_SOURCES
+        spectrum = bands + self.num_bands
+        inputs[bands:spectrum] = features.bands
+        np.cumsum(features.magnitude, out=inputs[spectrum + 1 :])
+
+        # the feature of every modulation
+        feature = (inputs[self.high] - inputs[self.low]) * self.scale
+        np.maximum(feature, 0.0, out=feature)
+
+        # attack while rising, release while falling
+        time_constant = np.where(feature > self.state, self.attack, self.release)
+        coefficient = 1.0 - np.exp(-dt / np.maximum(time_constant, MIN_TIME_CONSTANT))
+        self.state += coefficient * (feature - self.state)
+
+        # shape, scale and clamp to the uniform's range
+        np.power(self.state, self.curve, out=self.values)
+        self.values *= self.gain
+        self.values += self.offset
+        np.clip(self.values, self.min_value, self.max_value, out=self.values)
+
+        block.raw.view("<f4")[self.targets] = self.values
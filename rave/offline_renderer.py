@@ -0,0 +1,264 @@
+import moderngl
+import moderngl_window
+import numpy as np
+import os
+import sys
+import time
+
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from rave.audio_analyzer import (
+    AudioAnalyzer,
+    get_analysis_stages,
+    get_audio_array_scales,
+    get_audio_uniform_sources,
+)
+from rave.audio_source import WavReader
+from rave.audio_textures import AudioTextures
+from rave.filterbank import DEFAULT_BAND_SCALE, DEFAULT_NUM_BANDS
+from rave.modulation import ModulationEngine
+from rave.project import Project
+from rave.shader_viewer import ShaderViewer
+from rave.stft import DEFAULT_FFT_SIZE, DEFAULT_HOP_SIZE, DEFAULT_WINDOW
+from rave.uniform_bindings import UniformBindingTable, UniformSource
+
+
+# type aliases
+FrameWriter = Callable[[int, np.ndarray], None]
+
+
+# constants
+DEFAULT_FPS: float = 60.0
+DEFAULT_RESOLUTION: Tuple[int, int] = (1920, 1080)
+DEFAULT_READBACK_DEPTH: int = 3
+FRAME_COMPONENTS: int = 3
+RAW_OUTPUT_STDOUT: str = "-"
+
+
+def create_image_writer(pattern: str) -> FrameWriter:
+    """Write each frame to its own image, `pattern` % frame index, e.g. frame_%05d.png."""
+    from PIL import Image
+
+    directory = os.path.dirname(pattern)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    def write(index: int, frame: np.ndarray) -> None:
+        Image.fromarray(frame, "RGB").save(pattern % index)
+
+    return write
+
+
+def create_raw_writer(stream: BinaryIO) -> FrameWriter:
+    """Write frames back to back as raw rgb24, e.g. into a pipe to ffmpeg."""
+
+    def write(index: int, frame: np.ndarray) -> None:
+        stream.write(frame.tobytes())
+
+    return write
+
+
+def create_headless_context(backend: Optional[str] = None) -> moderngl.Context:
+    """Create a standalone context, usable as the current moderngl_window context.
+
+    Args:
+        backend (Optional[str]): Context backend, e.g. "egl" on a machine without a display.
+    """
+    settings = {"require": 330}
+    if backend is not None:
+        settings["backend"] = backend
+    ctx = moderngl.create_standalone_context(**settings)
+
+    # the viewer's geometry is created through moderngl_window
+    moderngl_window.activate_context(ctx=ctx)
+
+    return ctx
+
+
+class OfflineRenderer:
+    """Renders a project against an audio file in a headless OpenGL context.
+
+    Time advances by exactly one frame per rendered frame, independent of the
+    wall clock, and each frame is analysed from the audio samples up to its
+    timestamp. Frames are read back through a ring of pixel buffers: the read
+    of frame `n` is only mapped once frame `n + depth - 1` has been submitted,
+    so the CPU never stalls waiting for the GPU to finish a frame.
+    """
+
+    ctx: moderngl.Context
+    size: Tuple[int, int]
+    fps: float
+
+    project: Project
+    audio: WavReader
+    analyzer: AudioAnalyzer
+    audio_textures: AudioTextures
+    uniform_sources: Dict[str, UniformSource]
+    shader_viewer: ShaderViewer
+    modulation_engine: ModulationEngine
+    framebuffer: moderngl.Framebuffer
+    readback_buffers: List[moderngl.Buffer]
+
+    def __init__(
+        self,
+        project: Project,
+        audio_path: str,
+        size: Tuple[int, int] = DEFAULT_RESOLUTION,
+        fps: float = DEFAULT_FPS,
+        readback_depth: int = DEFAULT_READBACK_DEPTH,
+        fft_size: int = DEFAULT_FFT_SIZE,
+        hop_size: int = DEFAULT_HOP_SIZE,
+        window: str = DEFAULT_WINDOW,
+        num_bands: int = DEFAULT_NUM_BANDS,
+        band_scale: str = DEFAULT_BAND_SCALE,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.size = size
+        self.fps = fps
+        self.project = project
+
+        self.audio = WavReader(audio_path)
+        self.analyzer = AudioAnalyzer(
+            sample_rate=self.audio.sample_rate,
+            channels=self.audio.channels,
+            frames_per_buffer=int(self.audio.sample_rate / fps) + 1,
+            fft_size=fft_size,
+            hop_size=hop_size,
+            window=window,
+            num_bands=num_bands,
+            band_scale=band_scale,
+        )
+
+        self.ctx = create_headless_context(backend)
+
+        self.audio_textures = AudioTextures(self.ctx)
+        self.uniform_sources = {
+            "rResolution": lambda time, frametime: self.size,
+            "rTime": lambda time, frametime: time,
+            "rFrameTime": lambda time, frametime: frametime,
+            **get_audio_uniform_sources(self.analyzer, self.audio_textures),
+        }
+
+        self.shader_viewer = ShaderViewer(
+            update_uniforms_callback=self.update_uniforms_callback
+        )
+        self.modulation_engine = ModulationEngine()
+
+        self.framebuffer = self.ctx.framebuffer(
+            color_attachments=[self.ctx.texture(size, 4)]
+        )
+        frame_size = size[0] * size[1] * FRAME_COMPONENTS
+        self.readback_buffers = [
+            self.ctx.buffer(reserve=frame_size) for _ in range(max(1, readback_depth))
+        ]
+
+    def close(self) -> None:
+        self.audio.close()
+        self.audio_textures.release()
+        for buffer in self.readback_buffers:
+            buffer.release()
+        self.framebuffer.color_attachments[0].release()
+        self.framebuffer.release()
+        self.ctx.release()
+
+    def compile(self) -> bool:
+        if self.shader_viewer.compile(self.ctx, self.project) is None:
+            return False
+
+        self.shader_viewer.bindings.bind_sources(
+            self.uniform_sources, get_audio_array_scales(self.project.fft_scale)
+        )
+        self.shader_viewer.bindings.bind_fields(self.project.uniform_fields)
+        return True
+
+    def update_uniforms_callback(
+        self, bindings: UniformBindingTable, time: float, frametime: float
+    ) -> None:
+        # rave exposed uniforms, then the project's saved uniform values
+        bindings.update(time, frametime)
+
+    def get_num_frames(self, duration: Optional[float] = None) -> int:
+        if duration is None:
+            duration = self.audio.duration
+        return int(duration * self.fps)
+
+    def read_frame(self, buffer: moderngl.Buffer) -> np.ndarray:
+        # rows are read bottom up, flip them into image order
+        pixels = np.frombuffer(buffer.read(), dtype=np.uint8)
+        return pixels.reshape(self.size[1], self.size[0], FRAME_COMPONENTS)[::-1]
+
+    def render(
+        self,
+        write_frame: FrameWriter,
+        num_frames: int,
+        progress: bool = False,
+    ) -> Optional[int]:
+        """Render frames and pass each to `write_frame`, in order.
+
+        Args:
+            write_frame (FrameWriter): Called with the index and the (height, width, 3) pixels of each frame.
+            num_frames (int): Number of frames to render.
+            progress (bool): Whether to report progress on stderr.
+
+        Returns:
+            Optional[int]: Number of frames rendered, None if the shaders failed to compile.
+        """
+        if not self.compile():
+            return None
+
+        depth = len(self.readback_buffers)
+        frametime = 1.0 / self.fps
+        start = time.perf_counter()
+
+        for index in range(num_frames):
+            frame_time = index * frametime
+
+            # analyse exactly the samples between the previous frame and this one
+            end = round(frame_time * self.audio.sample_rate)
+            self.analyzer.process(self.audio.read_until(end))
+            self.analyzer.acquire()
+            self.modulation_engine.update(
+                self.project,
+                self.shader_viewer.bindings.block,
+                self.analyzer.features,
+                frametime,
+            )
+            self.analyzer.set_stages(
+                get_analysis_stages(
+                    self.shader_viewer.active_uniforms | self.modulation_engine.uniforms
+                )
+            )
+
+            self.framebuffer.use()
+            self.framebuffer.clear()
+            self.shader_viewer.render(frame_time, frametime)
+
+            # asynchronous read into the pixel buffer, mapped `depth - 1` frames later
+            self.framebuffer.read_into(
+                self.readback_buffers[index % depth],
+                components=FRAME_COMPONENTS,
+                alignment=1,
+            )
+
+            ready = index - (depth - 1)
+            if ready >= 0:
+                write_frame(
+                    ready, self.read_frame(self.readback_buffers[ready % depth])
+                )
+
+            if progress and (index + 1) % max(1, int(self.fps)) == 0:
+                elapsed = time.perf_counter() - start
+                print(
+                    f"\rframe {index + 1}/{num_frames} ({(index + 1) / elapsed:.1f} fps)",
+                    end="",
+                    file=sys.stderr,
+                )
+
+        # drain the frames still in flight
+        for ready in range(max(0, num_frames - (depth - 1)), num_frames):
+            write_frame(ready, self.read_frame(self.readback_buffers[ready % depth]))
+
+        if progress:
+            print(file=sys.stderr)
+
+        return num_frames
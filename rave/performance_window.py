@@ -0,0 +1,131 @@
+import imgui
+import numpy as np
+
+from typing import Callable, Dict, Optional
+
+from rave.gpu_timer import GPUTimer
+from rave.project import Project
+from rave.render_scaler import MAX_RENDER_SCALE, RenderScaler
+from rave.tool_window import ToolWindow
+from rave.tracing import Tracer
+from rave.ui_layer import UILayer
+
+
+DumpTraceCallback = Optional[Callable[[None], None]]
+
+
+# constants
+STATS_REFRESH_SECONDS: float = 0.5
+
+
+class PerformanceWindow(ToolWindow):
+    tracer: Tracer
+    gpu_timer: Optional[GPUTimer]
+    render_scaler: Optional[RenderScaler]
+    ui_layer: Optional[UILayer]
+    stats: Dict[str, np.ndarray]
+    stats_time: float
+    dump_trace_callback: DumpTraceCallback
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        dump_trace_callback: DumpTraceCallback = None,
+        opened: bool = False,
+    ) -> None:
+        super().__init__("Performance", opened)
+        self.tracer = tracer
+        self.gpu_timer = None
+        self.render_scaler = None
+        self.ui_layer = None
+        self.stats = {}
+        self.stats_time = 0.0
+        self.dump_trace_callback = dump_trace_callback
+
+    def set_gpu_timer(self, gpu_timer: GPUTimer) -> None:
+        self.gpu_timer = gpu_timer
+
+    def set_render_scaler(self, render_scaler: RenderScaler) -> None:
+        self.render_scaler = render_scaler
+
+    def set_ui_layer(self, ui_layer: UILayer) -> None:
+        self.ui_layer = ui_layer
+
+    def draw_render_scale(self, render_scaler: RenderScaler) -> None:
+        _, render_scaler.adaptive = imgui.checkbox(
+            "Adaptive Resolution", render_scaler.adaptive
+        )
+
+        if render_scaler.adaptive:
+            _, render_scaler.target_fps = imgui.input_float(
+                "Target FPS", render_scaler.target_fps, 1.0, 10.0, "%.0f"
+            )
+            render_scaler.target_fps = max(render_scaler.target_fps, 1.0)
+            imgui.text(f"Render Scale: {render_scaler.scale:.2f}")
+        else:
+            changed, scale = imgui.slider_float(
+                "Render Scale",
+                render_scaler.scale,
+                render_scaler.min_scale,
+                MAX_RENDER_SCALE,
+                "%.2f",
+            )
+            if changed:
+                render_scaler.set_scale(scale)
+
+    def draw(self, project: Project, time: float = 0.0, **kwargs) -> None:
+        changed, enabled = imgui.checkbox("Tracing", self.tracer.enabled)
+        if changed:
+            self.tracer.enable(enabled)
+
+        imgui.same_line()
+
+        if imgui.button("Clear"):
+            self.tracer.clear()
+            self.stats = {}
+
+        imgui.same_line()
+
+        if imgui.button("Dump Trace") and self.dump_trace_callback is not None:
+            self.dump_trace_callback()
+
+        # percentiles over the whole ring, refreshed a few times per second
+        if self.tracer.enabled and time - self.stats_time >= STATS_REFRESH_SECONDS:
+            self.stats = self.tracer.get_stats()
+            self.stats_time = time
+
+        imgui.separator()
+
+        if self.gpu_timer is not None:
+            p50, p95, _, _ = self.gpu_timer.get_stats()
+            imgui.text(
+                f"GPU: {self.gpu_timer.last:.3f} ms (p50 {p50:.3f}, p95 {p95:.3f})"
+            )
+            imgui.separator()
+
+        if self.render_scaler is not None:
+            self.draw_render_scale(self.render_scaler)
+            imgui.separator()
+
+        if self.ui_layer is not None:
+            # 0 only redraws the ui on input
+            _, rate = imgui.input_float(
+                "UI Rate (Hz)", self.ui_layer.rate, 1.0, 10.0, "%.0f"
+            )
+            self.ui_layer.rate = max(rate, 0.0)
+            imgui.separator()
+
+        imgui.columns(5, "performance")
+        for header in ("Stage", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)"):
+            imgui.text(header)
+            imgui.next_column()
+        imgui.separator()
+
+        for name, values in self.stats.items():
+            imgui.text(name)
+            imgui.next_column()
+            for value in values:
+                imgui.text(f"{value:.3f}")
+                imgui.next_column()
+
+        imgui.columns(1)
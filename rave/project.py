@@ -1,7 +1,16 @@
+import copyreg
+import io
+import json
+import numpy as np
+import os
 import pickle
+import stat
+import struct
+import tempfile
 
-from dataclasses import dataclass, field
-from typing import Any, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
 
 
 # constants
@@ -39,6 +48,38 @@ void main()
 """
 
 
+# project file format
+#   header: magic, version, flags, then (offset, length) of each section
+#   sections: metadata (json), uniforms (binary), vertex and fragment source
+#   version 2 adds the shape of each uniform value, version 1 values decode flat
+PROJECT_FILE_MAGIC: bytes = b"RAVE"
+PROJECT_FILE_MODE: int = 0o644
+PROJECT_FILE_VERSION: int = 2
+PROJECT_FILE_HEADER: struct.Struct = struct.Struct("<4sHH8I")
+SECTION_METADATA: int = 0
+SECTION_UNIFORMS: int = 1
+SECTION_VERTEX_SHADER: int = 2
+SECTION_FRAGMENT_SHADER: int = 3
+NUM_SECTIONS: int = 4
+
+# uniform records: name, fmt, min, max, then the value as a typed array
+UNIFORM_COUNT: struct.Struct = struct.Struct("<I")
+UNIFORM_STRING_LENGTH: struct.Struct = struct.Struct("<H")
+UNIFORM_RANGE: struct.Struct = struct.Struct("<dd")
+UNIFORM_VALUE_HEADER: struct.Struct = struct.Struct("<cBI")
+UNIFORM_VALUE_DIMENSION: struct.Struct = struct.Struct("<I")
+VALUE_KIND_NONE: bytes = b"n"
+VALUE_KIND_FLOAT: bytes = b"f"
+VALUE_KIND_INT: bytes = b"i"
+VALUE_KIND_BOOL: bytes = b"?"
+VALUE_KIND_BYTES: bytes = b"b"
+VALUE_DTYPES: Dict[bytes, str] = {
+    VALUE_KIND_FLOAT: "<f8",
+    VALUE_KIND_INT: "<i8",
+    VALUE_KIND_BOOL: "?",
+}
+
+
 @dataclass
 class UniformField:
     """Represents an OpenGL Uniform value, along with min and max values specified by the user."""
@@ -59,6 +100,41 @@ class UniformField:
     """Maximum value for the Uniform, as specified by the user through the UI."""
 
 
+@dataclass
+class Modulation:
+    """Binds a user uniform to an audio feature, evaluated every frame."""
+
+    target: str = ""
+    """Name of the modulated uniform."""
+
+    component: int = 0
+    """Component of the uniform that is modulated, for vectors and matrices."""
+
+    source: str = "rms"
+    """Audio feature driving the uniform: rms, rms_left, rms_right, band, fft or onset."""
+
+    index: int = 0
+    """Band index for the band source, or first bin for the fft source."""
+
+    count: int = 1
+    """Number of bins averaged by the fft source."""
+
+    gain: float = 1.0
+    """Scale applied to the shaped feature."""
+
+    curve: float = 1.0
+    """Exponent shaping the smoothed feature, below 1 boosts quiet parts."""
+
+    offset: float = 0.0
+    """Value added after the gain."""
+
+    attack: float = 0.01
+    """Time to follow a rising feature, in seconds."""
+
+    release: float = 0.2
+    """Time to follow a falling feature, in seconds."""
+
+
 @dataclass
 class Project:
     """Represents a RAVE project, including all uniform values and shader source code."""
@@ -81,14 +157,231 @@ class Project:
     vertex_shader_source_code: str = DEFAULT_VERTEX_SHADER_SOURCE_CODE
     """Vertex shader source code for the project."""
 
+    modulations: List[Modulation] = field(default_factory=list)
+    """Audio modulations of the uniforms, at most one per uniform."""
+
+    fft_scale: str = "linear"
+    """Frequency scale of the FFT arrays resampled to their declared length: linear or log."""
+
+
+# classes allowed in legacy, pickled project files
+LEGACY_PICKLE_CLASSES: Dict[Tuple[str, str], Any] = {
+    ("rave.project", "Project"): Project,
+    ("rave.project", "UniformField"): UniformField,
+    ("rave.project", "Modulation"): Modulation,
+    ("copyreg", "_reconstructor"): copyreg._reconstructor,
+    ("builtins", "object"): object,
+}
+
+save_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+
 
 def new_project() -> Project:
     return Project()
 
 
+class LegacyProjectUnpickler(pickle.Unpickler):
+    """Unpickler for projects saved before the versioned file format.
+
+    Only the project dataclasses may be instantiated, so opening a project
+    from someone else cannot run arbitrary code.
+    """
+
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) not in LEGACY_PICKLE_CLASSES:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed")
+        return LEGACY_PICKLE_CLASSES[(module, name)]
+
+
+def migrate_legacy_project(project: Project) -> Project:
+    """Rebuild an unpickled project, so fields added or removed since it was saved are handled."""
+
+    def rebuild(cls, obj) -> Any:
+        state = getattr(obj, "__dict__", {})
+        return cls(**{f.name: state[f.name] for f in fields(cls) if f.name in state})
+
+    migrated = rebuild(Project, project)
+    migrated.uniform_fields = [
+        rebuild(UniformField, u) for u in (migrated.uniform_fields or [])
+    ]
+    migrated.modulations = [
+        rebuild(Modulation, m) for m in (migrated.modulations or [])
+    ]
+    return migrated
+
+
+def decode_modulation(data: Dict[str, Any]) -> Modulation:
+    """Build a Modulation from its saved fields, ignoring unknown ones."""
+    names = [f.name for f in fields(Modulation)]
+    return Modulation(**{k: v for k, v in data.items() if k in names})
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return UNIFORM_STRING_LENGTH.pack(len(data)) + data
+
+
+def decode_string(stream: BinaryIO) -> str:
+    (length,) = UNIFORM_STRING_LENGTH.unpack(stream.read(UNIFORM_STRING_LENGTH.size))
+    return stream.read(length).decode("utf-8")
+
+
+def encode_value(value: Any) -> bytes:
+    """Encode a uniform value as a kind, a rank, a shape and a typed little-endian array."""
+    if value is None:
+        return UNIFORM_VALUE_HEADER.pack(VALUE_KIND_NONE, 0, 0)
+
+    if isinstance(value, (bytes, bytearray)):
+        return UNIFORM_VALUE_HEADER.pack(VALUE_KIND_BYTES, 1, len(value)) + value
+
+    array = np.asarray(value)
+    if array.dtype.kind == "b":
+        kind = VALUE_KIND_BOOL
+    elif array.dtype.kind in "iu":
+        kind = VALUE_KIND_INT
+    else:
+        kind = VALUE_KIND_FLOAT
+
+    header = UNIFORM_VALUE_HEADER.pack(kind, array.ndim, array.size)
+    shape = b"".join(UNIFORM_VALUE_DIMENSION.pack(n) for n in array.shape)
+    return header + shape + array.astype(VALUE_DTYPES[kind]).tobytes()
+
+
+def to_tuples(value: Any) -> Any:
+    """Turn the nested lists of ndarray.tolist() into nested tuples."""
+    if isinstance(value, list):
+        return tuple(to_tuples(x) for x in value)
+    return value
+
+
+def decode_value(stream: BinaryIO, version: int = PROJECT_FILE_VERSION) -> Any:
+    """Decode a uniform value written by encode_value, into nested tuples of its shape.
+
+    Args:
+        stream (BinaryIO): Stream positioned at the value.
+        version (int): Version of the file holding it, values of version 1
+            files carry no shape and decode as flat tuples.
+    """
+    kind, ndim, count = UNIFORM_VALUE_HEADER.unpack(
+        stream.read(UNIFORM_VALUE_HEADER.size)
+    )
+
+    if kind == VALUE_KIND_NONE:
+        return None
+
+    if kind == VALUE_KIND_BYTES:
+        return stream.read(count)
+
+    shape = (count,) if ndim > 0 else ()
+    if version >= 2:
+        shape = tuple(
+            UNIFORM_VALUE_DIMENSION.unpack(stream.read(UNIFORM_VALUE_DIMENSION.size))[0]
+            for _ in range(ndim)
+        )
+
+    dtype = np.dtype(VALUE_DTYPES[kind])
+    array = np.frombuffer(stream.read(count * dtype.itemsize), dtype=dtype)
+    return to_tuples(array.reshape(shape).tolist())
+
+
+def dumps_project(project: Project) -> bytes:
+    """Serialize a Project object into the versioned RAVE project file format."""
+    metadata = json.dumps(
+        {
+            "name": project.name,
+            "author": project.author,
+            "description": project.description,
+            "modulations": [asdict(m) for m in project.modulations],
+            "fft_scale": project.fft_scale,
+        }
+    ).encode("utf-8")
+
+    uniforms = [UNIFORM_COUNT.pack(len(project.uniform_fields))]
+    for u in project.uniform_fields:
+        uniforms.append(encode_string(u.name))
+        uniforms.append(encode_string(u.fmt))
+        uniforms.append(UNIFORM_RANGE.pack(u.min_value, u.max_value))
+        uniforms.append(encode_value(u.value))
+
+    sections = [
+        metadata,
+        b"".join(uniforms),
+        project.vertex_shader_source_code.encode("utf-8"),
+        project.fragment_shader_source_code.encode("utf-8"),
+    ]
+
+    table = []
+    offset = PROJECT_FILE_HEADER.size
+    for section in sections:
+        table += [offset, len(section)]
+        offset += len(section)
+
+    header = PROJECT_FILE_HEADER.pack(
+        PROJECT_FILE_MAGIC, PROJECT_FILE_VERSION, 0, *table
+    )
+    return header + b"".join(sections)
+
+
+def read_header(fp: BinaryIO) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+    """Read the header of a project file.
+
+    Returns:
+        Optional[Tuple[int, List[Tuple[int, int]]]]: The file version and the
+            (offset, length) of each section, or None if the file is not in the
+            versioned format.
+    """
+    data = fp.read(PROJECT_FILE_HEADER.size)
+    if len(data) < PROJECT_FILE_HEADER.size:
+        return None
+
+    magic, version, _, *table = PROJECT_FILE_HEADER.unpack(data)
+    if magic != PROJECT_FILE_MAGIC:
+        return None
+    if version > PROJECT_FILE_VERSION:
+        raise ValueError(f"unsupported project file version: {version}")
+
+    return version, [(table[i * 2], table[i * 2 + 1]) for i in range(NUM_SECTIONS)]
+
+
+def read_section(fp: BinaryIO, sections: List[Tuple[int, int]], index: int) -> bytes:
+    offset, length = sections[index]
+    fp.seek(offset)
+    return fp.read(length)
+
+
+def read_project_metadata(path: str) -> Optional[Dict[str, str]]:
+    """Read a project's name, author and description, without reading its shaders.
+
+    Args:
+        path (str): Path to the project file.
+
+    Returns:
+        Optional[Dict[str, str]]: The metadata, or None if it could not be read.
+    """
+    try:
+        with open(path, "rb") as fp:
+            header = read_header(fp)
+            if header is not None:
+                _, sections = header
+                return json.loads(read_section(fp, sections, SECTION_METADATA))
+
+        project = load_project(path)
+        if project is None:
+            return None
+        return {
+            "name": project.name,
+            "author": project.author,
+            "description": project.description,
+        }
+    except Exception:
+        return None
+
+
 def load_project(path: str) -> Project:
     """Load a Project object from a file, using specified path.
 
+    Files saved before the versioned format, as pickles, are migrated.
+
     Args:
         path (str): Path to the file to load.
 
@@ -97,15 +390,79 @@ def load_project(path: str) -> Project:
     """
     try:
         with open(path, "rb") as fp:
-            project = pickle.load(fp)
-            return project
-    except:
+            header = read_header(fp)
+
+            if header is None:
+                fp.seek(0)
+                return migrate_legacy_project(LegacyProjectUnpickler(fp).load())
+
+            version, sections = header
+
+            metadata = json.loads(read_section(fp, sections, SECTION_METADATA))
+            uniforms = io.BytesIO(read_section(fp, sections, SECTION_UNIFORMS))
+            vertex = read_section(fp, sections, SECTION_VERTEX_SHADER)
+            fragment = read_section(fp, sections, SECTION_FRAGMENT_SHADER)
+
+        (count,) = UNIFORM_COUNT.unpack(uniforms.read(UNIFORM_COUNT.size))
+        uniform_fields = []
+        for _ in range(count):
+            name = decode_string(uniforms)
+            fmt = decode_string(uniforms)
+            min_value, max_value = UNIFORM_RANGE.unpack(
+                uniforms.read(UNIFORM_RANGE.size)
+            )
+            value = decode_value(uniforms, version)
+            uniform_fields.append(UniformField(name, fmt, value, min_value, max_value))
+
+        return Project(
+            name=metadata.get("name", Project.name),
+            author=metadata.get("author", Project.author),
+            description=metadata.get("description", Project.description),
+            uniform_fields=uniform_fields,
+            vertex_shader_source_code=vertex.decode("utf-8"),
+            fragment_shader_source_code=fragment.decode("utf-8"),
+            modulations=[decode_modulation(m) for m in metadata.get("modulations", [])],
+            fft_scale=metadata.get("fft_scale", Project.fft_scale),
+        )
+    except Exception as e:
+        print(f"Failed to load project {path}: {e}")
         return None
 
 
+def write_file_atomic(path: str, data: bytes) -> bool:
+    """Write data to a temporary file next to `path`, then rename it over `path`.
+
+    Returns:
+        bool: Whether the writing process succeeded.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        # keep the permissions of the file being replaced
+        mode = PROJECT_FILE_MODE
+        if os.path.exists(path):
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        os.chmod(temp_path, mode)
+
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
 def save_project(path: str, project: Project) -> bool:
     """Save the specified Project object to the given path.
 
+    The file is replaced atomically, so a failed save never leaves a partially
+    written project behind.
+
     Args:
         path (str): Path to save the object to.
         project (Project): Project object to save.
@@ -114,8 +471,34 @@ def save_project(path: str, project: Project) -> bool:
         bool: Whether the saving process succeeded.
     """
     try:
-        with open(path, "wb") as fp:
-            pickle.dump(project, fp)
-        return True
-    except:
+        return write_file_atomic(path, dumps_project(project))
+    except Exception:
         return False
+
+
+def save_project_async(
+    path: str, project: Project, callback: Optional[Callable[[bool], None]] = None
+) -> Future:
+    """Save the specified Project object to the given path, without blocking.
+
+    The project is serialized right away, so later edits do not affect what is
+    saved; only the disk I/O happens in a worker thread.
+
+    Args:
+        path (str): Path to save the object to.
+        project (Project): Project object to save.
+        callback (Optional[Callable[[bool], None]]): Called from the worker thread
+            with whether the saving process succeeded.
+
+    Returns:
+        Future: Resolves to whether the saving process succeeded.
+    """
+    data = dumps_project(project)
+
+    def write() -> bool:
+        result = write_file_atomic(path, data)
+        if callback is not None:
+            callback(result)
+        return result
+
+    return save_executor.submit(write)
@@ -1,18 +1,43 @@
 import imgui
 
+from typing import Callable, Optional
+
 from rave.project import Project
+from rave.resampler import RESAMPLE_SCALES
 from rave.tool_window import ToolWindow
 
 
+FFTScaleChangedCallback = Optional[Callable[[None], None]]
+
+
 class ProjectOverviewWindow(ToolWindow):
-    def __init__(self, opened: bool = True) -> None:
+    fft_scale_changed_callback: FFTScaleChangedCallback
+
+    def __init__(
+        self,
+        fft_scale_changed_callback: FFTScaleChangedCallback = None,
+        opened: bool = True,
+    ) -> None:
         super().__init__("Project Overview", opened)
+        self.fft_scale_changed_callback = fft_scale_changed_callback
 
     def draw(self, project: Project, **kwargs) -> None:
         _, project.name = imgui.input_text("Name", project.name)
         _, project.author = imgui.input_text("Author", project.author)
         _, project.description = imgui.input_text("Description", project.description)
 
+        # frequency scale of the rAudioFFT arrays, resampled to their declared length
+        scale = (
+            RESAMPLE_SCALES.index(project.fft_scale)
+            if project.fft_scale in RESAMPLE_SCALES
+            else 0
+        )
+        changed, scale = imgui.combo("FFT Scale", scale, RESAMPLE_SCALES)
+        if changed:
+            project.fft_scale = RESAMPLE_SCALES[scale]
+            if self.fft_scale_changed_callback is not None:
+                self.fft_scale_changed_callback()
+
         expanded, _ = imgui.collapsing_header("Uniforms")
         if expanded:
             for u in project.uniform_fields:
@@ -0,0 +1,105 @@
+import numpy as np
+
+from typing import Tuple
+
+
+# constants
+DEFAULT_RENDER_SCALE: float = 1.0
+DEFAULT_TARGET_FPS: float = 60.0
+MIN_RENDER_SCALE: float = 0.25
+MAX_RENDER_SCALE: float = 1.0
+RENDER_SCALE_STEP: float = 0.05
+ADJUST_INTERVAL_SECONDS: float = 0.5
+GPU_BUDGET: float = 0.8
+MAX_SCALE_DOWN: float = 0.75
+MAX_SCALE_UP: float = 1.1
+HYSTERESIS: float = 0.1
+MAX_SAMPLES: int = 1024
+MILLISECONDS_PER_SECOND: float = 1000.0
+
+
+class RenderScaler:
+    """Chooses the resolution the visual is rendered at, relative to the window.
+
+    With a fixed scale, the visual renders at `scale` times the window size.
+    In adaptive mode, the scale follows the measured GPU time of the visual so
+    that it fits in a share of the frame budget of the target FPS. The cost of
+    a fragment shader grows with the number of pixels, the square of the
+    scale, so the scale changes with the square root of the time ratio. It
+    drops quickly when a frame is over budget and recovers slowly, and only
+    changes in steps after a measurement interval, to avoid reallocating the
+    render target every frame.
+    """
+
+    scale: float
+    adaptive: bool
+    target_fps: float
+    min_scale: float
+
+    samples: np.ndarray
+    sample_count: int
+    last_adjust: float
+
+    def __init__(
+        self,
+        scale: float = DEFAULT_RENDER_SCALE,
+        adaptive: bool = False,
+        target_fps: float = DEFAULT_TARGET_FPS,
+        min_scale: float = MIN_RENDER_SCALE,
+    ) -> None:
+        self.scale = scale
+        self.adaptive = adaptive
+        self.target_fps = target_fps
+        self.min_scale = min_scale
+
+        self.samples = np.zeros(MAX_SAMPLES, dtype="f8")
+        self.sample_count = 0
+        self.last_adjust = 0.0
+
+    @property
+    def budget(self) -> float:
+        """GPU time available to the visual per frame, in milliseconds."""
+        return GPU_BUDGET * MILLISECONDS_PER_SECOND / max(self.target_fps, 1.0)
+
+    def set_scale(self, scale: float) -> None:
+        self.scale = float(np.clip(scale, self.min_scale, MAX_RENDER_SCALE))
+
+    def get_render_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        return (
+            max(1, round(size[0] * self.scale)),
+            max(1, round(size[1] * self.scale)),
+        )
+
+    def update(self, time: float, gpu_time: float) -> None:
+        """Measure a frame and adjust the scale once per interval, in adaptive mode.
+
+        Args:
+            time (float): Time of the frame, in seconds.
+            gpu_time (float): GPU time of the visual, in milliseconds.
+        """
+        if not self.adaptive or gpu_time <= 0.0:
+            return
+
+        self.samples[self.sample_count % len(self.samples)] = gpu_time
+        self.sample_count += 1
+
+        if time - self.last_adjust < ADJUST_INTERVAL_SECONDS:
+            return
+
+        self.last_adjust = time
+        count = min(self.sample_count, len(self.samples))
+        self.sample_count = 0
+        if count == 0:
+            return
+
+        ratio = self.budget / float(np.median(self.samples[:count]))
+        if abs(ratio - 1.0) < HYSTERESIS:
+            return
+
+        # at least one step towards the budget
+        factor = float(np.clip(np.sqrt(ratio), MAX_SCALE_DOWN, MAX_SCALE_UP))
+        steps = round(self.scale * (factor - 1.0) / RENDER_SCALE_STEP)
+        steps = max(steps, 1) if ratio > 1.0 else min(steps, -1)
+        self.set_scale(
+            (round(self.scale / RENDER_SCALE_STEP) + steps) * RENDER_SCALE_STEP
+        )
@@ -0,0 +1,120 @@
+import numpy as np
+
+from typing import List, Optional
+
+
+# constants
+RESAMPLE_SCALES: List[str] = ["linear", "log"]
+DEFAULT_RESAMPLE_SCALE: str = "linear"
+
+# the log scale starts above the dc bin
+LOG_FIRST_BIN: float = 1.0
+
+
+class Resampler:
+    """Resamples arrays, such as spectra, to a fixed length.
+
+    Output element `i` covers a range of the input, evenly spaced on a linear
+    or log scale. Ranges spanning more than one input element average them,
+    weighted by their overlap, and narrower ones interpolate linearly
+    between the two nearest elements. The taps are precomputed as an
+    index/weight map whenever the input length changes, so resampling is a
+    gather, a multiply and a sum into preallocated buffers. A linear
+    resampling to the input's own length returns the input unchanged.
+    """
+
+    length: int
+    scale: str
+    input_length: int
+
+    indices: Optional[np.ndarray]
+    weights: Optional[np.ndarray]
+    taps: Optional[np.ndarray]
+    output: np.ndarray
+
+    def __init__(self, length: int, scale: str = DEFAULT_RESAMPLE_SCALE) -> None:
+        if scale not in RESAMPLE_SCALES:
+            raise ValueError(f"unknown resample scale: {scale}")
+        if length <= 0:
+            raise ValueError("length must be greater than 0")
+
+        self.length = length
+        self.scale = scale
+        self.input_length = 0
+
+        self.indices = None
+        self.weights = None
+        self.taps = None
+        self.output = np.zeros(length, dtype="f4")
+
+    @property
+    def is_identity(self) -> bool:
+        return self.scale == "linear" and self.input_length == self.length
+
+    def get_edges(self, input_length: int) -> np.ndarray:
+        """Boundaries of the input ranges covered by each output element, in elements."""
+        steps = np.arange(self.length + 1) / self.length
+
+        if self.scale == "log" and input_length > LOG_FIRST_BIN + 1:
+            return LOG_FIRST_BIN * np.power(input_length / LOG_FIRST_BIN, steps)
+
+        return steps * input_length
+
+    def build(self, input_length: int) -> None:
+        """Precompute the taps mapping an input of the given length to the output."""
+        self.input_length = input_length
+        if self.is_identity or input_length == 0:
+            return
+
+        edges = self.get_edges(input_length)
+        rows = []
+
+        for start, end in zip(edges[:-1], edges[1:]):
+            if end - start >= 1.0:
+                # mean of the covered elements, weighted by their overlap
+                first = int(np.floor(start))
+                last = min(int(np.ceil(end)), input_length)
+                indices = np.arange(first, last)
+                overlap = np.minimum(indices + 1, end) - np.maximum(indices, start)
+                rows.append((indices, overlap / (end - start)))
+            else:
+                # linear interpolation at the center of the range
+                center = min(max(0.5 * (start + end) - 0.5, 0.0), input_length - 1.0)
+                first = min(int(center), input_length - 1)
+                second = min(first + 1, input_length - 1)
+                weight = center - first
+                rows.append(
+                    (np.array([first, second]), np.array([1.0 - weight, weight]))
+                )
+
+        # one row of taps per output element, padded with zero weights
+        num_taps = max(len(indices) for indices, _ in rows)
+        self.indices = np.zeros((self.length, num_taps), dtype=np.intp)
+        self.weights = np.zeros((self.length, num_taps), dtype="f4")
+        for i, (indices, weights) in enumerate(rows):
+            self.indices[i, : len(indices)] = indices
+            self.weights[i, : len(weights)] = weights
+
+        self.taps = np.zeros((self.length, num_taps), dtype="f4")
+
+    def resample(self, values: np.ndarray) -> np.ndarray:
+        """Resample a 1d array to `length` elements.
+
+        Returns:
+            np.ndarray: The resampled values, a buffer reused by the next call,
+                or `values` itself when they already have the right length.
+        """
+        if len(values) != self.input_length:
+            self.build(len(values))
+
+        if self.is_identity:
+            return values
+
+        if self.input_length == 0:
+            self.output[:] = 0.0
+            return self.output
+
+        np.take(values, self.indices, out=self.taps)
+        np.multiply(self.taps, self.weights, out=self.taps)
+        np.sum(self.taps, axis=1, out=self.output)
+        return self.output
@@ -0,0 +1,172 @@
+import enum
+import numpy as np
+
+from typing import Union
+
+
+# enums
+class OverflowPolicy(enum.IntEnum):
+    OVERWRITE = 0
+    """Discard the oldest unread frames to make room for new ones."""
+
+    DROP = 1
+    """Discard incoming frames that do not fit in the buffer."""
+
+
+# classes
+class RingBuffer:
+    """Fixed-capacity, preallocated ring buffer of audio frames.
+
+    The storage is mirrored: every frame is written twice, `capacity` frames
+    apart, so that any run of up to `capacity` consecutive frames is contiguous
+    in memory and can be handed out as a zero-copy view. Writing never
+    allocates, which keeps it safe to call from the audio callback.
+
+    The buffer is intended for a single producer and a single consumer.
+    """
+
+    capacity: int
+    channels: int
+    overflow_policy: OverflowPolicy
+    storage: np.ndarray
+
+    write_count: int
+    read_count: int
+
+    overflow_count: int
+    overflow_frames: int
+
+    def __init__(
+        self,
+        capacity: int,
+        channels: int = 1,
+        dtype: Union[str, np.dtype] = np.int16,
+        overflow_policy: OverflowPolicy = OverflowPolicy.OVERWRITE,
+    ) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than 0")
+        if channels <= 0:
+            raise ValueError("channels must be greater than 0")
+
+        self.capacity = capacity
+        self.channels = channels
+        self.overflow_policy = overflow_policy
+        self.storage = np.zeros((capacity * 2, channels), dtype=dtype)
+
+        self.write_count = 0
+        self.read_count = 0
+
+        self.overflow_count = 0
+        self.overflow_frames = 0
+
+    # properties
+    @property
+    def available(self) -> int:
+        """Number of frames written but not yet consumed."""
+        return self.write_count - self.read_count
+
+    @property
+    def free(self) -> int:
+        """Number of frames that can be written without overflowing."""
+        return self.capacity - self.available
+
+    # methods
+    def clear(self) -> None:
+        self.write_count = 0
+        self.read_count = 0
+        self.overflow_count = 0
+        self.overflow_frames = 0
+
+    def write(self, frames: np.ndarray) -> int:
+        """Copy frames into the buffer.
+
+        Args:
+            frames (np.ndarray): Array of shape (n, channels), or a flat array of
+                interleaved samples whose length is a multiple of `channels`.
+
+        Returns:
+            int: Number of frames actually written.
+        """
+        if frames.ndim == 1:
+            frames = frames.reshape(-1, self.channels)
+
+        count = len(frames)
+        overflow = count - self.free
+
+        if overflow > 0:
+            self.overflow_count += 1
+            self.overflow_frames += overflow
+
+            if self.overflow_policy == OverflowPolicy.DROP:
+                frames = frames[: self.free]
+                count = len(frames)
+            elif count > self.capacity:
+                # only the newest frames could ever be read back
+                frames = frames[count - self.capacity :]
+                self.write_count += count - self.capacity
+                count = self.capacity
+
+        if count == 0:
+            return 0
+
+        start = self.write_count % self.capacity
+        end = start + count
+
+        # primary copy, which may run into the mirror half
+        self.storage[start:end] = frames
+
+        # mirror copy, the other half of the storage
+        split = min(end, self.capacity)
+        self.storage[start + self.capacity : split + self.capacity] = frames[
+            : split - start
+        ]
+        if end > self.capacity:
+            self.storage[: end - self.capacity] = frames[split - start :]
+
+        self.write_count += count
+
+        # with OVERWRITE, the reader silently loses the oldest frames
+        if self.available > self.capacity:
+            self.read_count = self.write_count - self.capacity
+
+        return count
+
+    def peek(self, count: int) -> np.ndarray:
+        """Get a zero-copy view of the oldest `count` unread frames, without consuming them.
+
+        Args:
+            count (int): Number of frames to view, at most `available`.
+
+        Returns:
+            np.ndarray: View of shape (count, channels). Only valid until the
+                frames are overwritten by a later write.
+        """
+        if count > self.available:
+            raise ValueError(f"only {self.available} frames available")
+
+        start = self.read_count % self.capacity
+        return self.storage[start : start + count]
+
+    def latest(self, count: int) -> np.ndarray:
+        """Get a zero-copy view of the newest `count` frames, read or not.
+
+        Args:
+            count (int): Number of frames to view, at most `capacity`.
+
+        Returns:
+            np.ndarray: View of shape (count, channels).
+        """
+        if count > self.capacity:
+            raise ValueError(f"cannot view more than {self.capacity} frames")
+
+        end = self.write_count % self.capacity + self.capacity
+        return self.storage[end - count : end]
+
+    def consume(self, count: int) -> None:
+        """Mark the oldest `count` unread frames as read."""
+        self.read_count += min(count, self.available)
+
+    def skip_to_latest(self, count: int) -> None:
+        """Discard unread frames so that at most `count` frames remain unread."""
+        if self.available > count:
+            self.read_count = self.write_count - count
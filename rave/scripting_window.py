@@ -1,6 +1,6 @@
 import imgui
 
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 from rave.project import Project
 from rave.tool_window import ToolWindow
@@ -9,8 +9,14 @@ from rave.tool_window import ToolWindow
 ScriptChangedCallback = Optional[Callable[[None], None]]
 
 
+# constants
+ERROR_TEXT_COLOR: Tuple[float, float, float] = (1.0, 0.35, 0.35)
+
+
 class ScriptingWindow(ToolWindow):
     script_changed_callback: ScriptChangedCallback
+    compile_error: Optional[str]
+    compile_time: float
 
     def __init__(
         self,
@@ -19,6 +25,12 @@ class ScriptingWindow(ToolWindow):
     ) -> None:
         super().__init__("Scripting", opened)
         self.script_changed_callback = script_changed_callback
+        self.compile_error = None
+        self.compile_time = 0.0
+
+    def set_compile_status(self, error: Optional[str], compile_time: float) -> None:
+        self.compile_error = error
+        self.compile_time = compile_time
 
     def draw(self, project: Project, **kwargs) -> None:
         changed, project.fragment_shader_source_code = imgui.input_text_multiline(
@@ -31,3 +43,9 @@ class ScriptingWindow(ToolWindow):
 
         if changed and self.script_changed_callback is not None:
             self.script_changed_callback()
+
+        if self.compile_error is not None:
+            imgui.text_colored("Error", *ERROR_TEXT_COLOR)
+            imgui.text_wrapped(self.compile_error)
+        else:
+            imgui.text(f"Compiled in {self.compile_time * 1000.0:.1f} ms")
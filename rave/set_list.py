@@ -0,0 +1,286 @@
+import moderngl
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from rave.project import Project, load_project
+from rave.uniform_bindings import UniformBindingTable
+from rave.uniform_block import create_program, parse_array_lengths
+
+
+# type aliases
+ReleaseCallback = Optional[Callable[["PreparedProject"], None]]
+
+
+# constants
+DEFAULT_CACHE_CAPACITY: int = 4
+UNIFORM_COMPONENT_SIZE: int = 4
+
+
+@dataclass
+class PreparedProject:
+    """A loaded project along with its compiled, ready to render program."""
+
+    path: str = ""
+    """Path of the project file."""
+
+    project: Project = None
+    """The loaded project."""
+
+    program: moderngl.Program = None
+    """The project's compiled and linked program."""
+
+    bindings: UniformBindingTable = None
+    """Resolved uniform handles of the program."""
+
+    uniforms: List[moderngl.Uniform] = field(default_factory=list)
+    """All uniforms of the program."""
+
+    size: int = 0
+    """Approximate memory held by the project and its program, in bytes."""
+
+
+def prepare_project(
+    context: moderngl.Context, path: str, project: Project
+) -> Optional[PreparedProject]:
+    """Compile a project's program and upload the project's uniform values to it.
+
+    Args:
+        context (moderngl.Context): Context to compile the program in.
+        path (str): Path the project was loaded from.
+        project (Project): The loaded project.
+
+    Returns:
+        Optional[PreparedProject]: The prepared project, or None if the program failed to compile.
+    """
+    try:
+        program, block = create_program(
+            context,
+            project.vertex_shader_source_code,
+            project.fragment_shader_source_code,
+        )
+    except Exception as e:
+        print(f"Shader compilation error in {path}: {e}")
+        return None
+
+    bindings = UniformBindingTable(
+        program, block, parse_array_lengths(project.fragment_shader_source_code)
+    )
+    bindings.bind_fields(project.uniform_fields)
+    bindings.update_fields()
+
+    uniforms = list(bindings.handles.values())
+    size = len(project.vertex_shader_source_code) + len(
+        project.fragment_shader_source_code
+    )
+    size += sum(u.dimension * u.array_length * UNIFORM_COMPONENT_SIZE for u in uniforms)
+    if block is not None:
+        size += block.size
+
+    return PreparedProject(path, project, program, bindings, uniforms, size)
+
+
+class ProgramCache:
+    """Bounded LRU cache of prepared projects, keyed by path."""
+
+    capacity: int
+    entries: "OrderedDict[str, PreparedProject]"
+    pinned: Optional[str]
+    release_callback: ReleaseCallback
+
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CACHE_CAPACITY,
+        release_callback: ReleaseCallback = None,
+    ) -> None:
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.pinned = None
+        self.release_callback = release_callback
+
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(x.size for x in self.entries.values())
+
+    def get(self, path: str) -> Optional[PreparedProject]:
+        prepared = self.entries.get(path)
+
+        if prepared is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(path)
+        return prepared
+
+    def put(self, prepared: PreparedProject) -> None:
+        previous = self.entries.pop(prepared.path, None)
+        if previous is not None and previous.program is not prepared.program:
+            self.release(previous)
+
+        self.entries[prepared.path] = prepared
+
+        # evict the least recently used entries, except the pinned one
+        for path in list(self.entries.keys()):
+            if len(self.entries) <= self.capacity:
+                break
+            if path != self.pinned and path != prepared.path:
+                self.release(self.entries.pop(path))
+
+    def remove(self, path: str) -> None:
+        prepared = self.entries.pop(path, None)
+        if prepared is not None:
+            self.release(prepared)
+
+    def clear(self) -> None:
+        for path in list(self.entries.keys()):
+            self.remove(path)
+
+    def release(self, prepared: PreparedProject) -> None:
+        if self.release_callback is not None:
+            self.release_callback(prepared)
+
+
+class SetList:
+    """Ordered list of project files, played one after another during a show.
+
+    Projects near the current position are loaded in a worker thread and
+    compiled ahead of time, at most one per `update`, so that switching to
+    them is a cache hit instead of a load and compile.
+    """
+
+    paths: List[str]
+    current_index: Optional[int]
+    cache: ProgramCache
+
+    executor: ThreadPoolExecutor
+    loading: Dict[str, Future]
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CACHE_CAPACITY,
+        release_callback: ReleaseCallback = None,
+    ) -> None:
+        self.paths = []
+        self.current_index = None
+        self.cache = ProgramCache(capacity, release_callback)
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.loading = {}
+
+    @property
+    def current_path(self) -> Optional[str]:
+        if self.current_index is None:
+            return None
+        return self.paths[self.current_index]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.clear()
+
+    def clear_current(self) -> None:
+        """Leave the set list, e.g. when a project is opened outside of it."""
+        self.current_index = None
+        self.cache.pinned = None
+
+    def add(self, path: str) -> None:
+        self.paths.append(path)
+
+    def remove(self, index: int) -> None:
+        path = self.paths.pop(index)
+
+        if self.current_index is not None:
+            if index == self.current_index:
+                self.clear_current()
+            elif index < self.current_index:
+                self.current_index -= 1
+
+        if path not in self.paths and path != self.cache.pinned:
+            self.cache.remove(path)
+
+    def move(self, index: int, offset: int) -> None:
+        other = index + offset
+        if other < 0 or other >= len(self.paths):
+            return
+
+        self.paths[index], self.paths[other] = self.paths[other], self.paths[index]
+
+        if self.current_index == index:
+            self.current_index = other
+        elif self.current_index == other:
+            self.current_index = index
+
+    def get_preload_paths(self) -> List[str]:
+        """Paths worth having in the cache, nearest to the current position first."""
+        if len(self.paths) == 0:
+            return []
+
+        center = self.current_index if self.current_index is not None else -1
+        order = sorted(range(len(self.paths)), key=lambda i: (abs(i - center), -i))
+
+        paths = []
+        for i in order:
+            if self.paths[i] not in paths:
+                paths.append(self.paths[i])
+
+        return paths[: self.cache.capacity]
+
+    def update(self, context: moderngl.Context) -> None:
+        """Start loading upcoming projects, and compile at most one loaded project."""
+        for path in self.get_preload_paths():
+            if path not in self.cache and path not in self.loading:
+                self.loading[path] = self.executor.submit(load_project, path)
+
+        for path, future in list(self.loading.items()):
+            if future.done():
+                del self.loading[path]
+
+                project = future.result()
+                if project is None or path not in self.paths:
+                    continue
+
+                prepared = prepare_project(context, path, project)
+                if prepared is not None:
+                    self.cache.put(prepared)
+                break
+
+    def switch(
+        self, context: moderngl.Context, index: int
+    ) -> Optional[PreparedProject]:
+        """Make the project at `index` current.
+
+        Returns:
+            Optional[PreparedProject]: The prepared project, or None if it failed to load.
+        """
+        path = self.paths[index]
+
+        prepared = self.cache.get(path)
+        if prepared is None:
+            future = self.loading.pop(path, None)
+            project = future.result() if future is not None else load_project(path)
+            if project is None:
+                return None
+
+            prepared = prepare_project(context, path, project)
+            if prepared is None:
+                return None
+
+        self.current_index = index
+        self.cache.pinned = path
+        self.cache.put(prepared)
+
+        return prepared
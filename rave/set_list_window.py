@@ -0,0 +1,93 @@
+import imgui
+import os
+
+from typing import Callable, Optional
+
+from rave.project import Project
+from rave.set_list import SetList
+from rave.tool_window import ToolWindow
+
+
+AddToSetListCallback = Optional[Callable[[None], None]]
+SwitchSetListCallback = Optional[Callable[[int], None]]
+
+
+class SetListWindow(ToolWindow):
+    set_list: SetList
+    crossfade: float
+
+    add_to_set_list_callback: AddToSetListCallback
+    switch_set_list_callback: SwitchSetListCallback
+
+    def __init__(
+        self,
+        set_list: SetList,
+        add_to_set_list_callback: AddToSetListCallback = None,
+        switch_set_list_callback: SwitchSetListCallback = None,
+        opened: bool = False,
+    ) -> None:
+        super().__init__("Set List", opened)
+        self.set_list = set_list
+        self.crossfade = 1.0
+        self.add_to_set_list_callback = add_to_set_list_callback
+        self.switch_set_list_callback = switch_set_list_callback
+
+    def switch(self, index: int) -> None:
+        if self.switch_set_list_callback is not None and 0 <= index < len(
+            self.set_list.paths
+        ):
+            self.switch_set_list_callback(index)
+
+    def draw(self, project: Project, **kwargs) -> None:
+        current = self.set_list.current_index
+
+        if imgui.button("Previous"):
+            self.switch(0 if current is None else current - 1)
+
+        imgui.same_line()
+
+        if imgui.button("Next"):
+            self.switch(0 if current is None else current + 1)
+
+        imgui.same_line()
+
+        if imgui.button("Add Project") and self.add_to_set_list_callback is not None:
+            self.add_to_set_list_callback()
+
+        imgui.push_item_width(200.0)
+        _, self.crossfade = imgui.slider_float(
+            "Crossfade (s)", self.crossfade, 0.0, 10.0
+        )
+        imgui.pop_item_width()
+
+        imgui.separator()
+
+        for i, path in enumerate(self.set_list.paths):
+            cached = "*" if path in self.set_list.cache else " "
+            clicked, _ = imgui.selectable(
+                f"{cached} {i + 1}. {os.path.basename(path)}##setlist{i}",
+                i == current,
+                width=300.0,
+            )
+            if clicked:
+                self.switch(i)
+
+            imgui.same_line()
+            if imgui.arrow_button(f"##up{i}", imgui.DIRECTION_UP):
+                self.set_list.move(i, -1)
+
+            imgui.same_line()
+            if imgui.arrow_button(f"##down{i}", imgui.DIRECTION_DOWN):
+                self.set_list.move(i, 1)
+
+            imgui.same_line()
+            if imgui.small_button(f"Remove##{i}"):
+                self.set_list.remove(i)
+                break
+
+        imgui.separator()
+
+        cache = self.set_list.cache
+        imgui.text(f"Cached: {len(cache)} / {cache.capacity}")
+        imgui.text(f"Hits: {cache.hits}  Misses: {cache.misses}")
+        imgui.text(f"Memory (estimated): {cache.memory_usage / 1024.0:.1f} KB")
@@ -0,0 +1,130 @@
+import re
+import shutil
+import subprocess
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+
+# constants
+COMPILE_DEBOUNCE_SECONDS: float = 0.35
+GLSLANG_VALIDATOR: Optional[str] = shutil.which("glslangValidator")
+GLSLANG_TIMEOUT_SECONDS: float = 5.0
+COMMENT_PATTERN: re.Pattern = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+MAIN_PATTERN: re.Pattern = re.compile(r"\bvoid\s+main\s*\(")
+BRACKET_PAIRS: dict = {")": "(", "]": "[", "}": "{"}
+
+
+def validate_fragment_shader(source: str) -> Optional[str]:
+    """Check fragment shader source code for errors, without an OpenGL context.
+
+    Uses glslangValidator when it is installed, otherwise only catches
+    structural errors such as unbalanced brackets or a missing main function.
+
+    Args:
+        source (str): GLSL source code of the fragment shader.
+
+    Returns:
+        Optional[str]: Description of the error, or None if no error was found.
+    """
+    if GLSLANG_VALIDATOR is not None:
+        try:
+            result = subprocess.run(
+                [GLSLANG_VALIDATOR, "--stdin", "-S", "frag"],
+                input=source,
+                capture_output=True,
+                text=True,
+                timeout=GLSLANG_TIMEOUT_SECONDS,
+            )
+            if result.returncode != 0:
+                return result.stdout.strip() or result.stderr.strip()
+            return None
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    code = COMMENT_PATTERN.sub(" ", source)
+
+    stack = []
+    for line_number, line in enumerate(code.splitlines(), start=1):
+        for c in line:
+            if c in "([{":
+                stack.append((c, line_number))
+            elif c in BRACKET_PAIRS:
+                if not stack or stack[-1][0] != BRACKET_PAIRS[c]:
+                    return f"line {line_number}: unexpected '{c}'"
+                stack.pop()
+
+    if stack:
+        c, line_number = stack[-1]
+        return f"line {line_number}: unclosed '{c}'"
+
+    if MAIN_PATTERN.search(code) is None:
+        return "missing 'void main()'"
+
+    return None
+
+
+class ShaderCompiler:
+    """Debounces script edits and validates them off the render thread.
+
+    Every edit restarts the debounce timer. Once the script has been left
+    alone for `debounce` seconds, it is validated in a worker thread. `poll`
+    reports when the latest edit passed validation and can be compiled, which
+    has to happen on the thread owning the OpenGL context.
+    """
+
+    debounce: float
+    executor: ThreadPoolExecutor
+
+    pending_source: Optional[str]
+    pending_since: float
+    validation: Optional[Future]
+    error: Optional[str]
+
+    def __init__(self, debounce: float = COMPILE_DEBOUNCE_SECONDS) -> None:
+        self.debounce = debounce
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self.pending_source = None
+        self.pending_since = 0.0
+        self.validation = None
+        self.error = None
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def request(self, source: str, now: float) -> None:
+        """Record an edit of the fragment shader source code."""
+        self.pending_source = source
+        self.pending_since = now
+
+    def poll(self, now: float) -> bool:
+        """Advance the debounce and validation.
+
+        Args:
+            now (float): Current time, in seconds.
+
+        Returns:
+            bool: Whether the latest edit is valid and should be compiled now.
+        """
+        if (
+            self.pending_source is not None
+            and self.validation is None
+            and now - self.pending_since >= self.debounce
+        ):
+            self.validation = self.executor.submit(
+                validate_fragment_shader, self.pending_source
+            )
+            self.pending_source = None
+
+        if self.validation is None or not self.validation.done():
+            return False
+
+        self.error = self.validation.result()
+        self.validation = None
+
+        # a newer edit supersedes this result
+        if self.pending_source is not None:
+            return False
+
+        return self.error is None
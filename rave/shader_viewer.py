@@ -1,38 +1,210 @@
 import moderngl
+import time
 
 from moderngl_window.geometry import quad_fs
-from typing import Callable, List, Optional
+from typing import Callable, FrozenSet, List, Optional, Tuple
 
+from rave.compositor import Compositor
+from rave.gpu_timer import GPUTimer
 from rave.project import Project
+from rave.render_scaler import RenderScaler
+from rave.uniform_block import (
+    RAVE_UNIFORM_PATTERN,
+    create_program,
+    parse_array_lengths,
+)
+from rave.uniform_bindings import UniformBindingTable
+
+
+UpdateUniformsCallback = Callable[[UniformBindingTable, float, float], None]
 
 
 class ShaderViewer:
     program: Optional[moderngl.Program]
+    bindings: UniformBindingTable
+    active_uniforms: FrozenSet[str]
+    error: Optional[str]
+    compile_time: float
     VAO: Optional[moderngl.VertexArray]
-    update_uniforms_callback: Callable[[float, float], None]
+    gpu_timer: GPUTimer
+    scaler: RenderScaler
+    render_size: Tuple[int, int]
+    render_framebuffer: Optional[moderngl.Framebuffer]
+    update_uniforms_callback: UpdateUniformsCallback
 
-    def __init__(
-        self, update_uniforms_callback: Callable[[float, float], None]
-    ) -> None:
+    fade_program: Optional[moderngl.Program]
+    fade_bindings: Optional[UniformBindingTable]
+    fade_start: Optional[float]
+    fade_duration: float
+    fade_framebuffer: Optional[moderngl.Framebuffer]
+    compositor: Compositor
+    pending_release: List[Tuple[moderngl.Program, Optional[UniformBindingTable]]]
+
+    def __init__(self, update_uniforms_callback: UpdateUniformsCallback) -> None:
         self.program = None
+        self.bindings = UniformBindingTable()
+        self.active_uniforms = frozenset()
+        self.error = None
+        self.compile_time = 0.0
         self.VAO = quad_fs()
+        self.gpu_timer = GPUTimer(self.VAO.ctx)
+        self.scaler = RenderScaler()
+        self.render_size = (0, 0)
+        self.render_framebuffer = None
         self.update_uniforms_callback = update_uniforms_callback
 
+        self.fade_program = None
+        self.fade_bindings = None
+        self.fade_start = None
+        self.fade_duration = 0.0
+        self.fade_framebuffer = None
+        self.compositor = Compositor(self.VAO)
+        self.pending_release = []
+
+    @property
+    def is_fading(self) -> bool:
+        return self.fade_program is not None
+
     def compile(
-        self, context: moderngl.Context, project: Project
+        self,
+        context: moderngl.Context,
+        project: Project,
+        release_previous: bool = True,
     ) -> List[moderngl.Uniform]:
+        """Compile the project's shaders, replacing the current program on success.
+
+        On failure the last successfully compiled program stays in use, so the
+        output never goes blank because of an error in the script.
+
+        Args:
+            context (moderngl.Context): Context to compile in.
+            project (Project): Project holding the shaders.
+            release_previous (bool): Release the replaced program and its
+                bindings, False when something else owns and releases them.
+
+        Returns:
+            List[moderngl.Uniform]: Uniforms of the new program, or None on failure.
+        """
+        start = time.perf_counter()
+
         try:
-            self.program = context.program(
-                vertex_shader=project.vertex_shader_source_code,
-                fragment_shader=project.fragment_shader_source_code,
+            program, block = create_program(
+                context,
+                project.vertex_shader_source_code,
+                project.fragment_shader_source_code,
             )
-
-            return self.get_uniforms()
         except Exception as e:
             print(f"Shader compilation error: {e}")
-            self.program = None
+            self.error = str(e)
+            self.compile_time = time.perf_counter() - start
             return None
 
+        # swap in the new program only once it linked successfully
+        previous, previous_bindings = self.program, self.bindings
+        self.program = program
+        self.bindings = UniformBindingTable(
+            program, block, parse_array_lengths(project.fragment_shader_source_code)
+        )
+        self.update_active_uniforms()
+
+        if release_previous and previous is not None:
+            self.release_program(previous, previous_bindings)
+
+        self.error = None
+        self.compile_time = time.perf_counter() - start
+
+        return self.get_uniforms()
+
+    def swap_program(
+        self,
+        program: moderngl.Program,
+        bindings: UniformBindingTable,
+        crossfade: float = 0.0,
+        release_previous: bool = True,
+    ) -> List[moderngl.Uniform]:
+        """Replace the current program with an already compiled one.
+
+        Args:
+            program (moderngl.Program): The incoming program.
+            bindings (UniformBindingTable): Resolved uniforms of the incoming program.
+            crossfade (float): Duration of the crossfade from the outgoing program, in seconds.
+            release_previous (bool): Release the outgoing program and its
+                bindings once it is no longer rendered, False when something
+                else owns and releases them.
+
+        Returns:
+            List[moderngl.Uniform]: Uniforms of the incoming program.
+        """
+        self.end_fade()
+
+        previous, previous_bindings = self.program, self.bindings
+        if crossfade > 0.0 and previous is not None and previous is not program:
+            self.fade_program = previous
+            self.fade_bindings = previous_bindings
+            self.fade_duration = crossfade
+
+        self.program = program
+        self.bindings = bindings
+        self.error = None
+        self.update_active_uniforms()
+
+        # deferred until the crossfade is over
+        if release_previous and previous is not None and previous is not program:
+            self.release_program(previous, previous_bindings)
+
+        return self.get_uniforms()
+
+    def end_fade(self) -> None:
+        self.fade_program = None
+        self.fade_bindings = None
+        self.fade_start = None
+        self.update_active_uniforms()
+        self.release_unused_programs()
+
+    def update_active_uniforms(self) -> None:
+        """Publish the RAVE uniforms used by the rendered programs.
+
+        Only uniforms the linker kept count, so ones declared but unused do
+        not enable their analysis. The set is replaced as a whole, never
+        modified, so readers on other threads see either the old or the new
+        set.
+        """
+        names = set()
+        for bindings in (self.bindings, self.fade_bindings):
+            if bindings is not None:
+                names.update(
+                    x for x in bindings.handles if RAVE_UNIFORM_PATTERN.match(x)
+                )
+
+        self.active_uniforms = frozenset(names)
+
+    def release_program(
+        self,
+        program: moderngl.Program,
+        bindings: Optional[UniformBindingTable] = None,
+    ) -> None:
+        """Release a program and its bindings, deferring it while it is still being rendered."""
+        if all(x[0] is not program for x in self.pending_release):
+            self.pending_release.append((program, bindings))
+        self.release_unused_programs()
+
+    def release_unused_programs(self) -> None:
+        in_use = [
+            x for x in self.pending_release if x[0] in (self.program, self.fade_program)
+        ]
+
+        for program, bindings in self.pending_release:
+            if program not in (self.program, self.fade_program):
+                # the geometry caches a vertex array per program
+                vao = self.VAO.vaos.pop(program.glo, None)
+                if vao is not None:
+                    vao.release()
+                program.release()
+                if bindings is not None:
+                    bindings.release()
+
+        self.pending_release = in_use
+
     def get_uniforms(self) -> List[moderngl.Uniform]:
         if self.program is None:
             return []
@@ -47,7 +219,100 @@ class ShaderViewer:
         return uniform_list
 
     def render(self, time: float, frametime: float) -> None:
-        if self.program is not None:
-            if self.update_uniforms_callback is not None:
-                self.update_uniforms_callback(self.program, time, frametime)
-            self.VAO.render(self.program)
+        """Render the visual into the bound framebuffer.
+
+        At a render scale other than 1, the visual renders into an offscreen
+        framebuffer of the scaled size, which is then stretched over the bound
+        framebuffer with bilinear filtering. `render_size` is the size the
+        visual actually renders at, for rResolution.
+        """
+        screen = self.VAO.ctx.fbo
+        self.render_size = self.scaler.get_render_size(screen.size)
+
+        # gpu time of everything drawn for the frame, read a few frames later
+        with self.gpu_timer:
+            if self.render_size == screen.size:
+                self.render_visual(time, frametime)
+            else:
+                target = self.get_render_framebuffer(self.render_size)
+                target.use()
+                self.render_visual(time, frametime)
+                screen.use()
+                self.compositor.draw(target.color_attachments[0])
+
+        self.scaler.update(time, self.gpu_timer.last)
+
+    def render_visual(self, time: float, frametime: float) -> None:
+        if self.is_fading:
+            self.render_crossfade(time, frametime)
+        elif self.program is not None:
+            self.render_program(self.program, self.bindings, time, frametime)
+
+    def get_render_framebuffer(self, size: Tuple[int, int]) -> moderngl.Framebuffer:
+        if self.render_framebuffer is None or self.render_framebuffer.size != size:
+            self.release_framebuffer(self.render_framebuffer)
+            self.render_framebuffer = self.create_framebuffer(size)
+        return self.render_framebuffer
+
+    def create_framebuffer(self, size: Tuple[int, int]) -> moderngl.Framebuffer:
+        ctx = self.VAO.ctx
+        texture = ctx.texture(size, 4)
+        texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        texture.repeat_x = False
+        texture.repeat_y = False
+        return ctx.framebuffer(color_attachments=[texture])
+
+    def release(self) -> None:
+        """Release the offscreen framebuffers and the compositor."""
+        self.release_framebuffer(self.render_framebuffer)
+        self.release_framebuffer(self.fade_framebuffer)
+        self.render_framebuffer = None
+        self.fade_framebuffer = None
+        self.compositor.release()
+
+    def release_framebuffer(self, framebuffer: Optional[moderngl.Framebuffer]) -> None:
+        if framebuffer is not None:
+            framebuffer.color_attachments[0].release()
+            framebuffer.release()
+
+    def render_program(
+        self,
+        program: moderngl.Program,
+        bindings: UniformBindingTable,
+        time: float,
+        frametime: float,
+    ) -> None:
+        if self.update_uniforms_callback is not None:
+            self.update_uniforms_callback(bindings, time, frametime)
+        self.VAO.render(program)
+
+    def render_crossfade(self, time: float, frametime: float) -> None:
+        if self.fade_start is None:
+            self.fade_start = time
+
+        alpha = (time - self.fade_start) / self.fade_duration
+        if alpha >= 1.0:
+            self.end_fade()
+            self.render_program(self.program, self.bindings, time, frametime)
+            return
+
+        ctx = self.VAO.ctx
+        screen = ctx.fbo
+
+        # outgoing program straight to the target
+        self.render_program(self.fade_program, self.fade_bindings, time, frametime)
+
+        # incoming program offscreen, then blended over the outgoing one
+        if self.fade_framebuffer is None or self.fade_framebuffer.size != screen.size:
+            self.release_framebuffer(self.fade_framebuffer)
+            self.fade_framebuffer = self.create_framebuffer(screen.size)
+
+        self.fade_framebuffer.use()
+        self.render_program(self.program, self.bindings, time, frametime)
+        screen.use()
+
+        ctx.enable(moderngl.BLEND)
+        ctx.blend_func = moderngl.ONE, moderngl.ONE_MINUS_SRC_ALPHA
+        self.compositor.draw(self.fade_framebuffer.color_attachments[0], alpha)
+        ctx.blend_func = moderngl.SRC_ALPHA, moderngl.ONE_MINUS_SRC_ALPHA
+        ctx.disable(moderngl.BLEND)
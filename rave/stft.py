@@ -0,0 +1,206 @@
+import numpy as np
+
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Callable, Dict, List
+
+from rave.ring_buffer import RingBuffer
+
+
+# constants
+WINDOW_FUNCTIONS: Dict[str, Callable[[int], np.ndarray]] = {
+    "hann": np.hanning,
+    "blackman": np.blackman,
+}
+FFT_SIZES: List[int] = [512, 1024, 2048, 4096, 8192]
+DEFAULT_FFT_SIZE: int = 1024
+DEFAULT_HOP_SIZE: int = 512
+DEFAULT_WINDOW: str = "hann"
+MAX_FRAMES_PER_PROCESS: int = 16
+DEFAULT_HISTORY_SIZE: int = 256
+INT16_FULL_SCALE: float = 32768.0
+
+# rows of the spectra computed for every hop
+SPECTRUM_MID: int = 0
+SPECTRUM_SIDE: int = 1
+SPECTRUM_LEFT: int = 2
+SPECTRUM_RIGHT: int = 3
+NUM_SPECTRA: int = 4
+
+
+class STFT:
+    """Short-time Fourier transform over the frames of a RingBuffer.
+
+    The FFT size and hop size are independent of the capture buffer size. All
+    hops and channels pending in the ring are transformed together in a single
+    batched `rfft` call, using a precomputed window and preallocated output
+    arrays.
+
+    Every hop yields NUM_SPECTRA magnitude spectra: mid, side, left and right.
+    Mono input is reported as identical left and right channels with a silent
+    side channel. The mid spectra of the last `history_size` hops are kept in
+    `history`, a ring of rows whose newest row is `frame_count - 1`, modulo
+    `history_size`.
+    """
+
+    fft_size: int
+    hop_size: int
+    channels: int
+    window_name: str
+    window: np.ndarray
+    max_frames: int
+    history_size: int
+
+    frames: np.ndarray
+    spectra: np.ndarray
+    magnitude: np.ndarray
+    history: np.ndarray
+    frame_count: int
+
+    _windowed: np.ndarray
+    _combined: np.ndarray
+    _scale: float
+
+    def __init__(
+        self,
+        fft_size: int = DEFAULT_FFT_SIZE,
+        hop_size: int = DEFAULT_HOP_SIZE,
+        window: str = DEFAULT_WINDOW,
+        channels: int = 1,
+        max_frames: int = MAX_FRAMES_PER_PROCESS,
+        history_size: int = DEFAULT_HISTORY_SIZE,
+    ) -> None:
+        if window not in WINDOW_FUNCTIONS:
+            raise ValueError(f"unknown window function: {window}")
+        if hop_size <= 0 or hop_size > fft_size:
+            raise ValueError("hop_size must be within (0, fft_size]")
+        if history_size < max_frames:
+            raise ValueError("history_size must be at least max_frames")
+
+        self.fft_size = fft_size
+        self.hop_size = hop_size
+        self.channels = channels
+        self.window_name = window
+        self.window = WINDOW_FUNCTIONS[window](fft_size).astype("f4")
+        self.max_frames = max_frames
+        self.history_size = history_size
+
+        # the nyquist bin is dropped, so a 1024 point fft yields 512 bins
+        self.frames = np.zeros((max_frames, NUM_SPECTRA, self.num_bins), dtype="f4")
+        self.spectra = np.zeros((NUM_SPECTRA, self.num_bins), dtype="f4")
+        self.magnitude = self.spectra[SPECTRUM_MID]
+        self.history = np.zeros((history_size, self.num_bins), dtype="f4")
+        self.frame_count = 0
+
+        self._windowed = np.zeros((max_frames, channels, fft_size), dtype="f4")
+        self._combined = np.zeros((max_frames, NUM_SPECTRA, self.num_bins), dtype="c8")
+
+        # normalize so a full scale sine peaks at 1.0
+        self._scale = 2.0 / (float(self.window.sum()) * INT16_FULL_SCALE)
+
+    # properties
+    @property
+    def num_bins(self) -> int:
+        return self.fft_size // 2
+
+    # methods
+    def pending(self, ring: RingBuffer) -> int:
+        """Number of hops that can be computed from the unread frames in the ring."""
+        if ring.available < self.fft_size:
+            return 0
+        return (ring.available - self.fft_size) // self.hop_size + 1
+
+    def skip(self, ring: RingBuffer) -> None:
+        """Drop the pending hops of the ring without transforming them."""
+        ring.consume(self.pending(ring) * self.hop_size)
+
+    def process(
+        self, ring: RingBuffer, stereo: bool = True, history: bool = True
+    ) -> np.ndarray:
+        """Compute the magnitude spectra of every pending hop in the ring.
+
+        Args:
+            ring (RingBuffer): Ring buffer holding int16 frames, with the same
+                number of channels as the STFT.
+            stereo (bool): Whether to compute the side, left and right spectra.
+                Otherwise the channels are mixed before a single transform
+                and only the mid spectra are updated.
+            history (bool): Whether to append the mid spectra to the history.
+                Otherwise `frame_count` does not advance either.
+
+        Returns:
+            np.ndarray: View of shape (hops, NUM_SPECTRA, num_bins), oldest hop
+                first. Empty when not enough frames are available.
+        """
+        count = self.pending(ring)
+
+        # after a stall, only the newest hops are worth computing
+        if count > self.max_frames:
+            ring.consume((count - self.max_frames) * self.hop_size)
+            count = self.max_frames
+
+        if count == 0:
+            return self.frames[:0]
+
+        length = self.fft_size + (count - 1) * self.hop_size
+
+        # (count, channels, fft_size) strided view of the interleaved frames,
+        #   one row per hop and channel, nothing is copied until windowing
+        segments = sliding_window_view(ring.peek(length), self.fft_size, axis=0)
+        segments = segments[:: self.hop_size]
+
+        frames = self.frames[:count]
+        if stereo or self.channels == 1:
+            self.transform_channels(segments, frames)
+        else:
+            self.transform_mix(segments, frames)
+
+        self.spectra[:] = frames[-1]
+
+        if history:
+            # append the mid spectra to the history ring, in at most two slices
+            start = self.frame_count % self.history_size
+            split = min(start + count, self.history_size)
+            self.history[start:split] = frames[: split - start, SPECTRUM_MID]
+            self.history[: start + count - split] = frames[
+                split - start :, SPECTRUM_MID
+            ]
+
+            self.frame_count += count
+
+        ring.consume(count * self.hop_size)
+
+        return frames
+
+    def transform_channels(self, segments: np.ndarray, frames: np.ndarray) -> None:
+        """Compute all the spectra, one transform per channel."""
+        count = len(frames)
+        windowed = self._windowed[:count]
+        np.multiply(segments, self.window, out=windowed)
+
+        spectrum = np.fft.rfft(windowed, axis=-1)[..., : self.num_bins]
+
+        # the fft is linear, so mid and side come from the complex spectra
+        combined = self._combined[:count]
+        left = spectrum[:, 0]
+        right = spectrum[:, 1] if self.channels > 1 else left
+        combined[:, SPECTRUM_LEFT] = left
+        combined[:, SPECTRUM_RIGHT] = right
+        np.add(left, right, out=combined[:, SPECTRUM_MID])
+        np.subtract(left, right, out=combined[:, SPECTRUM_SIDE])
+        combined[:, SPECTRUM_MID : SPECTRUM_SIDE + 1] *= 0.5
+
+        np.abs(combined, out=frames)
+        frames *= self._scale
+
+    def transform_mix(self, segments: np.ndarray, frames: np.ndarray) -> None:
+        """Compute the mid spectra only, with one transform of the mixed channels."""
+        count = len(frames)
+        mixed = self._windowed[:count, 0]
+        np.mean(segments, axis=1, dtype="f4", out=mixed)
+        mixed *= self.window
+
+        spectrum = np.fft.rfft(mixed, axis=-1)[..., : self.num_bins]
+
+        mid = frames[:, SPECTRUM_MID]
+        np.abs(spectrum, out=mid)
+        mid *= self._scale
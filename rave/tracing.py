@@ -0,0 +1,206 @@
+import array
+import itertools
+import json
+import numpy as np
+import os
+import threading
+import time
+
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+
+# constants
+DEFAULT_TRACE_CAPACITY: int = 65536
+DEFAULT_TRACE_PATH: str = "rave.trace.json"
+PERCENTILES: List[float] = [50.0, 95.0, 99.0]
+NANOSECONDS_PER_MILLISECOND: float = 1e6
+NANOSECONDS_PER_MICROSECOND: float = 1e3
+
+# returned while tracing is disabled, entering and leaving it does nothing
+NULL_SPAN: nullcontext = nullcontext()
+
+
+class Span:
+    """Times a block of code and records it in a Tracer when the block exits."""
+
+    __slots__ = ("tracer", "name_id", "start")
+
+    def __init__(self, tracer: "Tracer", name_id: int) -> None:
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.tracer.record(self.name_id, self.start, time.perf_counter_ns())
+
+
+class Tracer:
+    """Records timed spans of the frame pipeline into a preallocated ring.
+
+    Spans are written as a few integers into fixed typed arrays, which are
+    cheaper to assign to one element at a time than numpy arrays and are
+    viewed as numpy arrays for the statistics. Tracing never allocates per
+    span beyond the Span object itself. Slots are
+    claimed with an atomic counter, so the audio thread and the render thread
+    can record at the same time. While disabled, `span` returns a shared
+    no-op context manager.
+    """
+
+    enabled: bool
+    capacity: int
+    output_path: str
+
+    names: List[str]
+    name_ids: Dict[str, int]
+
+    starts: array.array
+    durations: array.array
+    name_indices: array.array
+    thread_ids: array.array
+    thread_names: Dict[int, str]
+
+    counter: Any
+    written: int
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_TRACE_CAPACITY,
+        enabled: bool = False,
+        output_path: str = DEFAULT_TRACE_PATH,
+    ) -> None:
+        self.enabled = enabled
+        self.capacity = capacity
+        self.output_path = output_path
+
+        self.names = []
+        self.name_ids = {}
+
+        self.starts = array.array("q", bytes(8 * capacity))
+        self.durations = array.array("q", bytes(8 * capacity))
+        self.name_indices = array.array("q", bytes(8 * capacity))
+        self.thread_ids = array.array("Q", bytes(8 * capacity))
+        self.thread_names = {}
+
+        self.clear()
+
+    def clear(self) -> None:
+        self.counter = itertools.count()
+        self.written = 0
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def get_name_id(self, name: str) -> int:
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids.setdefault(name, len(self.names))
+            if name_id == len(self.names):
+                self.names.append(name)
+        return name_id
+
+    def span(self, name: str) -> Any:
+        """Context manager timing the enclosed block as a span called `name`."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, self.get_name_id(name))
+
+    def record(self, name_id: int, start: int, end: int) -> None:
+        # next() on itertools.count is atomic, each span gets its own slot
+        index = next(self.counter)
+        slot = index % self.capacity
+
+        thread_id = threading.get_ident()
+        if thread_id not in self.thread_names:
+            self.thread_names[thread_id] = threading.current_thread().name
+
+        self.starts[slot] = start
+        self.durations[slot] = end - start
+        self.name_indices[slot] = name_id
+        self.thread_ids[slot] = thread_id
+        self.written = max(self.written, index + 1)
+
+    def get_slots(self) -> np.ndarray:
+        """Indices of the recorded spans still in the ring, oldest first."""
+        count = min(self.written, self.capacity)
+        first = self.written - count
+        return np.arange(first, self.written) % self.capacity
+
+    def get_stats(self) -> Dict[str, np.ndarray]:
+        """Percentiles and maximum duration of each span name, in milliseconds.
+
+        Returns:
+            Dict[str, np.ndarray]: Span name to [p50, p95, p99, max].
+        """
+        slots = self.get_slots()
+        name_indices = np.frombuffer(self.name_indices, dtype=np.int64)[slots]
+        durations = np.frombuffer(self.durations, dtype=np.int64)[slots]
+        durations = durations / NANOSECONDS_PER_MILLISECOND
+
+        stats = {}
+        for name_id, name in enumerate(list(self.names)):
+            samples = durations[name_indices == name_id]
+            if len(samples) > 0:
+                stats[name] = np.append(
+                    np.percentile(samples, PERCENTILES), samples.max()
+                )
+
+        return stats
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """The recorded spans in the Chrome trace event format."""
+        slots = self.get_slots()
+        pid = os.getpid()
+
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": n},
+            }
+            for tid, n in list(self.thread_names.items())
+        ]
+
+        starts = np.frombuffer(self.starts, dtype=np.int64)[slots]
+        durations = np.frombuffer(self.durations, dtype=np.int64)[slots]
+        names = np.frombuffer(self.name_indices, dtype=np.int64)[slots]
+        thread_ids = np.frombuffer(self.thread_ids, dtype=np.uint64)[slots]
+
+        starts = starts / NANOSECONDS_PER_MICROSECOND
+        durations = durations / NANOSECONDS_PER_MICROSECOND
+
+        for start, duration, name_id, thread_id in zip(
+            starts.tolist(), durations.tolist(), names.tolist(), thread_ids.tolist()
+        ):
+            events.append(
+                {
+                    "name": self.names[name_id],
+                    "ph": "X",
+                    "ts": start,
+                    "dur": duration,
+                    "pid": pid,
+                    "tid": thread_id,
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Write the recorded spans as a Chrome trace, viewable in chrome://tracing or Perfetto.
+
+        Returns:
+            str: Path of the written file.
+        """
+        path = path if path is not None else self.output_path
+        with open(path, "w") as fp:
+            json.dump(self.to_chrome_trace(), fp)
+        return path
+
+
+# shared by the render and audio threads
+tracer: Tracer = Tracer()
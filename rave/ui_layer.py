@@ -0,0 +1,144 @@
+import moderngl
+
+from typing import Any, Optional, Tuple
+
+from rave.compositor import Compositor
+
+
+# constants
+DEFAULT_UI_RATE: float = 30.0
+SETTLE_FRAMES: int = 2
+MIN_DELTA_TIME: float = 1e-4
+
+
+class PremultipliedAlphaContext:
+    """Context seen by the imgui renderer while it draws into the UI layer.
+
+    The renderer blends with SRC_ALPHA, ONE_MINUS_SRC_ALPHA, which would also
+    square the alpha written into a transparent target. This keeps that
+    function for the colors and accumulates coverage in the alpha channel,
+    leaving a premultiplied image of the UI.
+    """
+
+    def __init__(self, ctx: moderngl.Context) -> None:
+        object.__setattr__(self, "ctx", ctx)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.ctx, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "blend_func" and len(value) == 2:
+            value = (*value, moderngl.ONE, moderngl.ONE_MINUS_SRC_ALPHA)
+        setattr(self.ctx, name, value)
+
+
+class UILayer:
+    """Caches the rendered UI in a texture composited over every frame.
+
+    Building the imgui frame in Python costs far more than drawing it, so the
+    UI is only rebuilt `rate` times per second, or only after input when the
+    rate is 0, and the cached texture is drawn over the visual in between.
+    Presses, releases and keys redraw the UI on the next few frames, so
+    imgui sees each of them and settles its hover and focus state. Mouse
+    motion, such as dragging a slider, redraws it at most `rate` times per
+    second.
+
+    The cached UI is drawn with the visual's compositor, which it shares.
+    """
+
+    ctx: moderngl.Context
+    rate: float
+    framebuffer: Optional[moderngl.Framebuffer]
+    compositor: Compositor
+    last_render: Optional[float]
+    pending_frames: int
+    pending_motion: bool
+
+    def __init__(
+        self,
+        ctx: moderngl.Context,
+        compositor: Compositor,
+        rate: float = DEFAULT_UI_RATE,
+    ) -> None:
+        self.ctx = ctx
+        self.rate = rate
+        self.framebuffer = None
+        self.compositor = compositor
+        self.last_render = None
+        self.pending_frames = SETTLE_FRAMES
+        self.pending_motion = False
+
+    def release(self) -> None:
+        if self.framebuffer is not None:
+            self.framebuffer.color_attachments[0].release()
+            self.framebuffer.release()
+            self.framebuffer = None
+
+    def invalidate(self) -> None:
+        """Redraw the UI on the next frames, after input or a change of state."""
+        self.pending_frames = SETTLE_FRAMES
+
+    def invalidate_motion(self) -> None:
+        """Redraw the UI at the UI rate, after mouse motion."""
+        self.pending_motion = True
+
+    def get_delta_time(self, time: float) -> float:
+        """Time since the UI was last rendered, for imgui's animations."""
+        if self.last_render is None:
+            return MIN_DELTA_TIME
+        return max(time - self.last_render, MIN_DELTA_TIME)
+
+    def needs_render(self, time: float, size: Tuple[int, int]) -> bool:
+        if self.pending_frames > 0 or self.last_render is None:
+            return True
+
+        if self.framebuffer is None or self.framebuffer.size != size:
+            return True
+
+        # motion is throttled even when the ui only redraws on input
+        rate = self.rate if self.rate > 0.0 else DEFAULT_UI_RATE
+        if not self.pending_motion and self.rate <= 0.0:
+            return False
+
+        return time - self.last_render >= 1.0 / rate
+
+    def render(
+        self,
+        renderer: Any,
+        draw_data: Any,
+        screen: moderngl.Framebuffer,
+        time: float,
+    ) -> None:
+        """Draw a finished imgui frame into the UI texture."""
+        if self.framebuffer is None or self.framebuffer.size != screen.size:
+            self.release()
+            self.framebuffer = self.ctx.framebuffer(
+                color_attachments=[self.ctx.texture(screen.size, 4)]
+            )
+
+        self.framebuffer.use()
+        self.framebuffer.clear(0.0, 0.0, 0.0, 0.0)
+
+        ctx = renderer.ctx
+        renderer.ctx = PremultipliedAlphaContext(ctx)
+        try:
+            renderer.render(draw_data)
+        finally:
+            renderer.ctx = ctx
+            screen.use()
+
+        self.last_render = time
+        self.pending_frames = max(self.pending_frames - 1, 0)
+        self.pending_motion = False
+
+    def composite(self) -> None:
+        """Draw the cached UI over the bound framebuffer."""
+        if self.framebuffer is None:
+            return
+
+        # the ui layer is premultiplied
+        self.ctx.enable_only(moderngl.BLEND)
+        self.ctx.blend_func = moderngl.ONE, moderngl.ONE_MINUS_SRC_ALPHA
+        self.compositor.draw(self.framebuffer.color_attachments[0], opaque=False)
+        self.ctx.blend_func = moderngl.SRC_ALPHA, moderngl.ONE_MINUS_SRC_ALPHA
+        self.ctx.disable(moderngl.BLEND)
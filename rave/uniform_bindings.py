@@ -0,0 +1,224 @@
+import moderngl
+import numpy as np
+import zlib
+
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from rave.project import UniformField
+from rave.resampler import Resampler
+from rave.uniform_block import UniformBlock
+
+
+# type aliases
+UniformSource = Callable[[float, float], Any]
+
+
+class UniformBindingTable:
+    """Resolved uniform handles of a compiled program, with dirty tracking.
+
+    The table is built once per successful compile. Setting a value only
+    uploads it when it differs from the last value sent. Arrays and raw bytes
+    are compared through a CRC32 digest of their buffer, everything else by
+    equality.
+
+    User uniforms packed into the program's uniform block are not set one by
+    one: their fields hold views into the block, which is uploaded whole.
+
+    Array sources can be resampled to the length their uniform is declared
+    with, from `parse_array_lengths`, as the linker only reports the length
+    up to the last element used. Only the elements used are uploaded.
+    """
+
+    program: Optional[moderngl.Program]
+    handles: Dict[str, moderngl.Uniform]
+    block: Optional[UniformBlock]
+    array_lengths: Dict[str, int]
+    last_values: Dict[str, Any]
+    sources: List[Tuple[str, UniformSource, Optional[Resampler]]]
+    fields: List[UniformField]
+
+    def __init__(
+        self,
+        program: Optional[moderngl.Program] = None,
+        block: Optional[UniformBlock] = None,
+        array_lengths: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.program = program
+        self.handles = {}
+        self.block = block
+        self.array_lengths = {}
+        self.last_values = {}
+        self.sources = []
+        self.fields = []
+
+        if program is not None:
+            for key in program:
+                u = program[key]
+                if isinstance(u, moderngl.Uniform):
+                    self.handles[key] = u
+                    self.array_lengths[key] = max(
+                        (array_lengths or {}).get(key, 0), u.array_length
+                    )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.handles
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def release(self) -> None:
+        if self.block is not None:
+            self.block.release()
+
+    def invalidate(self) -> None:
+        """Forget the last values sent, so every value is uploaded again."""
+        self.last_values.clear()
+        if self.block is not None:
+            self.block.invalidate()
+
+    def get_uniform_info(self) -> List[Tuple[str, str, Any]]:
+        """Name, format and current value of every uniform, block members last.
+
+        Block members have their glsl type as format and their view as value.
+        """
+        info = [(u.name, u.fmt, u.value) for u in self.handles.values()]
+        if self.block is not None:
+            info += [
+                (name, glsl_type, self.block.views[name])
+                for name, glsl_type in self.block.members
+            ]
+        return info
+
+    def set(self, name: str, value: Any) -> bool:
+        """Upload a value if the uniform exists and the value changed.
+
+        Args:
+            name (str): Name of the uniform.
+            value (Any): New value, bytes or a contiguous np.ndarray for arrays.
+
+        Returns:
+            bool: Whether the value was uploaded.
+        """
+        handle = self.handles.get(name)
+        if handle is None:
+            return False
+
+        if isinstance(value, (np.ndarray, bytes)):
+            key = zlib.crc32(value)
+        elif isinstance(value, list):
+            key = tuple(value)
+        else:
+            key = value
+
+        if name in self.last_values and self.last_values[name] == key:
+            return False
+
+        if isinstance(value, (np.ndarray, bytes)):
+            handle.write(value)
+        else:
+            handle.value = value
+
+        self.last_values[name] = key
+        return True
+
+    def bind_sources(
+        self,
+        sources: Dict[str, UniformSource],
+        scales: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Keep only the value sources whose uniform exists in the program.
+
+        Args:
+            sources (Dict[str, UniformSource]): Uniform name to value source.
+            scales (Optional[Dict[str, str]]): Resample scale of the sources of
+                arrays, which are resampled to the declared length of their
+                uniform.
+        """
+        scales = scales or {}
+        self.sources = []
+
+        for name, source in sources.items():
+            if name not in self.handles:
+                continue
+
+            resampler = None
+            if name in scales:
+                resampler = Resampler(self.array_lengths[name], scales[name])
+            self.sources.append((name, source, resampler))
+
+    def update_sources(self, time: float, frametime: float) -> None:
+        """Evaluate the bound sources and upload the values that changed."""
+        for name, source, resampler in self.sources:
+            value = source(time, frametime)
+
+            if resampler is not None:
+                # only the elements up to the last one used are active
+                value = resampler.resample(value)[: self.handles[name].array_length]
+
+            self.set(name, value)
+
+    def bind_fields(self, fields: List[UniformField]) -> None:
+        """Bind the project's uniform fields to the program.
+
+        Fields of block members get their value copied into the block and
+        hold the member's view from then on. The other fields of existing
+        uniforms are set by `update_fields`.
+        """
+        self.fields = []
+        for u in fields:
+            if self.block is not None and u.name in self.block:
+                u.value = self.block.bind_value(u.name, u.value)
+            elif u.name in self.handles:
+                self.fields.append(u)
+
+    def update_fields(self) -> None:
+        """Upload the uniform block and the bound fields that changed."""
+        if self.block is not None:
+            self.block.upload(self.program)
+
+        for u in self.fields:
+            self.set(u.name, u.value)
+
+    def update(self, time: float, frametime: float) -> None:
+        """Upload the frame's values of the bound sources and fields."""
+        # rave exposed uniforms
+        self.update_sources(time, frametime)
+
+        # ui exposed uniforms, one upload for those in the uniform block
+        self.update_fields()
+
+
+def match_uniform_fields(
+    bindings: UniformBindingTable,
+    previous: List[UniformField],
+    exclude: Collection[str] = (),
+) -> List[UniformField]:
+    """Uniform fields for the uniforms of a newly compiled program.
+
+    Uniforms that had a field before keep its value and range, new ones
+    start from their current value with a range of 0 to 1.
+
+    Args:
+        bindings (UniformBindingTable): Uniforms of the program.
+        previous (List[UniformField]): Fields of the previous program.
+        exclude (Collection[str]): Uniforms set by RAVE, which get no field.
+
+    Returns:
+        List[UniformField]: The fields, in the order of the program's uniforms.
+    """
+    matches = {u.name: u for u in previous}
+
+    fields = []
+    for name, fmt, value in bindings.get_uniform_info():
+        if name in exclude:
+            continue
+
+        match = matches.get(name)
+        if match is not None:
+            fields.append(
+                UniformField(name, fmt, match.value, match.min_value, match.max_value)
+            )
+        else:
+            fields.append(UniformField(name, fmt, value, 0.0, 1.0))
+
+    return fields
@@ -0,0 +1,318 @@
+import moderngl
+import numpy as np
+import re
+import zlib
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# type aliases
+UniformMember = Tuple[str, str]
+SourceSpan = Tuple[int, int]
+
+
+# constants
+UNIFORM_BLOCK_NAME: str = "RaveUniforms"
+UNIFORM_BLOCK_BINDING: int = 0
+STD140_VEC4_SIZE: int = 16
+COMPONENT_SIZE: int = 4
+
+# glsl type to (numpy dtype, columns, rows), vectors are a single column
+GLSL_TYPES: Dict[str, Tuple[str, int, int]] = {
+    "float": ("<f4", 1, 1),
+    "vec2": ("<f4", 1, 2),
+    "vec3": ("<f4", 1, 3),
+    "vec4": ("<f4", 1, 4),
+    "int": ("<i4", 1, 1),
+    "ivec2": ("<i4", 1, 2),
+    "ivec3": ("<i4", 1, 3),
+    "ivec4": ("<i4", 1, 4),
+    "uint": ("<u4", 1, 1),
+    "uvec2": ("<u4", 1, 2),
+    "uvec3": ("<u4", 1, 3),
+    "uvec4": ("<u4", 1, 4),
+    "bool": ("<u4", 1, 1),
+    "bvec2": ("<u4", 1, 2),
+    "bvec3": ("<u4", 1, 3),
+    "bvec4": ("<u4", 1, 4),
+    "mat2": ("<f4", 2, 2),
+    "mat3": ("<f4", 3, 3),
+    "mat4": ("<f4", 4, 4),
+    "mat2x2": ("<f4", 2, 2),
+    "mat2x3": ("<f4", 2, 3),
+    "mat2x4": ("<f4", 2, 4),
+    "mat3x2": ("<f4", 3, 2),
+    "mat3x3": ("<f4", 3, 3),
+    "mat3x4": ("<f4", 3, 4),
+    "mat4x2": ("<f4", 4, 2),
+    "mat4x3": ("<f4", 4, 3),
+    "mat4x4": ("<f4", 4, 4),
+}
+
+# a statement declaring plain uniforms, without arrays or initializers, on one line
+DECLARATION_PATTERN: re.Pattern = re.compile(
+    r"\buniform[ \t]+(?:(?:lowp|mediump|highp)[ \t]+)?(\w+)[ \t]+"
+    r"(\w+(?:[ \t]*,[ \t]*\w+)*)[ \t]*;"
+)
+COMMENT_PATTERN: re.Pattern = re.compile(r"//[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+
+# declarations of uniform arrays, with their declared length
+ARRAY_DECLARATION_PATTERN: re.Pattern = re.compile(
+    r"\buniform\s+(?:(?:lowp|mediump|highp)\s+)?\w+\s+(\w+)\s*\[\s*(\d+)\s*\]"
+)
+
+# names starting with "r" and an uppercase letter are uniforms set by RAVE
+RAVE_UNIFORM_PATTERN: re.Pattern = re.compile(r"^r[A-Z]")
+
+
+def mask_comments(source: str) -> str:
+    """The source with its comments blanked out, keeping every position and line."""
+    return COMMENT_PATTERN.sub(
+        lambda m: "".join(c if c == "\n" else " " for c in m.group(0)), source
+    )
+
+
+def find_declarations(source: str) -> List[Tuple[SourceSpan, List[UniformMember]]]:
+    """Find the statements declaring user uniforms that can be moved into the uniform block.
+
+    Every statement counts, also when a line holds several, but not those
+    inside comments or spanning several lines.
+
+    Returns:
+        List[Tuple[SourceSpan, List[UniformMember]]]: Start and end of the
+            statement in the source, and the (name, glsl type) it declares,
+            in source order.
+    """
+    code = mask_comments(source)
+    declarations = []
+
+    for match in DECLARATION_PATTERN.finditer(code):
+        # only at the start of a statement, not after a layout or other qualifier
+        line_start = code.rfind("\n", 0, match.start()) + 1
+        before = code[line_start : match.start()].rstrip()
+        if before and before[-1] not in ";{}":
+            continue
+
+        if match.group(1) not in GLSL_TYPES:
+            continue
+
+        names = [x.strip() for x in match.group(2).split(",")]
+        if any(RAVE_UNIFORM_PATTERN.match(x) for x in names):
+            continue
+
+        declarations.append(
+            ((match.start(), match.end()), [(x, match.group(1)) for x in names])
+        )
+
+    return declarations
+
+
+def parse_uniform_block(source: str) -> List[UniformMember]:
+    """The user uniforms of a fragment shader that are packed into the uniform block."""
+    return [m for _, members in find_declarations(source) for m in members]
+
+
+def parse_array_lengths(source: str) -> Dict[str, int]:
+    """Declared length of every uniform array of a shader.
+
+    The linker only reports the length up to the last element used, which
+    may be shorter. Declarations inside comments are ignored.
+    """
+    return {
+        name: int(length)
+        for name, length in ARRAY_DECLARATION_PATTERN.findall(mask_comments(source))
+    }
+
+
+def rewrite_uniform_block(source: str) -> str:
+    """Move the plain user uniform declarations into one std140 uniform block.
+
+    The block is declared in place of the first declaration and the other
+    declarations are removed, keeping every line, so compile errors still
+    point at the line of the script the user wrote.
+
+    Args:
+        source (str): GLSL source code of the fragment shader.
+
+    Returns:
+        str: The source code with the uniform block.
+    """
+    declarations = find_declarations(source)
+    if not declarations:
+        return source
+
+    members = " ".join(
+        f"{glsl_type} {name};"
+        for _, declared in declarations
+        for name, glsl_type in declared
+    )
+    block = f"layout(std140) uniform {UNIFORM_BLOCK_NAME} {{ {members} }};"
+
+    # replaced from the end, so the spans before stay valid
+    for i, ((start, end), _) in reversed(list(enumerate(declarations))):
+        if i == 0:
+            source = source[:start] + block + source[end:]
+        else:
+            # along with the spaces around it, no trailing ones left on the line
+            head, tail = source[:start], source[end:].lstrip(" \t")
+            if not tail or tail[0] == "\n":
+                head = head.rstrip(" \t")
+            source = head + tail
+
+    return source
+
+
+def get_std140_layout(glsl_type: str) -> Tuple[int, int]:
+    """Alignment and size of a member of a std140 uniform block, in bytes."""
+    _, columns, rows = GLSL_TYPES[glsl_type]
+
+    # matrices are arrays of column vectors, each padded to a vec4
+    if columns > 1:
+        return STD140_VEC4_SIZE, columns * STD140_VEC4_SIZE
+
+    # vec3 is aligned like a vec4
+    size = rows * COMPONENT_SIZE
+    alignment = COMPONENT_SIZE * (4 if rows == 3 else rows)
+    return alignment, size
+
+
+class UniformBlock:
+    """User uniforms packed into one std140 uniform block, uploaded with one write.
+
+    `data` is a numpy structured array laid out exactly like the block in
+    GPU memory, and `views` holds a view of each member into it, which is
+    what the project's uniform fields hold as their value. Editing a view
+    edits the block in place; `upload` writes the whole block when any of it
+    changed since the last upload.
+    """
+
+    members: List[UniformMember]
+    offsets: Dict[str, int]
+    data: np.ndarray
+    raw: np.ndarray
+    views: Dict[str, np.ndarray]
+
+    buffer: Optional[moderngl.Buffer]
+    last_digest: Optional[int]
+
+    def __init__(self, members: List[UniformMember]) -> None:
+        self.members = members
+        self.offsets = {}
+
+        names, formats, offsets = [], [], []
+        offset = 0
+        for name, glsl_type in members:
+            alignment, size = get_std140_layout(glsl_type)
+            offset = -(-offset // alignment) * alignment
+            self.offsets[name] = offset
+
+            dtype, columns, rows = GLSL_TYPES[glsl_type]
+            names.append(name)
+            offsets.append(offset)
+            if columns > 1:
+                formats.append((dtype, (columns, STD140_VEC4_SIZE // COMPONENT_SIZE)))
+            elif rows > 1:
+                formats.append((dtype, (rows,)))
+            else:
+                formats.append(dtype)
+
+            offset += size
+
+        itemsize = -(-offset // STD140_VEC4_SIZE) * STD140_VEC4_SIZE
+        self.data = np.zeros(
+            1,
+            dtype=np.dtype(
+                {
+                    "names": names,
+                    "formats": formats,
+                    "offsets": offsets,
+                    "itemsize": max(itemsize, STD140_VEC4_SIZE),
+                }
+            ),
+        )
+        self.raw = self.data.view(np.uint8)
+
+        self.views = {}
+        for name, glsl_type in members:
+            _, columns, rows = GLSL_TYPES[glsl_type]
+            view = self.data[name][0]
+            if columns > 1:
+                view = view[:, :rows]
+            elif rows == 1:
+                view = self.data[name].reshape(())
+            self.views[name] = view
+
+        self.buffer = None
+        self.last_digest = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.views
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    @property
+    def size(self) -> int:
+        return self.data.itemsize
+
+    def release(self) -> None:
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+
+    def bind_value(self, name: str, value: Any) -> np.ndarray:
+        """Copy a value into a member, when it fits, and return the member's view."""
+        view = self.views[name]
+
+        if value is not None and value is not view:
+            try:
+                view[...] = np.reshape(np.asarray(value, dtype=view.dtype), view.shape)
+            except (TypeError, ValueError):
+                pass
+
+        return view
+
+    def upload(self, program: moderngl.Program) -> bool:
+        """Write the block if it changed and bind it for `program`.
+
+        Returns:
+            bool: Whether the block was written.
+        """
+        if self.buffer is None:
+            self.buffer = program.ctx.buffer(reserve=self.size)
+
+        # programs share the binding point, bind for every draw
+        self.buffer.bind_to_uniform_block(UNIFORM_BLOCK_BINDING)
+
+        digest = zlib.crc32(self.raw)
+        if digest == self.last_digest:
+            return False
+
+        self.buffer.write(self.raw)
+        self.last_digest = digest
+        return True
+
+    def invalidate(self) -> None:
+        self.last_digest = None
+
+
+def create_program(
+    context: moderngl.Context, vertex_shader: str, fragment_shader: str
+) -> Tuple[moderngl.Program, Optional[UniformBlock]]:
+    """Compile a program, with the fragment shader's user uniforms in a uniform block.
+
+    Returns:
+        Tuple[moderngl.Program, Optional[UniformBlock]]: The program, and its
+            uniform block unless it has none or the shader does not use it.
+    """
+    members = parse_uniform_block(fragment_shader)
+    program = context.program(
+        vertex_shader=vertex_shader,
+        fragment_shader=rewrite_uniform_block(fragment_shader),
+    )
+
+    if not members or UNIFORM_BLOCK_NAME not in program:
+        return program, None
+
+    program[UNIFORM_BLOCK_NAME].binding = UNIFORM_BLOCK_BINDING
+    return program, UniformBlock(members)
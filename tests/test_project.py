@@ -0,0 +1,67 @@
+import io
+import os
+import tempfile
+import unittest
+
+from rave.project import (
+    Project,
+    UniformField,
+    decode_value,
+    encode_value,
+    load_project,
+    save_project,
+)
+
+
+class TestUniformValues(unittest.TestCase):
+    def round_trip(self, value):
+        return decode_value(io.BytesIO(encode_value(value)))
+
+    def test_scalars(self):
+        self.assertEqual(self.round_trip(0.5), 0.5)
+        self.assertEqual(self.round_trip(3), 3)
+        self.assertIs(self.round_trip(True), True)
+        self.assertIsNone(self.round_trip(None))
+
+    def test_vectors(self):
+        self.assertEqual(self.round_trip((0.25, 0.5, 0.75)), (0.25, 0.5, 0.75))
+        self.assertEqual(self.round_trip((1, 2)), (1, 2))
+
+    def test_vector_arrays(self):
+        value = ((0.0, 1.0), (2.0, 3.0), (4.0, 5.0), (6.0, 7.0))
+        self.assertEqual(self.round_trip(value), value)
+
+    def test_matrices(self):
+        mat3x2 = ((1.0, 2.0), (3.0, 4.0), (5.0, 6.0))
+        self.assertEqual(self.round_trip(mat3x2), mat3x2)
+
+    def test_version_1_values_decode_flat(self):
+        # version 1 files carry no shape after the header
+        data = encode_value(((1.0, 2.0), (3.0, 4.0)))
+        header, values = data[:6], data[-32:]
+        value = decode_value(io.BytesIO(header + values), version=1)
+        self.assertEqual(value, (1.0, 2.0, 3.0, 4.0))
+
+
+class TestSaveLoad(unittest.TestCase):
+    def test_round_trip(self):
+        fields = [
+            UniformField("uScale", "f", 0.5, 0.0, 2.0),
+            UniformField("uCount", "i", 4, 0.0, 10.0),
+            UniformField("uColor", "3f", (0.25, 0.5, 1.0)),
+            UniformField("uPoints", "2f", ((0.0, 0.5), (1.0, 0.5), (0.5, 0.0))),
+            UniformField("uTransform", "4f", ((1.0, 0.0), (0.0, 1.0))),
+        ]
+        project = Project(name="Test", uniform_fields=fields)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.raveproj")
+            self.assertTrue(save_project(path, project))
+            loaded = load_project(path)
+
+        self.assertEqual(loaded.name, "Test")
+        self.assertEqual(loaded.uniform_fields, fields)
+
+
+if __name__ == "__main__":
+    unittest.main()
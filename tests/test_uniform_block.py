@@ -0,0 +1,152 @@
+import numpy as np
+import unittest
+
+from rave.uniform_block import (
+    UNIFORM_BLOCK_NAME,
+    UniformBlock,
+    parse_array_lengths,
+    parse_uniform_block,
+    rewrite_uniform_block,
+)
+
+
+SOURCE = """#version 330 core
+
+uniform float uScale; uniform vec3 uColor;
+uniform highp vec2 uOffset, uCenter;
+// uniform float uCommented;
+/* uniform float uBlockCommented; */ uniform int uCount;
+uniform float rAudioRMS;
+uniform float uArray[4];
+uniform float uInitialized = 1.0;
+uniform sampler2D uTexture;
+layout(location = 0) uniform float uLocated;
+uniform mat3x2 uTransform;
+
+out vec4 fragColor;
+"""
+
+
+class TestParseUniformBlock(unittest.TestCase):
+    def test_members(self):
+        self.assertEqual(
+            parse_uniform_block(SOURCE),
+            [
+                ("uScale", "float"),
+                ("uColor", "vec3"),
+                ("uOffset", "vec2"),
+                ("uCenter", "vec2"),
+                ("uCount", "int"),
+                ("uTransform", "mat3x2"),
+            ],
+        )
+
+    def test_declaration_after_statement_on_same_line(self):
+        source = "out vec4 fragColor; uniform float uScale;\n"
+        self.assertEqual(parse_uniform_block(source), [("uScale", "float")])
+
+    def test_no_members(self):
+        source = "uniform float rTime;\nuniform float uArray[2];\n"
+        self.assertEqual(parse_uniform_block(source), [])
+        self.assertEqual(rewrite_uniform_block(source), source)
+
+
+class TestRewriteUniformBlock(unittest.TestCase):
+    def test_block_replaces_first_declaration(self):
+        lines = rewrite_uniform_block(SOURCE).split("\n")
+
+        self.assertEqual(
+            lines[2],
+            f"layout(std140) uniform {UNIFORM_BLOCK_NAME} {{ float uScale; "
+            "vec3 uColor; vec2 uOffset; vec2 uCenter; int uCount; "
+            "mat3x2 uTransform; };",
+        )
+        self.assertEqual(lines[3], "")
+        self.assertEqual(lines[4], "// uniform float uCommented;")
+        self.assertEqual(lines[5], "/* uniform float uBlockCommented; */")
+        self.assertEqual(lines[11], "")
+
+    def test_lines_are_kept(self):
+        rewritten = rewrite_uniform_block(SOURCE)
+        self.assertEqual(rewritten.count("\n"), SOURCE.count("\n"))
+
+        # untouched declarations stay on their line
+        for line in (
+            "uniform float rAudioRMS;",
+            "uniform float uArray[4];",
+            "uniform float uInitialized = 1.0;",
+            "uniform sampler2D uTexture;",
+            "layout(location = 0) uniform float uLocated;",
+            "out vec4 fragColor;",
+        ):
+            self.assertEqual(
+                rewritten.split("\n").index(line), SOURCE.split("\n").index(line)
+            )
+
+
+class TestUniformBlockLayout(unittest.TestCase):
+    def test_vec3_alignment(self):
+        block = UniformBlock(
+            [("a", "float"), ("b", "vec3"), ("c", "float"), ("d", "vec2")]
+        )
+        # a vec3 is aligned to 16 bytes, and a float fits in its padding
+        self.assertEqual(block.offsets, {"a": 0, "b": 16, "c": 28, "d": 32})
+        self.assertEqual(block.size, 48)
+
+    def test_square_matrices(self):
+        block = UniformBlock(
+            [("a", "float"), ("b", "mat2"), ("c", "mat3"), ("d", "mat4")]
+        )
+        # columns are padded to a vec4
+        self.assertEqual(block.offsets, {"a": 0, "b": 16, "c": 48, "d": 96})
+        self.assertEqual(block.size, 160)
+
+    def test_non_square_matrices(self):
+        block = UniformBlock(
+            [("a", "mat2x3"), ("b", "mat3x2"), ("c", "mat4x2"), ("d", "float")]
+        )
+        self.assertEqual(block.offsets, {"a": 0, "b": 32, "c": 80, "d": 144})
+        self.assertEqual(block.size, 160)
+        self.assertEqual(block.views["a"].shape, (2, 3))
+        self.assertEqual(block.views["b"].shape, (3, 2))
+
+    def test_matrix_columns_in_memory(self):
+        block = UniformBlock([("m", "mat3x2")])
+        block.bind_value("m", ((1.0, 2.0), (3.0, 4.0), (5.0, 6.0)))
+
+        floats = block.raw.view("<f4")
+        np.testing.assert_array_equal(
+            floats, [1.0, 2.0, 0.0, 0.0, 3.0, 4.0, 0.0, 0.0, 5.0, 6.0, 0.0, 0.0]
+        )
+
+    def test_views_edit_block(self):
+        block = UniformBlock([("a", "float"), ("b", "vec3")])
+        block.views["a"][...] = 0.5
+        block.views["b"][:] = (1.0, 2.0, 3.0)
+
+        floats = block.raw.view("<f4")
+        self.assertEqual(floats[0], 0.5)
+        np.testing.assert_array_equal(floats[4:7], [1.0, 2.0, 3.0])
+
+    def test_size_is_padded_to_vec4(self):
+        self.assertEqual(UniformBlock([("a", "float")]).size, 16)
+        self.assertEqual(UniformBlock([("a", "vec4"), ("b", "int")]).size, 32)
+
+
+class TestParseArrayLengths(unittest.TestCase):
+    def test_lengths(self):
+        source = "uniform float rAudioFFT[64];\nuniform vec2 uPoints[4];\n"
+        self.assertEqual(parse_array_lengths(source), {"rAudioFFT": 64, "uPoints": 4})
+
+    def test_comments_are_ignored(self):
+        source = (
+            "uniform float rAudioFFT[64];\n"
+            "// uniform float rAudioFFT[8];\n"
+            "/* uniform float rAudioBands[16];\n"
+            "   uniform float rAudioFFTLeft[32]; */\n"
+        )
+        self.assertEqual(parse_array_lengths(source), {"rAudioFFT": 64})
+
+
+if __name__ == "__main__":
+    unittest.main()